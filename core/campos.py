@@ -0,0 +1,58 @@
+import re
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Identificadores (y la versión de la franquicia) que se conservan siempre en una proyección
+ATRIBUTOS_ID = ("FranquiciaID", "SucursalID", "ProductoID")
+ATRIBUTOS_SIEMPRE = frozenset(ATRIBUTOS_ID + ("Version",))
+
+_SEGMENTO = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+def parsear_campos(texto: Optional[str]) -> Optional[Dict[str, dict]]:
+    """Convierte `fields=Nombre,Sucursales[*].Nombre` en un árbol {"Nombre": {}, "Sucursales": {"Nombre": {}}}.
+
+    Un subárbol vacío significa el valor completo; `[*]` es opcional y solo documenta que el
+    atributo es una lista. Retorna None si no se pidieron campos y lanza ValueError si un nombre es inválido.
+    """
+    if not texto or not texto.strip():
+        return None
+    arbol: Dict[str, dict] = {}
+    for ruta in texto.split(","):
+        ruta = ruta.strip()
+        if not ruta:
+            continue
+        nodo = arbol
+        segmentos = ruta.replace("[*]", "").split(".")
+        for indice, segmento in enumerate(segmentos):
+            if not _SEGMENTO.match(segmento):
+                raise ValueError(f"Campo inválido en 'fields': {ruta}")
+            if segmento in nodo and not nodo[segmento]:
+                break  # ya se pidió el valor completo
+            if indice == len(segmentos) - 1:
+                nodo[segmento] = {}
+            else:
+                nodo = nodo.setdefault(segmento, {})
+    return arbol or None
+
+def proyectar(valor: Any, arbol: Optional[Dict[str, dict]]) -> Any:
+    """Deja en `valor` solo los campos del árbol (más IDs y versión), recorriendo listas y mapas anidados."""
+    if not arbol:
+        return valor
+    if isinstance(valor, list):
+        return [proyectar(elemento, arbol) for elemento in valor]
+    if not isinstance(valor, dict):
+        return valor
+    return {
+        clave: proyectar(contenido, arbol.get(clave))
+        for clave, contenido in valor.items()
+        if clave in arbol or clave in ATRIBUTOS_SIEMPRE
+    }
+
+def expresion_proyeccion(arbol: Dict[str, dict], claves: Iterable[str] = ()) -> Tuple[str, Dict[str, str]]:
+    """ProjectionExpression con los atributos de primer nivel del árbol más `claves`.
+
+    DynamoDB no admite comodines en las rutas de listas, así que los niveles internos
+    se recortan en memoria con `proyectar`.
+    """
+    atributos = list(dict.fromkeys([*claves, *arbol]))
+    nombres = {f"#p{i}": atributo for i, atributo in enumerate(atributos)}
+    return ", ".join(nombres), nombres
@@ -0,0 +1,148 @@
+import os
+import sys
+import json
+import time
+import contextvars
+from typing import Optional
+
+# Métricas en CloudWatch Embedded Metric Format: líneas JSON en stdout, sin llamadas de red
+METRICAS_ACTIVAS = os.environ.get("METRICAS_EMF", "1").strip().lower() not in ("0", "false", "no")
+ESPACIO_METRICAS = os.environ.get("METRICAS_NAMESPACE", "RetoNequi/Franquicias")
+
+_actual = contextvars.ContextVar("metricas", default=None)
+
+class MetricasSolicitud:
+    """Acumula las métricas de una invocación: latencia de la ruta y de cada operación de DynamoDB."""
+
+    def __init__(self, ruta: str, metodo: str):
+        self.ruta = ruta
+        self.metodo = metodo
+        self.inicio = time.perf_counter()
+        self.operaciones = {}
+        self.propiedades = {}
+        self.contadores = {}
+
+    def registrar_operacion(self, operacion: str, latencia_ms: float, capacidad: float,
+                            bytes_enviados: int, bytes_recibidos: int) -> None:
+        datos = self.operaciones.setdefault(operacion, {
+            "LatenciaDynamo": [], "CapacidadConsumida": 0.0, "BytesEnviados": [], "BytesRecibidos": []
+        })
+        datos["LatenciaDynamo"].append(round(latencia_ms, 3))
+        datos["CapacidadConsumida"] += capacidad
+        datos["BytesEnviados"].append(bytes_enviados)
+        datos["BytesRecibidos"].append(bytes_recibidos)
+
+    def contar(self, nombre: str, cantidad: int = 1) -> None:
+        self.contadores[nombre] = self.contadores.get(nombre, 0) + cantidad
+
+    def registros(self, status_code) -> list:
+        """Documentos EMF: uno por ruta y uno por operación de DynamoDB."""
+        marca = int(time.time() * 1000)
+        latencia = (time.perf_counter() - self.inicio) * 1000
+        capacidad_total = sum(d["CapacidadConsumida"] for d in self.operaciones.values())
+        registros = [{
+            "_aws": {"Timestamp": marca, "CloudWatchMetrics": [{
+                "Namespace": ESPACIO_METRICAS,
+                "Dimensions": [["Ruta", "Metodo"]],
+                "Metrics": [
+                    {"Name": "Latencia", "Unit": "Milliseconds"},
+                    {"Name": "LlamadasDynamo", "Unit": "Count"},
+                    {"Name": "CapacidadConsumida", "Unit": "Count"},
+                    *({"Name": nombre, "Unit": "Count"} for nombre in self.contadores),
+                ],
+            }]},
+            "Ruta": self.ruta,
+            "Metodo": self.metodo,
+            "Latencia": round(latencia, 3),
+            "LlamadasDynamo": sum(len(d["LatenciaDynamo"]) for d in self.operaciones.values()),
+            "CapacidadConsumida": capacidad_total,
+            "StatusCode": status_code,
+            **self.contadores,
+            **self.propiedades,
+        }]
+        for operacion, datos in self.operaciones.items():
+            registros.append({
+                "_aws": {"Timestamp": marca, "CloudWatchMetrics": [{
+                    "Namespace": ESPACIO_METRICAS,
+                    "Dimensions": [["Operacion"], ["Ruta", "Operacion"]],
+                    "Metrics": [
+                        {"Name": "LatenciaDynamo", "Unit": "Milliseconds"},
+                        {"Name": "CapacidadConsumida", "Unit": "Count"},
+                        {"Name": "BytesEnviados", "Unit": "Bytes"},
+                        {"Name": "BytesRecibidos", "Unit": "Bytes"},
+                    ],
+                }]},
+                "Ruta": self.ruta,
+                "Operacion": operacion,
+                **datos,
+                **self.propiedades,
+            })
+        return registros
+
+def iniciar_metricas(ruta: str, metodo: str) -> Optional[MetricasSolicitud]:
+    """Abre el acumulador de la invocación en curso (None si las métricas están desactivadas)."""
+    metricas = MetricasSolicitud(ruta, metodo) if METRICAS_ACTIVAS else None
+    _actual.set(metricas)
+    return metricas
+
+def agregar_propiedad(nombre: str, valor) -> None:
+    """Adjunta un campo consultable (no dimensión) a los registros de la invocación, p. ej. franquicia_id."""
+    metricas = _actual.get()
+    if metricas is not None and valor is not None:
+        metricas.propiedades[nombre] = valor
+
+def contar(nombre: str, cantidad: int = 1) -> None:
+    """Suma a un contador de la invocación (p. ej. conflictos de escritura), emitido con las métricas de la ruta."""
+    metricas = _actual.get()
+    if metricas is not None:
+        metricas.contar(nombre, cantidad)
+
+def emitir_metricas(status_code) -> None:
+    """Escribe los documentos EMF de la invocación en stdout y cierra el acumulador."""
+    metricas = _actual.get()
+    if metricas is None:
+        return
+    _actual.set(None)
+    salida = "\n".join(json.dumps(r, default=str, separators=(",", ":")) for r in metricas.registros(status_code))
+    sys.stdout.write(salida + "\n")
+    sys.stdout.flush()
+
+def _capacidad(consumida) -> float:
+    """Suma CapacityUnits de ConsumedCapacity (un dict o una lista en operaciones por lote/transacción)."""
+    if not consumida:
+        return 0.0
+    if isinstance(consumida, dict):
+        consumida = [consumida]
+    return float(sum(c.get("CapacityUnits", 0) for c in consumida))
+
+def _pedir_capacidad(params, model, **kwargs):
+    if "ReturnConsumedCapacity" in model.input_shape.members and _actual.get() is not None:
+        params.setdefault("ReturnConsumedCapacity", "TOTAL")
+
+def _antes_de_llamada(params, context, **kwargs):
+    if _actual.get() is not None:
+        context["metricas_inicio"] = time.perf_counter()
+        context["metricas_bytes"] = len(params.get("body") or b"")
+
+def _despues_de_llamada(http_response, parsed, model, context, **kwargs):
+    metricas = _actual.get()
+    inicio = context.get("metricas_inicio")
+    if metricas is None or inicio is None:
+        return
+    metricas.registrar_operacion(
+        model.name,
+        (time.perf_counter() - inicio) * 1000,
+        _capacidad(parsed.get("ConsumedCapacity")),
+        context.get("metricas_bytes", 0),
+        len(http_response.content or b"") if http_response is not None else 0,
+    )
+
+def instrumentar_cliente(cliente) -> None:
+    """Registra los ganchos de botocore que miden cada llamada a DynamoDB del cliente.
+
+    Fuera de una invocación (sin acumulador abierto) los ganchos no hacen nada.
+    """
+    eventos = cliente.meta.events
+    eventos.register("provide-client-params.dynamodb", _pedir_capacidad)
+    eventos.register("before-call.dynamodb", _antes_de_llamada)
+    eventos.register("after-call.dynamodb", _despues_de_llamada)
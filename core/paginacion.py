@@ -0,0 +1,37 @@
+import json
+import base64
+import binascii
+from typing import Any, Optional
+
+# Tamaño de página de los listados cuando no se indica `limit`, y máximo admitido
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 500
+
+def parsear_limite(texto: Optional[str], por_defecto: int = LIMITE_POR_DEFECTO, maximo: int = LIMITE_MAXIMO) -> int:
+    """Convierte el parámetro `limit` en un entero entre 1 y `maximo`; lanza ValueError si no lo es."""
+    if texto is None or str(texto).strip() == "":
+        return por_defecto
+    try:
+        limite = int(texto)
+    except (TypeError, ValueError):
+        limite = 0
+    if not 1 <= limite <= maximo:
+        raise ValueError(f"El parámetro 'limit' debe estar entre 1 y {maximo}.")
+    return limite
+
+def codificar_cursor(posicion: Any) -> Optional[str]:
+    """Cursor opaco (JSON en base64 url-safe) con la posición donde continúa el listado; None si no hay más."""
+    if posicion is None:
+        return None
+    datos = json.dumps(posicion, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return base64.urlsafe_b64encode(datos).decode("ascii").rstrip("=")
+
+def decodificar_cursor(cursor: Optional[str]) -> Any:
+    """Posición guardada en un cursor de `codificar_cursor`; None si no se envió y ValueError si es inválido."""
+    if not cursor:
+        return None
+    try:
+        datos = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return json.loads(datos)
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise ValueError("El parámetro 'cursor' no es válido.")
@@ -0,0 +1,89 @@
+import os
+import io
+import hmac
+import time
+import pstats
+import logging
+import cProfile
+import tracemalloc
+from core.registro import solicitud_actual
+from core.rutas import obtener_cabecera
+
+logger = logging.getLogger(__name__)
+
+# Perfilado opt-in: PERFILADO=1 perfila todas las invocaciones; con PERFILADO_TOKEN, solo las que envían
+# la cabecera X-Perfilar con ese valor. Sin ninguna de las dos, la comprobación es una lectura de variable.
+PERFILADO_SIEMPRE = os.environ.get("PERFILADO", "").strip().lower() in ("1", "true", "si")
+PERFILADO_TOKEN = os.environ.get("PERFILADO_TOKEN", "")
+PERFILADO_TOP = int(os.environ.get("PERFILADO_TOP", "20"))
+PERFILADO_VOLCADO = os.environ.get("PERFILADO_VOLCADO", "").strip().lower() in ("1", "true", "si")
+DIRECTORIO_VOLCADO = os.environ.get("PERFILADO_DIRECTORIO", "/tmp")
+CABECERA_PERFILADO = "x-perfilar"
+
+def debe_perfilar(event) -> bool:
+    """Indica si la invocación pidió perfilado (variable de entorno o cabecera con el token)."""
+    if PERFILADO_SIEMPRE:
+        return True
+    if not PERFILADO_TOKEN:
+        return False
+    valor = obtener_cabecera(event, CABECERA_PERFILADO)
+    return valor is not None and hmac.compare_digest(str(valor), PERFILADO_TOKEN)
+
+def perfilar(funcion, event, context):
+    """Ejecuta `funcion(event, context)` bajo cProfile y tracemalloc y registra un resumen compacto."""
+    perfil = cProfile.Profile()
+    tracemalloc_previo = tracemalloc.is_tracing()
+    if not tracemalloc_previo:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    perfil.enable()
+    try:
+        return funcion(event, context)
+    finally:
+        perfil.disable()
+        duracion = (time.perf_counter() - inicio) * 1000
+        instantanea = tracemalloc.take_snapshot()
+        _, pico = tracemalloc.get_traced_memory()
+        if not tracemalloc_previo:
+            tracemalloc.stop()
+        resumen = {
+            "duracion_ms": round(duracion, 3),
+            "memoria_pico_kb": round(pico / 1024, 1),
+            "funciones": _funciones_principales(perfil, PERFILADO_TOP),
+            "asignaciones": _asignaciones_principales(instantanea, PERFILADO_TOP),
+        }
+        if PERFILADO_VOLCADO:
+            resumen["volcado"] = _volcar(perfil, instantanea)
+        logger.info("Perfil de la solicitud", extra={"perfil": resumen})
+
+def _funciones_principales(perfil: cProfile.Profile, top: int) -> list:
+    """Top de funciones por tiempo acumulado."""
+    estadisticas = pstats.Stats(perfil, stream=io.StringIO())
+    filas = sorted(estadisticas.stats.items(), key=lambda fila: fila[1][3], reverse=True)[:top]
+    return [
+        {
+            "funcion": f"{archivo}:{linea}({nombre})",
+            "llamadas": llamadas,
+            "tiempo_propio_ms": round(propio * 1000, 3),
+            "tiempo_acumulado_ms": round(acumulado * 1000, 3),
+        }
+        for (archivo, linea, nombre), (_, llamadas, propio, acumulado, _) in filas
+    ]
+
+def _asignaciones_principales(instantanea: tracemalloc.Snapshot, top: int) -> list:
+    """Top de líneas por memoria asignada y aún viva al terminar la invocación."""
+    instantanea = instantanea.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ))
+    return [
+        {"ubicacion": str(estadistica.traceback), "kb": round(estadistica.size / 1024, 1), "bloques": estadistica.count}
+        for estadistica in instantanea.statistics("lineno")[:top]
+    ]
+
+def _volcar(perfil: cProfile.Profile, instantanea: tracemalloc.Snapshot) -> dict:
+    """Guarda el perfil completo (pstats) y la instantánea de memoria para analizarlos fuera de la Lambda."""
+    base = os.path.join(DIRECTORIO_VOLCADO, f"perfil-{solicitud_actual() or int(time.time() * 1000)}")
+    perfil.dump_stats(f"{base}.prof")
+    instantanea.dump(f"{base}.tracemalloc")
+    return {"pstats": f"{base}.prof", "tracemalloc": f"{base}.tracemalloc"}
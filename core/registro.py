@@ -0,0 +1,98 @@
+import os
+import sys
+import json
+import uuid
+import random
+import logging
+import contextvars
+
+# Nivel global y tasa de muestreo (0..1) de los registros con el evento completo
+NIVEL_REGISTRO = os.environ.get("LOG_LEVEL", "INFO").strip().upper()
+TASA_MUESTREO_EVENTOS = float(os.environ.get("LOG_MUESTREO_EVENTOS", "0"))
+
+_solicitud_id = contextvars.ContextVar("solicitud_id", default=None)
+_muestreada = contextvars.ContextVar("muestreada", default=False)
+
+# Cabeceras con credenciales: nunca se registran, ni en DEBUG ni en solicitudes muestreadas
+CABECERAS_SENSIBLES = frozenset({
+    "authorization", "proxy-authorization", "cookie", "set-cookie", "x-api-key", "x-admin-token", "x-perfilar",
+})
+OCULTO = "***"
+
+_ATRIBUTOS_REGISTRO = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+class FormateadorJSON(logging.Formatter):
+    """Una línea JSON compacta por registro; los argumentos se interpolan solo si el registro se emite."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        registro = {
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensaje": record.getMessage(),
+            "request_id": _solicitud_id.get(),
+        }
+        for clave, valor in record.__dict__.items():
+            if clave not in _ATRIBUTOS_REGISTRO:
+                registro[clave] = valor
+        if record.exc_info:
+            registro["excepcion"] = self.formatException(record.exc_info)
+        return json.dumps(registro, default=str, separators=(",", ":"))
+
+def configurar_registro(nivel: str = None) -> None:
+    """Instala el formateador JSON en el logger raíz (idempotente).
+
+    En Lambda el runtime ya registra un handler en la raíz: se reutiliza y solo se cambia su formato.
+    """
+    raiz = logging.getLogger()
+    if not raiz.handlers:
+        raiz.addHandler(logging.StreamHandler(sys.stdout))
+    for handler in raiz.handlers:
+        if not isinstance(handler.formatter, FormateadorJSON):
+            handler.setFormatter(FormateadorJSON())
+    raiz.setLevel(nivel or NIVEL_REGISTRO)
+    # En DEBUG botocore vuelca cada petición y respuesta completas
+    for ruidoso in ("boto3", "botocore", "urllib3"):
+        logging.getLogger(ruidoso).setLevel(max(raiz.level, logging.INFO))
+
+def iniciar_solicitud(event, context) -> str:
+    """Fija el ID de la solicitud y decide, una vez por invocación, si se registra el evento completo."""
+    solicitud_id = (
+        getattr(context, "aws_request_id", None)
+        or ((event or {}).get("requestContext") or {}).get("requestId")
+        or str(uuid.uuid4())
+    )
+    _solicitud_id.set(solicitud_id)
+    _muestreada.set(TASA_MUESTREO_EVENTOS > 0 and random.random() < TASA_MUESTREO_EVENTOS)
+    return solicitud_id
+
+def solicitud_actual():
+    """ID de la solicitud en curso, o None fuera de una invocación."""
+    return _solicitud_id.get()
+
+def registrar_carga(logger: logging.Logger, mensaje: str, carga) -> None:
+    """Registra una carga completa (evento, ítem) solo en DEBUG o si la solicitud fue muestreada.
+
+    La carga viaja como campo del registro y se serializa una única vez, dentro del formateador.
+    Si es un evento de API Gateway, las cabeceras sensibles y la API key se reemplazan por "***".
+    """
+    if _muestreada.get():
+        logger.info(mensaje, extra={"carga": ocultar_secretos(carga), "muestreada": True})
+    elif logger.isEnabledFor(logging.DEBUG):
+        logger.debug(mensaje, extra={"carga": ocultar_secretos(carga)})
+
+def ocultar_secretos(carga):
+    """Copia del evento con las credenciales ocultas; el evento original no se modifica."""
+    if not isinstance(carga, dict):
+        return carga
+    copia = dict(carga)
+    for campo in ("headers", "multiValueHeaders"):
+        cabeceras = copia.get(campo)
+        if isinstance(cabeceras, dict):
+            copia[campo] = {
+                nombre: (OCULTO if nombre.lower() in CABECERAS_SENSIBLES else valor)
+                for nombre, valor in cabeceras.items()
+            }
+    contexto = copia.get("requestContext")
+    if isinstance(contexto, dict) and isinstance(contexto.get("identity"), dict) and contexto["identity"].get("apiKey"):
+        copia["requestContext"] = {**contexto, "identity": {**contexto["identity"], "apiKey": OCULTO}}
+    return copia
@@ -0,0 +1,120 @@
+import os
+import gzip
+import json
+import zlib
+import base64
+from decimal import Decimal
+from typing import Any, Dict, Optional
+from core.rutas import obtener_cabecera
+
+# Compresión gzip de respuestas grandes cuando el cliente la acepta (Accept-Encoding). Desactivada por
+# defecto (-1): detrás de API Gateway requiere application/json en los binaryMediaTypes de la API
+COMPRESION_MIN_BYTES = int(os.environ.get("COMPRESION_MIN_BYTES", "-1"))
+COMPRESION_NIVEL = int(os.environ.get("COMPRESION_NIVEL", "5"))
+
+# Codificador rápido opcional: si orjson está instalado se usa para serializar las respuestas
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _por_defecto(obj):
+    """Tipos que el codificador estándar no conoce (Decimal de DynamoDB, conjuntos)."""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Objeto de tipo {type(obj).__name__} no serializable a JSON")
+
+def serializar(cuerpo: Any) -> str:
+    """Serializa el cuerpo de la respuesta una sola vez, con orjson si está disponible."""
+    if orjson is not None:
+        return orjson.dumps(cuerpo, default=_por_defecto).decode("utf-8")
+    return json.dumps(cuerpo, default=_por_defecto)
+
+def respuesta(status_code: int, message: str, data: Optional[Any] = None, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Resultado de un servicio: código de estado y cuerpo como datos de Python, sin serializar."""
+    cuerpo = {"message": message}
+    if data:
+        cuerpo["data"] = data
+    resultado = {"statusCode": int(status_code), "cuerpo": cuerpo}
+    if headers:
+        resultado["headers"] = headers
+    return resultado
+
+def no_modificado(etag: str) -> Dict[str, Any]:
+    """Resultado 304 sin cuerpo para un GET condicional cuyo ETag sigue vigente."""
+    return {"statusCode": 304, "cuerpo": None, "headers": {"ETag": etag}}
+
+def respuesta_http(status_code: int, cuerpo: Any, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Respuesta para API Gateway; es el único punto donde se codifica el cuerpo."""
+    if cuerpo is None:
+        return {"statusCode": int(status_code), "headers": dict(headers or {}), "body": ""}
+    return {
+        "statusCode": int(status_code),
+        "headers": {"Content-Type": "application/json", **(headers or {})},
+        "body": serializar(cuerpo)
+    }
+
+def a_http(resultado: Dict[str, Any]) -> Dict[str, Any]:
+    """Convierte el resultado de un servicio en la respuesta HTTP."""
+    return respuesta_http(resultado["statusCode"], resultado["cuerpo"], resultado.get("headers"))
+
+def etiqueta(franquicia_id: str, version: int, *variantes: Any) -> str:
+    """ETag débil a partir de la versión de la franquicia.
+
+    Las variantes (recurso, campos pedidos) distinguen representaciones distintas de la misma versión.
+    """
+    etag = f"{franquicia_id}-{int(version)}"
+    if any(v is not None for v in variantes):
+        etag += f"-{zlib.crc32(json.dumps(variantes, sort_keys=True).encode('utf-8')):08x}"
+    return f'W/"{etag}"'
+
+def coincide_etag(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match (lista separada por comas o *) contra el ETag actual."""
+    if not if_none_match:
+        return False
+    actual = etag[2:] if etag.startswith("W/") else etag
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*" or (candidato[2:] if candidato.startswith("W/") else candidato) == actual:
+            return True
+    return False
+
+def acepta_gzip(event) -> bool:
+    """Indica si la cabecera Accept-Encoding de la solicitud admite gzip (q > 0)."""
+    valor = obtener_cabecera(event, "accept-encoding") or ""
+    aceptados = {}
+    for parte in valor.split(","):
+        codificacion, _, parametros = parte.strip().lower().partition(";")
+        calidad = 1.0
+        if parametros.strip().startswith("q="):
+            try:
+                calidad = float(parametros.strip()[2:])
+            except ValueError:
+                calidad = 0.0
+        aceptados[codificacion.strip()] = calidad
+    return aceptados.get("gzip", aceptados.get("*", 0.0)) > 0
+
+def comprimir(respuesta_api: Dict[str, Any], event) -> Dict[str, Any]:
+    """Comprime con gzip el cuerpo de la respuesta si supera COMPRESION_MIN_BYTES y el cliente lo acepta.
+
+    El cuerpo comprimido viaja en base64 con isBase64Encoded; API Gateway lo decodifica si el
+    tipo de contenido está entre los binaryMediaTypes de la API.
+    """
+    cuerpo = respuesta_api.get("body")
+    if COMPRESION_MIN_BYTES < 0 or not isinstance(cuerpo, str) or respuesta_api.get("isBase64Encoded"):
+        return respuesta_api
+    datos = cuerpo.encode("utf-8")
+    # Sin cuerpo (304, por ejemplo) no hay nada que comprimir, aunque el umbral sea 0
+    if not datos or len(datos) < COMPRESION_MIN_BYTES or not acepta_gzip(event):
+        return respuesta_api
+    headers = dict(respuesta_api.get("headers") or {})
+    headers["Content-Encoding"] = "gzip"
+    headers["Vary"] = "Accept-Encoding"
+    return {
+        **respuesta_api,
+        "headers": headers,
+        "body": base64.b64encode(gzip.compress(datos, compresslevel=COMPRESION_NIVEL, mtime=0)).decode("ascii"),
+        "isBase64Encoded": True
+    }
@@ -0,0 +1,82 @@
+import re
+import json
+import base64
+import binascii
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+_PARAMETRO = re.compile(r"\{(\w+)\}")
+
+class Router:
+    """Tabla de rutas precompilada indexada por (método, plantilla de recurso).
+
+    API Gateway entrega la plantilla en event["resource"] (por ejemplo
+    /franquicias/{franquicia_id}/sucursales), así que el despacho es una búsqueda
+    en diccionario. Cuando solo se conoce la ruta concreta (event["path"]) se
+    prueba contra las expresiones compiladas de las plantillas con parámetros.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[Tuple[str, str], Callable] = {}
+        self._plantillas = set()
+        self._patrones = []
+
+    def agregar(self, metodos: Iterable[str], plantilla: str, handler: Callable) -> None:
+        """Registra `handler` para cada método en `plantilla`."""
+        for metodo in metodos:
+            self._handlers[(metodo, plantilla)] = handler
+        if plantilla not in self._plantillas:
+            self._plantillas.add(plantilla)
+            if "{" in plantilla:
+                regex = "^" + _PARAMETRO.sub(r"(?P<\1>[^/]+)", plantilla) + "$"
+                self._patrones.append((plantilla, re.compile(regex)))
+
+    def resolver(self, metodo: str, recurso: Optional[str], ruta: Optional[str]):
+        """Retorna (plantilla, handler, parámetros de ruta).
+
+        plantilla es None si la ruta no existe; handler es None si existe pero no admite el método.
+        """
+        plantilla, parametros = self._plantilla(recurso, ruta)
+        if plantilla is None:
+            return None, None, {}
+        return plantilla, self._handlers.get((metodo, plantilla)), parametros
+
+    def _plantilla(self, recurso: Optional[str], ruta: Optional[str]):
+        if recurso in self._plantillas:
+            return recurso, {}
+        ruta = (ruta or recurso or "").rstrip("/") or "/"
+        if ruta in self._plantillas:
+            return ruta, {}
+        for plantilla, patron in self._patrones:
+            coincidencia = patron.match(ruta)
+            if coincidencia:
+                return plantilla, coincidencia.groupdict()
+        return None, {}
+
+def obtener_cuerpo(event) -> dict:
+    """Cuerpo JSON de la solicitud, decodificado una sola vez y guardado en event["cuerpo"].
+
+    Lanza json.JSONDecodeError si el cuerpo no es un JSON válido.
+    """
+    if "cuerpo" not in event:
+        cuerpo = event.get("body")
+        if not cuerpo:
+            event["cuerpo"] = {}
+        elif isinstance(cuerpo, str):
+            if event.get("isBase64Encoded"):
+                # Con binaryMediaTypes activos API Gateway entrega el cuerpo en base64
+                try:
+                    cuerpo = base64.b64decode(cuerpo).decode("utf-8")
+                except (binascii.Error, UnicodeDecodeError) as e:
+                    raise json.JSONDecodeError(f"Cuerpo base64 inválido: {e}", "", 0)
+            event["cuerpo"] = json.loads(cuerpo)
+        else:
+            event["cuerpo"] = cuerpo
+    return event["cuerpo"]
+
+def obtener_cabecera(event, nombre: str) -> Optional[str]:
+    """Valor de una cabecera de la solicitud, sin distinguir mayúsculas de minúsculas."""
+    nombre = nombre.lower()
+    for clave, valor in ((event or {}).get("headers") or {}).items():
+        if clave.lower() == nombre:
+            return valor
+    return None
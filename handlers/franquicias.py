@@ -1,198 +1,160 @@
-import boto3
-import logging
-import json
-import uuid
-from decimal import Decimal
-from botocore.exceptions import BotoCoreError, ClientError
-
-# Configuración de logs
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-def convert_decimal(obj):
-    """Convierte objetos Decimal de DynamoDB a tipos serializables."""
-    if isinstance(obj, list):
-        return [convert_decimal(i) for i in obj]
-    elif isinstance(obj, dict):
-        return {k: convert_decimal(v) for k, v in obj.items()}
-    elif isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    return obj
-
-class DynamoRepository:
-    """Clase para interactuar con DynamoDB."""
-
-    def __init__(self, table_name: str):
-        self.dynamodb = boto3.resource("dynamodb")
-        self.table = self.dynamodb.Table(table_name)
-
-    def get_item(self, key: dict):
-        """Obtiene un ítem de la tabla por su clave primaria."""
-        try:
-            response = self.table.get_item(Key=key)
-            item = response.get("Item")
-            return convert_decimal(item) if item else None
-        except (ClientError, BotoCoreError) as e:
-            logger.error(f"❌ Error al obtener ítem de DynamoDB: {str(e)}")
-            return None
-
-    def put_item(self, item: dict):
-        """Inserta un nuevo ítem en la tabla."""
-        try:
-            self.table.put_item(Item=item)
-            logger.info(f"✅ Ítem insertado correctamente: {json.dumps(item, indent=2)}")
-            return True
-        except (ClientError, BotoCoreError) as e:
-            logger.error(f"❌ Error al insertar ítem en DynamoDB: {str(e)}")
-            return False
-
-    def update_item(self, key: dict, update_expression: str, expression_values: dict):
-        """Actualiza un ítem en la tabla."""
-        try:
-            response = self.table.update_item(
-                Key=key,
-                UpdateExpression=update_expression,
-                ExpressionAttributeValues=expression_values,
-                ReturnValues="UPDATED_NEW"
-            )
-            return convert_decimal(response.get("Attributes", {}))
-        except ClientError as e:
-            logger.error(f"Error en update_item: {e.response['Error']['Message']}")
-            return None
-        except BotoCoreError as e:
-            logger.error(f"Error en update_item (BotoCoreError): {str(e)}")
-            return None
-
-    def actualizar_franquicia(self, franquicia_id: str, nuevo_nombre: str) -> bool:
-        """Actualiza el nombre de una franquicia en DynamoDB."""
-        try:
-            resultado = self.update_item(
-                key={"FranquiciaID": franquicia_id},
-                update_expression="SET Nombre = :nuevo_nombre",
-                expression_values={":nuevo_nombre": nuevo_nombre}
-            )
-
-            if resultado:
-                logger.info(f"✅ Franquicia {franquicia_id} actualizada correctamente a '{nuevo_nombre}'.")
-                return True
-            else:
-                logger.warning(f"⚠️ No se pudo actualizar la franquicia {franquicia_id}.")
-                return False
-
-        except ClientError as e:
-            logger.error(f"❌ Error al actualizar franquicia: {e.response['Error']['Message']}")
-            return False
-        except BotoCoreError as e:
-            logger.error(f"❌ Error al actualizar franquicia (BotoCoreError): {str(e)}")
-            return False
-
-def actualizar_sucursal(self, franquicia_id: str, sucursal_id: str, nuevo_nombre: str) -> bool:
-    """Actualiza el nombre de una sucursal dentro de una franquicia en DynamoDB."""
-    try:
-        franquicia = self.get_item({"FranquiciaID": franquicia_id})
-        if not franquicia:
-            logger.warning(f"⚠️ Franquicia {franquicia_id} no encontrada.")
-            return False
-
-        sucursales = franquicia.get("Sucursales", [])
-        index = next((i for i, s in enumerate(sucursales) if s["SucursalID"] == sucursal_id), -1)
-
-        if index == -1:
-            logger.warning(f"⚠️ Sucursal {sucursal_id} no encontrada en la franquicia {franquicia_id}.")
-            return False
-
-        # Actualizar el nombre en la lista de sucursales
-        sucursales[index]["Nombre"] = nuevo_nombre
-
-        # Reescribir toda la lista en DynamoDB
-        resultado = self.update_item(
-            key={"FranquiciaID": franquicia_id},
-            update_expression="SET Sucursales = :sucursales",
-            expression_values={":sucursales": sucursales}
-        )
-
-        if resultado:
-            logger.info(f"✅ Sucursal {sucursal_id} actualizada correctamente a '{nuevo_nombre}'.")
-            return True
-        else:
-            logger.warning(f"⚠️ No se pudo actualizar la sucursal {sucursal_id}.")
-            return False
-    except Exception as e:
-        logger.error(f"❌ Error en actualizar_sucursal: {str(e)}")
-        return False
-
-
-# ✅ Función para manejar solicitudes de franquicias en Lambda
-def manejar_franquicias(event, context):
-    """Maneja las solicitudes de franquicias desde API Gateway."""
-    logger.info(f"📩 Evento recibido: {json.dumps(event)}")
-
-    repo = DynamoRepository(table_name="Franquicias")
-    http_method = event.get("httpMethod")
-
-    if http_method == "GET":
-        return manejar_get(event, repo)
-
-    if http_method == "POST":
-        return manejar_post(event, repo)
-
-    if http_method == "PUT":
-        return manejar_put(event, repo)
-
-    return response_json(405, {"error": "Método no permitido"})
-
-def manejar_get(event, repo):
-    """Manejo del método GET para obtener una franquicia por ID."""
-    query_params = event.get("queryStringParameters", {})
-    franquicia_id = query_params.get("franquicia_id")
-
-    if not franquicia_id:
-        return response_json(400, {"error": "Falta el parámetro franquicia_id"})
-
-    franquicia = repo.get_item({"FranquiciaID": franquicia_id})
-    return response_json(200, franquicia) if franquicia else response_json(404, {"error": "Franquicia no encontrada"})
-
-def manejar_post(event, repo):
-    """Manejo del método POST para crear una nueva franquicia."""
-    try:
-        body = json.loads(event.get("body", "{}"))
-        nombre = body.get("nombre")
-
-        if not nombre:
-            return response_json(400, {"error": "El campo 'nombre' es obligatorio."})
-
-        nueva_franquicia = {
-            "FranquiciaID": str(uuid.uuid4()),
-            "Nombre": nombre,
-            "Sucursales": []
-        }
-
-        return response_json(201, nueva_franquicia) if repo.put_item(nueva_franquicia) else response_json(500, {"error": "Error al crear la franquicia."})
-
-    except json.JSONDecodeError:
-        return response_json(400, {"error": "Formato JSON inválido en el cuerpo de la solicitud."})
-    
-def manejar_put(event, repo):
-    """Manejo del método PUT para actualizar una franquicia existente."""
-    try:
-        body = json.loads(event.get("body", "{}"))
-        franquicia_id = body.get("franquicia_id")
-        nuevo_nombre = body.get("nombre")
-
-        if not franquicia_id or not nuevo_nombre:
-            return response_json(400, {"error": "Se requieren 'franquicia_id' y 'nombre'."})
-
-        actualizado = repo.actualizar_franquicia(franquicia_id, nuevo_nombre)
-
-        return response_json(200, {"message": "Franquicia actualizada correctamente."}) if actualizado else response_json(404, {"error": "Franquicia no encontrada."})
-
-    except json.JSONDecodeError:
-        return response_json(400, {"error": "Formato JSON inválido en el cuerpo de la solicitud."})
-    
-def response_json(status_code, body):
-    """Genera una respuesta HTTP con código de estado y cuerpo JSON."""
-    return {
-        "statusCode": status_code,
-        "headers": {"Content-Type": "application/json"},
-        "body": json.dumps(body)
-    }
+import os
+import hmac
+import json
+import uuid
+import logging
+from core.campos import parsear_campos
+from core.paginacion import parsear_limite, codificar_cursor, decodificar_cursor
+from core.respuestas import respuesta_http, etiqueta, coincide_etag
+from core.rutas import obtener_cuerpo, obtener_cabecera
+from repositories.dynamo_repository import ItemDemasiadoGrande, obtener_repositorio
+from services.sucursal_service import MENSAJE_ITEM_GRANDE
+
+# Configuración de logs
+logger = logging.getLogger(__name__)
+
+repo = obtener_repositorio("Franquicias")
+
+# Listado de administración (GET /franquicias?modo=admin): requiere la cabecera X-Admin-Token con este valor
+TOKEN_ADMINISTRACION = os.environ.get("ADMIN_TOKEN", "")
+SEGMENTOS_ESCANEO = int(os.environ.get("SEGMENTOS_ESCANEO", "8"))
+
+# ✅ Función para manejar solicitudes de franquicias en Lambda
+def manejar_franquicias(event, context):
+    """Maneja las solicitudes de franquicias desde API Gateway."""
+    http_method = event.get("httpMethod")
+
+    if http_method == "GET":
+        return manejar_get(event, repo)
+
+    if http_method == "POST":
+        return manejar_post(event, repo)
+
+    if http_method == "PUT":
+        return manejar_put(event, repo)
+
+    return respuesta_http(405, {"error": "Método no permitido"})
+
+def manejar_get(event, repo):
+    """Manejo del método GET para obtener una franquicia por ID, varias con ids=a,b,c o el listado paginado.
+
+    fields=Nombre,Sucursales[*].Nombre limita los atributos leídos y retornados.
+    """
+    query_params = event.get("queryStringParameters") or {}
+    path_params = event.get("pathParameters") or {}
+    franquicia_id = path_params.get("franquicia_id") or query_params.get("franquicia_id")
+
+    try:
+        campos = parsear_campos(query_params.get("fields"))
+    except ValueError as e:
+        return respuesta_http(400, {"error": str(e)})
+
+    if query_params.get("ids"):
+        return manejar_get_varias(query_params["ids"], repo, campos)
+
+    if not franquicia_id:
+        return manejar_listado(event, query_params, repo)
+
+    # GET condicional: con If-None-Match basta leer la versión para responder 304
+    if_none_match = obtener_cabecera(event, "If-None-Match")
+    if if_none_match:
+        version = repo.obtener_version(franquicia_id)
+        if version is False:
+            return respuesta_http(404, {"error": "Franquicia no encontrada"})
+        if version is not None:
+            etag = etiqueta(franquicia_id, version, "franquicia", campos)
+            if coincide_etag(if_none_match, etag):
+                return respuesta_http(304, None, {"ETag": etag})
+
+    franquicia = repo.get_item({"FranquiciaID": franquicia_id}, campos)
+    if not franquicia:
+        return respuesta_http(404, {"error": "Franquicia no encontrada"})
+    return respuesta_http(200, franquicia, {"ETag": etiqueta(franquicia_id, franquicia.get("Version", 0), "franquicia", campos)})
+
+def manejar_get_varias(ids_param, repo, campos=None):
+    """Obtiene varias franquicias en una sola invocación usando BatchGetItem."""
+    ids = list(dict.fromkeys(i.strip() for i in ids_param.split(",") if i.strip()))
+    if not ids:
+        return respuesta_http(400, {"error": "El parámetro ids no contiene identificadores"})
+
+    franquicias = repo.batch_get_items([{"FranquiciaID": i} for i in ids], campos)
+    if franquicias is None:
+        return respuesta_http(500, {"error": "Error al obtener las franquicias."})
+
+    por_id = {f["FranquiciaID"]: f for f in franquicias}
+    return respuesta_http(200, {
+        "franquicias": [por_id[i] for i in ids if i in por_id],
+        "no_encontradas": [i for i in ids if i not in por_id]
+    })
+
+def manejar_listado(event, query_params, repo):
+    """Lista resúmenes de franquicias: una página con limit/cursor o, con modo=admin, todas con un escaneo paralelo."""
+    if query_params.get("modo") == "admin":
+        if not es_administrador(event):
+            return respuesta_http(403, {"error": "El listado de administración requiere un X-Admin-Token válido."})
+        franquicias = repo.escanear_franquicias(SEGMENTOS_ESCANEO)
+        if franquicias is None:
+            return respuesta_http(500, {"error": "Error al listar las franquicias."})
+        return respuesta_http(200, {"franquicias": franquicias, "total": len(franquicias)})
+
+    try:
+        limite = parsear_limite(query_params.get("limit"))
+        inicio = decodificar_cursor(query_params.get("cursor"))
+    except ValueError as e:
+        return respuesta_http(400, {"error": str(e)})
+    if inicio is not None and (not isinstance(inicio, dict) or set(inicio) != set(repo.CLAVES_TABLA)):
+        return respuesta_http(400, {"error": "El parámetro 'cursor' no es válido."})
+
+    pagina = repo.listar_franquicias(limite, inicio)
+    if pagina is None:
+        return respuesta_http(500, {"error": "Error al listar las franquicias."})
+    franquicias, siguiente = pagina
+    return respuesta_http(200, {"franquicias": franquicias, "cursor": codificar_cursor(siguiente)})
+
+def es_administrador(event) -> bool:
+    """Compara la cabecera X-Admin-Token con ADMIN_TOKEN; sin token configurado el modo admin está desactivado."""
+    token = obtener_cabecera(event, "X-Admin-Token")
+    return bool(TOKEN_ADMINISTRACION) and token is not None and hmac.compare_digest(str(token), TOKEN_ADMINISTRACION)
+
+def manejar_post(event, repo):
+    """Manejo del método POST para crear una nueva franquicia."""
+    try:
+        body = obtener_cuerpo(event)
+        nombre = body.get("nombre")
+
+        if not nombre:
+            return respuesta_http(400, {"error": "El campo 'nombre' es obligatorio."})
+
+        nueva_franquicia = {
+            "FranquiciaID": str(uuid.uuid4()),
+            "Nombre": nombre,
+            "Sucursales": []
+        }
+
+        return respuesta_http(201, nueva_franquicia) if repo.put_item(nueva_franquicia) else respuesta_http(500, {"error": "Error al crear la franquicia."})
+
+    except json.JSONDecodeError:
+        return respuesta_http(400, {"error": "Formato JSON inválido en el cuerpo de la solicitud."})
+    
+def manejar_put(event, repo):
+    """Manejo del método PUT para actualizar una franquicia existente."""
+    try:
+        body = obtener_cuerpo(event)
+        path_params = event.get("pathParameters") or {}
+        franquicia_id = path_params.get("franquicia_id") or body.get("franquicia_id")
+        nuevo_nombre = body.get("nombre")
+
+        if not franquicia_id or not nuevo_nombre:
+            return respuesta_http(400, {"error": "Se requieren 'franquicia_id' y 'nombre'."})
+
+        actualizado = repo.actualizar_nombre(franquicia_id, nuevo_nombre)
+
+        if actualizado is None:
+            return respuesta_http(500, {"error": "Error al actualizar la franquicia."})
+        return respuesta_http(200, {"message": "Franquicia actualizada correctamente."}) if actualizado else respuesta_http(404, {"error": "Franquicia no encontrada."})
+
+    except json.JSONDecodeError:
+        return respuesta_http(400, {"error": "Formato JSON inválido en el cuerpo de la solicitud."})
+    except ItemDemasiadoGrande:
+        return respuesta_http(413, {"error": MENSAJE_ITEM_GRANDE})
+    
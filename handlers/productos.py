@@ -1,110 +1,136 @@
-import json
-from http import HTTPStatus
-from services.producto_service import ProductoService
-from repositories.dynamo_repository import DynamoRepository
-
-# Inicialización del servicio con DynamoDB como repositorio
-repositorio_producto = DynamoRepository("Franquicias")
-producto_service = ProductoService(repositorio_producto)
-
-def response_json(status, message):
-    """Genera una respuesta JSON estándar con encabezados."""
-    return {
-        "statusCode": status,
-        "headers": {"Content-Type": "application/json"},
-        "body": json.dumps(message)
-    }
-
-def manejar_productos(event, context):
-    """
-    Maneja las operaciones CRUD de productos dentro de sucursales.
-
-    Parámetros:
-    - event: Dict con la información de la solicitud HTTP.
-    - context: Contexto de AWS Lambda.
-
-    Retorna:
-    - Dict con el código de estado y el cuerpo de la respuesta.
-    """
-    metodo = event.get("httpMethod", "").upper()
-    ruta = event.get("path", "")
-
-    # En POST, PUT y DELETE, los datos están en el body
-    if metodo in ["POST", "PUT", "DELETE"]:
-        try:
-            params = json.loads(event.get("body", "{}"))
-        except json.JSONDecodeError:
-            return response_json(HTTPStatus.BAD_REQUEST, {"error": "El cuerpo de la solicitud no es un JSON válido"})
-    else:
-        params = event.get("queryStringParameters") or {}
-
-    # 🔹 Manejo de ruta específica: "/productos/mas_stock"
-    if metodo == "GET" and ruta == "/productos/mas_stock":
-        return validar_y_ejecutar(
-            producto_service.obtener_producto_mas_stock, 
-            params, 
-            ["franquicia_id"]
-        )
-
-    # 🔹 Manejo de operaciones CRUD estándar
-    handlers = {
-        "GET": lambda: validar_y_ejecutar(producto_service.obtener_producto, params, ["franquicia_id", "sucursal_id", "producto_id"]),
-        "POST": lambda: validar_y_ejecutar(producto_service.agregar_producto, params, ["franquicia_id", "sucursal_id", "nombre"]),
-        "PUT": lambda: validar_y_ejecutar(producto_service.actualizar_producto, params, ["franquicia_id", "sucursal_id", "producto_id", "stock"]),
-        "DELETE": lambda: validar_y_ejecutar(producto_service.eliminar_producto, params, ["franquicia_id", "sucursal_id", "producto_id"])
-    }
-
-    return handlers.get(metodo, metodo_no_soportado)()
-
-def actualizar_producto(self, franquicia_id: str, sucursal_id: str, producto_id: str, nuevo_nombre: str) -> bool:
-    """Actualiza el nombre de un producto dentro de una sucursal en DynamoDB."""
-    franquicia = self.get_item({"FranquiciaID": franquicia_id})
-    if not franquicia:
-        return False
-
-    sucursales = franquicia.get("Sucursales", [])
-    sucursal = next((s for s in sucursales if s["SucursalID"] == sucursal_id), None)
-
-    if not sucursal:
-        return False
-
-    productos = sucursal.get("Productos", [])
-    index = next((i for i, p in enumerate(productos) if p["ProductoID"] == producto_id), -1)
-
-    if index == -1:
-        return False
-
-    update_expression = f"SET Sucursales[{sucursales.index(sucursal)}].Productos[{index}].Nombre = :nuevo_nombre"
-    expression_values = {":nuevo_nombre": nuevo_nombre}
-
-    resultado = self.update_item(
-        key={"FranquiciaID": franquicia_id},
-        update_expression=update_expression,
-        expression_values=expression_values
-    )
-    return resultado is not None
-
-def validar_y_ejecutar(func, params, required_params):
-    """Valida parámetros requeridos y ejecuta la función con manejo de errores."""
-    faltantes = [param for param in required_params if param not in params or not params[param]]
-    if faltantes:
-        return response_json(HTTPStatus.BAD_REQUEST, {"error": f"Faltan parámetros: {', '.join(faltantes)}"})
-
-    # Pasar todos los parámetros disponibles
-    argumentos = {k: params[k] for k in required_params}
-    if "nombre" in params:
-        argumentos["nombre"] = params["nombre"]
-    if "stock" in params:
-        argumentos["stock"] = params["stock"]
-
-    try:
-        resultado = func(**argumentos)
-        return response_json(HTTPStatus.OK, {"mensaje": "Operación exitosa", "resultado": resultado})
-    except AttributeError as e:
-        return response_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Error de atributo en el servicio", "detalle": str(e)})
-    except Exception as e:
-        return response_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Error interno en el servidor", "detalle": str(e)})
-
-def metodo_no_soportado():
-    """Respuesta estándar para métodos HTTP no soportados."""
-    return response_json(HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Método no permitido"})
+import json
+from http import HTTPStatus
+from core.campos import parsear_campos
+from core.respuestas import respuesta_http, a_http
+from core.rutas import obtener_cuerpo
+from services.producto_service import ProductoService
+from repositories.dynamo_repository import obtener_repositorio
+
+# Inicialización del servicio con DynamoDB como repositorio
+repositorio_producto = obtener_repositorio("Franquicias")
+producto_service = ProductoService(repositorio_producto)
+
+def obtener_parametros(event):
+    """
+    Reúne los parámetros de la solicitud: query string en GET, cuerpo en el resto,
+    más los parámetros de ruta (/franquicias/{franquicia_id}/sucursales/{sucursal_id}/...).
+
+    El cuerpo se decodifica una sola vez por evento (ver core.rutas.obtener_cuerpo).
+    """
+    if event.get("httpMethod", "").upper() in ["POST", "PUT", "DELETE"]:
+        params = dict(obtener_cuerpo(event))
+    else:
+        params = dict(event.get("queryStringParameters") or {})
+    params.update(event.get("pathParameters") or {})
+    return params
+
+def manejar_productos(event, context):
+    """
+    Maneja las operaciones CRUD de productos dentro de sucursales.
+
+    Parámetros:
+    - event: Dict con la información de la solicitud HTTP.
+    - context: Contexto de AWS Lambda.
+
+    Retorna:
+    - Dict con el código de estado y el cuerpo de la respuesta.
+    """
+    metodo = event.get("httpMethod", "").upper()
+    try:
+        params = obtener_parametros(event)
+    except json.JSONDecodeError:
+        return respuesta_http(HTTPStatus.BAD_REQUEST, {"error": "El cuerpo de la solicitud no es un JSON válido"})
+
+    handlers = {
+        "GET": lambda: obtener_producto(params),
+        "POST": lambda: validar_y_ejecutar(producto_service.agregar_producto, params, ["franquicia_id", "sucursal_id", "nombre"]),
+        "PUT": lambda: validar_y_ejecutar(producto_service.actualizar_producto, params, ["franquicia_id", "sucursal_id", "producto_id", "stock"]),
+        "DELETE": lambda: validar_y_ejecutar(producto_service.eliminar_producto, params, ["franquicia_id", "sucursal_id", "producto_id"])
+    }
+
+    return handlers.get(metodo, metodo_no_soportado)()
+
+def obtener_producto(params):
+    """GET de un producto; fields=Nombre,Stock limita los atributos leídos y retornados."""
+    try:
+        params["campos"] = parsear_campos(params.get("fields"))
+    except ValueError as e:
+        return respuesta_http(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+    return validar_y_ejecutar(
+        producto_service.obtener_producto,
+        params,
+        ["franquicia_id", "sucursal_id", "producto_id"],
+        opcionales=("campos",)
+    )
+
+def manejar_listado_productos(event, context):
+    """GET /franquicias/{franquicia_id}/sucursales/{sucursal_id}/productos: página de productos con limit/cursor."""
+    params = obtener_parametros(event)
+    try:
+        params["campos"] = parsear_campos(params.get("fields"))
+    except ValueError as e:
+        return respuesta_http(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+    params["limite"] = params.get("limit")
+    return validar_y_ejecutar(
+        producto_service.listar_productos,
+        params,
+        ["franquicia_id", "sucursal_id"],
+        opcionales=("limite", "cursor", "campos")
+    )
+
+def manejar_mas_stock(event, context):
+    """GET /productos/mas_stock: productos con mayor stock de una franquicia o sucursal."""
+    return validar_y_ejecutar(
+        producto_service.obtener_producto_mas_stock,
+        obtener_parametros(event),
+        ["franquicia_id"],
+        opcionales=("top", "sucursal_id")
+    )
+
+def manejar_ajuste_stock(event, context):
+    """POST /productos/stock: ajuste atómico de stock con delta."""
+    try:
+        params = obtener_parametros(event)
+    except json.JSONDecodeError:
+        return respuesta_http(HTTPStatus.BAD_REQUEST, {"error": "El cuerpo de la solicitud no es un JSON válido"})
+    return validar_y_ejecutar(
+        producto_service.ajustar_stock,
+        params,
+        ["franquicia_id", "sucursal_id", "producto_id", "delta"]
+    )
+
+def manejar_lote(event, context):
+    """POST /productos/lote: carga masiva de productos en una sucursal."""
+    try:
+        params = obtener_parametros(event)
+    except json.JSONDecodeError:
+        return respuesta_http(HTTPStatus.BAD_REQUEST, {"error": "El cuerpo de la solicitud no es un JSON válido"})
+    return validar_y_ejecutar(
+        producto_service.guardar_productos,
+        params,
+        ["franquicia_id", "sucursal_id", "productos"]
+    )
+
+def validar_y_ejecutar(func, params, required_params, opcionales=("nombre", "stock")):
+    """Valida parámetros requeridos y ejecuta la función con manejo de errores."""
+    faltantes = [param for param in required_params if param not in params or not params[param]]
+    if faltantes:
+        return respuesta_http(HTTPStatus.BAD_REQUEST, {"error": f"Faltan parámetros: {', '.join(faltantes)}"})
+
+    # Pasar todos los parámetros disponibles
+    argumentos = {k: params[k] for k in required_params}
+    for opcional in opcionales:
+        if opcional in params:
+            argumentos[opcional] = params[opcional]
+
+    try:
+        # El servicio devuelve estado y cuerpo sin serializar: se codifican una sola vez aquí
+        return a_http(func(**argumentos))
+    except AttributeError as e:
+        return respuesta_http(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Error de atributo en el servicio", "detalle": str(e)})
+    except Exception as e:
+        return respuesta_http(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Error interno en el servidor", "detalle": str(e)})
+
+def metodo_no_soportado():
+    """Respuesta estándar para métodos HTTP no soportados."""
+    return respuesta_http(HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Método no permitido"})
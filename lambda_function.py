@@ -1,110 +1,100 @@
-import json
-from handlers.franquicias import manejar_franquicias
-from handlers.sucursales import manejar_sucursales
-from handlers.productos import manejar_productos
-
-def lambda_handler(event, context):
-    """Manejador principal de la API Lambda"""
-
-    # Extraer valores con manejo de errores
-    ruta = event.get("resource", "/").strip()
-    metodo = event.get("httpMethod", "").strip().upper()
-
-    # Logs para depuración sin emojis para evitar errores de codificación
-    print(f"Evento recibido: {json.dumps(event, indent=2)}")
-    print(f"Ruta recibida: {ruta}, Método recibido: {metodo}")
-
-    # Métodos permitidos
-    metodos_permitidos = {"GET", "POST", "PUT", "DELETE"}
-
-    if not metodo:
-        print("ERROR: No se recibió un método HTTP válido.")
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"error": "Método HTTP no especificado."}),
-        }
-
-    if metodo not in metodos_permitidos:
-        print(f"ERROR: Método '{metodo}' no permitido.")
-        return {
-            "statusCode": 405,
-            "body": json.dumps({"error": "Método no soportado."}),
-        }
-
-    # ✅ Ruta principal de salud
-    if ruta == "/":
-        return {
-            "statusCode": 200,
-            "body": json.dumps({"message": "API funcionando correctamente"}),
-        }
-
-    # Manejo de sucursales
-    elif ruta == "/sucursales":
-        if metodo == "PUT":
-            try:
-                print(f"Ejecutando manejar_sucursales... {manejar_sucursales}")  # Verificar importación
-                
-                raw_body = event.get("body", "{}")
-                body = json.loads(raw_body) if isinstance(raw_body, str) else raw_body
-
-                franquicia_id = body.get("franquicia_id")
-                sucursal_id = body.get("sucursal_id")
-                nuevo_nombre = body.get("nuevo_nombre")
-
-                errores = {}
-                if not franquicia_id:
-                    errores["franquicia_id"] = "Se requiere 'franquicia_id'"
-                if not sucursal_id:
-                    errores["sucursal_id"] = "Se requiere 'sucursal_id'"
-                if not nuevo_nombre:
-                    errores["nuevo_nombre"] = "Se requiere 'nuevo_nombre'"
-
-                if errores:
-                    print(f"Errores detectados: {errores}")
-                    return {
-                        "statusCode": 400,
-                        "headers": {"Content-Type": "application/json"},
-                        "body": json.dumps({"error": errores}),
-                    }
-
-                # Llamada a manejar_sucursales con try-except para capturar errores
-                try:
-                    respuesta = manejar_sucursales(event, context)
-                    print(f"Respuesta de manejar_sucursales: {respuesta}")
-                    return respuesta
-                except Exception as e:
-                    print(f"ERROR al ejecutar manejar_sucursales: {str(e)}")
-                    return {
-                        "statusCode": 500,
-                        "headers": {"Content-Type": "application/json"},
-                        "body": json.dumps({"error": "Error interno en manejar_sucursales."}),
-                    }
-                    
-            except json.JSONDecodeError:
-                return {
-                    "statusCode": 400,
-                    "headers": {"Content-Type": "application/json"},
-                    "body": json.dumps({"error": "Formato JSON inválido."}),
-                }
-
-        return manejar_sucursales(event, context)
-        
-        # Si es otro método, seguir con el flujo normal
-        return manejar_sucursales(event, context)
-
-    # ✅ Manejo de productos
-    elif ruta in ["/productos", "/productos/mas_stock"]:
-        return manejar_productos(event, context)
-
-    # ✅ Manejo de franquicias
-    elif ruta == "/franquicias":
-        respuesta = manejar_franquicias(event, context)
-        print(f"Respuesta de manejar_franquicias: {respuesta}")
-        return respuesta
-
-    # ❌ Si la ruta no se encuentra
-    print(f"ERROR: Ruta '{ruta}' no encontrada.")
-    return {
-        "statusCode": 404,
-        "body": json.dumps({"error": "Ruta no encontrada"}),
-    }
+import json
+import logging
+from core.metricas import iniciar_metricas, agregar_propiedad, emitir_metricas
+from core.perfilado import debe_perfilar, perfilar
+from core.registro import configurar_registro, iniciar_solicitud, registrar_carga
+from core.respuestas import respuesta_http, comprimir
+from core.rutas import Router, obtener_cuerpo
+from handlers.franquicias import manejar_franquicias
+from handlers.sucursales import manejar_sucursales
+from handlers.productos import manejar_productos, manejar_listado_productos, manejar_mas_stock, manejar_ajuste_stock, manejar_lote
+
+configurar_registro()
+logger = logging.getLogger(__name__)
+
+# Métodos permitidos
+METODOS_PERMITIDOS = {"GET", "POST", "PUT", "DELETE"}
+
+def salud(event, context):
+    """Ruta principal de salud."""
+    return respuesta_http(200, {"message": "API funcionando correctamente"})
+
+# ✅ Tabla de rutas: se compila una sola vez por contenedor
+router = Router()
+router.agregar(["GET"], "/", salud)
+router.agregar(["GET", "POST", "PUT"], "/franquicias", manejar_franquicias)
+router.agregar(["GET", "PUT"], "/franquicias/{franquicia_id}", manejar_franquicias)
+router.agregar(METODOS_PERMITIDOS, "/sucursales", manejar_sucursales)
+router.agregar(["GET", "POST"], "/franquicias/{franquicia_id}/sucursales", manejar_sucursales)
+router.agregar(["PUT", "DELETE"], "/franquicias/{franquicia_id}/sucursales/{sucursal_id}", manejar_sucursales)
+router.agregar(METODOS_PERMITIDOS, "/productos", manejar_productos)
+router.agregar(["GET"], "/productos/mas_stock", manejar_mas_stock)
+router.agregar(["POST"], "/productos/stock", manejar_ajuste_stock)
+router.agregar(["POST"], "/productos/lote", manejar_lote)
+router.agregar(["POST"], "/franquicias/{franquicia_id}/sucursales/{sucursal_id}/productos", manejar_productos)
+router.agregar(["GET"], "/franquicias/{franquicia_id}/sucursales/{sucursal_id}/productos", manejar_listado_productos)
+router.agregar(["GET", "PUT", "DELETE"], "/franquicias/{franquicia_id}/sucursales/{sucursal_id}/productos/{producto_id}", manejar_productos)
+
+def lambda_handler(event, context):
+    """Manejador principal de la API Lambda"""
+    if debe_perfilar(event):
+        return perfilar(atender_solicitud, event, context)
+    return atender_solicitud(event, context)
+
+def atender_solicitud(event, context):
+    """Resuelve la ruta de la solicitud y la despacha a su handler."""
+
+    # Extraer valores con manejo de errores
+    recurso = (event.get("resource") or "").strip()
+    metodo = (event.get("httpMethod") or "").strip().upper()
+
+    # Una línea compacta por solicitud; el evento completo solo en DEBUG o si la solicitud fue muestreada
+    iniciar_solicitud(event, context)
+    logger.info("Solicitud %s %s", metodo, recurso or event.get("path"))
+    registrar_carga(logger, "Evento recibido", event)
+
+    if not metodo:
+        logger.warning("No se recibió un método HTTP válido.")
+        return respuesta_http(400, {"error": "Método HTTP no especificado."})
+
+    if metodo not in METODOS_PERMITIDOS:
+        logger.warning("Método '%s' no permitido.", metodo)
+        return respuesta_http(405, {"error": "Método no soportado."})
+
+    plantilla, handler, parametros = router.resolver(metodo, recurso, event.get("path"))
+
+    # ❌ Si la ruta no se encuentra
+    if plantilla is None:
+        logger.warning("Ruta '%s' no encontrada.", recurso or event.get("path"))
+        return respuesta_http(404, {"error": "Ruta no encontrada"})
+
+    if handler is None:
+        logger.warning("Método '%s' no permitido en '%s'.", metodo, plantilla)
+        return respuesta_http(405, {"error": "Método no soportado."})
+
+    # El cuerpo se decodifica una sola vez; los handlers lo leen con obtener_cuerpo
+    try:
+        obtener_cuerpo(event)
+    except json.JSONDecodeError:
+        return respuesta_http(400, {"error": "Formato JSON inválido."})
+
+    if parametros:
+        event["pathParameters"] = {**(event.get("pathParameters") or {}), **parametros}
+
+    # Latencia por ruta y por operación de DynamoDB, emitidas como EMF al terminar
+    iniciar_metricas(plantilla, metodo)
+    agregar_propiedad("franquicia_id", obtener_franquicia_id(event))
+    status_code = 500
+    try:
+        respuesta = comprimir(handler(event, context), event)
+        status_code = respuesta.get("statusCode", 200)
+        return respuesta
+    finally:
+        emitir_metricas(status_code)
+
+def obtener_franquicia_id(event):
+    """ID de franquicia de la solicitud (ruta, query string o cuerpo), para ubicar las franquicias costosas."""
+    for origen in (event.get("pathParameters"), event.get("queryStringParameters"), event.get("cuerpo")):
+        if isinstance(origen, dict) and origen.get("franquicia_id"):
+            return origen["franquicia_id"]
+    return None
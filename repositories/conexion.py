@@ -0,0 +1,46 @@
+import os
+import threading
+import boto3
+from botocore.config import Config
+from core.metricas import instrumentar_cliente
+
+# Configuración del cliente HTTP de DynamoDB compartido por todo el proceso.
+# Los tiempos cortos acotan la latencia de cola; el modo de reintento adaptativo
+# agrega limitación de tasa del lado del cliente cuando DynamoDB responde con throttling.
+CONFIG_DYNAMODB = Config(
+    connect_timeout=float(os.environ.get("DYNAMODB_CONNECT_TIMEOUT", "1")),
+    read_timeout=float(os.environ.get("DYNAMODB_READ_TIMEOUT", "3")),
+    max_pool_connections=int(os.environ.get("DYNAMODB_MAX_POOL", "50")),
+    retries={"mode": "adaptive", "max_attempts": int(os.environ.get("DYNAMODB_MAX_INTENTOS", "4"))},
+    tcp_keepalive=True
+)
+
+_recurso = None
+_cliente = None
+_lock = threading.Lock()
+
+def obtener_recurso_dynamodb():
+    """Retorna el recurso de DynamoDB del proceso, creándolo una sola vez.
+
+    Todas las tablas y repositorios comparten su cliente y, con él, el pool de
+    conexiones HTTP: el handshake TLS se paga una vez por contenedor.
+    """
+    global _recurso
+    if _recurso is None:
+        with _lock:
+            if _recurso is None:
+                recurso = boto3.session.Session().resource("dynamodb", config=CONFIG_DYNAMODB)
+                instrumentar_cliente(recurso.meta.client)
+                _recurso = recurso
+    return _recurso
+
+def obtener_cliente_dynamodb():
+    """Retorna el cliente de bajo nivel del proceso (sin conversión a tipos de Python)."""
+    global _cliente
+    if _cliente is None:
+        with _lock:
+            if _cliente is None:
+                cliente = boto3.session.Session().client("dynamodb", config=CONFIG_DYNAMODB)
+                instrumentar_cliente(cliente)
+                _cliente = cliente
+    return _cliente
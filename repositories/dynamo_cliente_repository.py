@@ -0,0 +1,71 @@
+import base64
+import logging
+from typing import Optional, Dict, Any, List
+from botocore.exceptions import BotoCoreError, ClientError
+from core.campos import proyectar
+from repositories.conexion import obtener_cliente_dynamodb
+from repositories.dynamo_repository import DynamoRepository, CacheLRU
+
+logger = logging.getLogger(__name__)
+
+def _numero(texto: str):
+    """Convierte un número de DynamoDB a int si es entero y a float en otro caso."""
+    try:
+        return int(texto)
+    except ValueError:
+        valor = float(texto)
+        return int(valor) if valor.is_integer() else valor
+
+def _binario(dato: bytes) -> str:
+    return base64.b64encode(dato).decode("ascii")
+
+_DESERIALIZADORES = {
+    "S": lambda dato: dato,
+    "N": _numero,
+    "BOOL": lambda dato: dato,
+    "NULL": lambda dato: None,
+    "M": lambda dato: {k: deserializar(v) for k, v in dato.items()},
+    "L": lambda dato: [deserializar(v) for v in dato],
+    "SS": list,
+    "NS": lambda dato: [_numero(n) for n in dato],
+    "B": _binario,
+    "BS": lambda dato: [_binario(b) for b in dato],
+}
+
+def deserializar(valor: Dict[str, Any]):
+    """Convierte un AttributeValue del cliente de bajo nivel en tipos listos para JSON."""
+    for tipo, dato in valor.items():
+        return _DESERIALIZADORES[tipo](dato)
+
+def deserializar_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: deserializar(v) for k, v in item.items()}
+
+class ClienteDynamoRepository(DynamoRepository):
+    """Repositorio cuyas lecturas usan el cliente de bajo nivel.
+
+    Evita el paso por Decimal del recurso de boto3 y el recorrido adicional de
+    convert_decimal: cada ítem se deserializa en una sola pasada. Las escrituras
+    siguen usando el recurso.
+    """
+
+    def __init__(self, table_name: str, cache: Optional[CacheLRU] = None):
+        super().__init__(table_name, cache)
+        self.cliente = obtener_cliente_dynamodb()
+
+    def _leer_item(self, key: dict, campos: Optional[Dict[str, dict]] = None):
+        """Lee un ítem con GetItem del cliente de bajo nivel."""
+        try:
+            response = self.cliente.get_item(TableName=self.table.name, Key=_serializar_clave(key), **self._proyeccion(campos))
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Error al obtener ítem de DynamoDB: {str(e)}")
+            return None
+        item = response.get("Item")
+        return proyectar(deserializar_item(item), campos) if item else None
+
+    def _leer_varios(self, keys: List[dict], campos: Optional[Dict[str, dict]] = None) -> Optional[List[Dict[str, Any]]]:
+        """Lee varios ítems con BatchGetItem del cliente de bajo nivel."""
+        items = self._batch_get(self.cliente, [_serializar_clave(key) for key in keys], self._proyeccion(campos))
+        return [proyectar(deserializar_item(item), campos) for item in items] if items is not None else None
+
+def _serializar_clave(key: dict) -> Dict[str, Dict[str, str]]:
+    return {k: {"S": v} for k, v in key.items()}
@@ -1,87 +1,1399 @@
-import boto3
-import logging
-import json
-from decimal import Decimal
-from botocore.exceptions import BotoCoreError, ClientError
-
-# Configuración de logs
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-def convert_decimal(obj):
-    """Convierte objetos Decimal de DynamoDB a tipos serializables."""
-    if isinstance(obj, list):
-        return [convert_decimal(i) for i in obj]
-    elif isinstance(obj, dict):
-        return {k: convert_decimal(v) for k, v in obj.items()}
-    elif isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    return obj
-
-class DynamoRepository:
-    """Clase para interactuar con DynamoDB."""
-
-    def __init__(self, table_name: str):
-        self.dynamodb = boto3.resource("dynamodb")
-        self.table = self.dynamodb.Table(table_name)
-
-    def get_item(self, key: dict):
-        """Obtiene un ítem de la tabla por su clave primaria."""
-        try:
-            response = self.table.get_item(Key=key)
-            item = response.get("Item")
-            return convert_decimal(item) if item else None
-        except (ClientError, BotoCoreError) as e:
-            logger.error(f"Error al obtener ítem de DynamoDB: {str(e)}")
-            return None
-
-    def put_item(self, item: dict):
-        """Inserta un nuevo ítem en la tabla."""
-        try:
-            self.table.put_item(Item=item)
-            logger.info(f"\u2705 Ítem insertado correctamente: {json.dumps(item, indent=2)}")
-            return True
-        except (ClientError, BotoCoreError) as e:
-            logger.error(f"\u274c Error al insertar ítem en DynamoDB: {str(e)}")
-            return False
-        
-    def delete_item(self, key: dict) -> bool:
-        """Elimina un ítem de la tabla."""
-        try:
-            self.table.delete_item(Key=key)
-            logger.info(f"✅ Ítem eliminado correctamente: {key}")
-            return True
-        except (ClientError, BotoCoreError) as e:
-            logger.error(f"❌ Error al eliminar ítem de DynamoDB: {str(e)}")
-            return False
-        
-    def actualizar_franquicia(self, franquicia_id: str, sucursales: list) -> bool:
-        """Actualiza la lista de sucursales de una franquicia en la base de datos."""
-        try:
-            response = self.table.update_item(
-            Key={"FranquiciaID": franquicia_id},
-            UpdateExpression="SET Sucursales = :s",
-            ExpressionAttributeValues={":s": sucursales},
-            ReturnValues="UPDATED_NEW"
-        )
-            return "Attributes" in response
-        except (ClientError, BotoCoreError) as e:
-            logger.error(f"Error al actualizar franquicia en DynamoDB: {str(e)}")
-        return False
-
-    def update_item(self, key: dict, update_expression: str, expression_values: dict):
-        """Actualiza un ítem en la tabla."""
-        try:
-            response = self.table.update_item(
-                Key=key,
-                UpdateExpression=update_expression,
-                ExpressionAttributeValues=expression_values,
-                ReturnValues="UPDATED_NEW"
-            )
-            return convert_decimal(response.get("Attributes", {}))
-        except ClientError as e:
-            logger.error(f"Error en update_item: {e.response['Error']['Message']}")
-            return None
-        except BotoCoreError as e:
-            logger.error(f"Error en update_item (BotoCoreError): {str(e)}")
-            return None
+import os
+import re
+import time
+import random
+import heapq
+import pickle
+import functools
+import threading
+import logging
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Optional, Dict, Any, List, Iterable, Iterator, Callable
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import BotoCoreError, ClientError
+from core.campos import proyectar, expresion_proyeccion
+from core.metricas import contar
+from core.registro import registrar_carga
+from repositories.conexion import obtener_recurso_dynamodb
+
+# Configuración de logs
+logger = logging.getLogger(__name__)
+
+# Concurrencia optimista: intentos de una escritura condicionada cuando otra escritura concurrente
+# ganó la carrera, con backoff exponencial y espera aleatoria (jitter completo) entre intentos
+INTENTOS_CONFLICTO = int(os.environ.get("INTENTOS_CONFLICTO", "5"))
+ESPERA_BASE_CONFLICTO = 0.02
+ESPERA_MAXIMA_CONFLICTO = 0.5
+
+# Operaciones en lote: tamaños máximos de BatchWriteItem/BatchGetItem y backoff para lo no procesado
+TAMANO_LOTE_ESCRITURA = 25
+TAMANO_LOTE_LECTURA = 100
+MAX_REINTENTOS_LOTE = 6
+ESPERA_BASE_LOTE = 0.05
+ESPERA_MAXIMA_LOTE = 2.0
+
+# Máximo de productos por carga en lote en el diseño anidado: toda la franquicia es un solo ítem, limitado
+# a 400 KB por DynamoDB. Las cargas mayores van por el diseño normalizado o por tools/importar.py
+MAX_PRODUCTOS_LOTE_ANIDADO = int(os.environ.get("MAX_PRODUCTOS_LOTE_ANIDADO", "500"))
+
+# Caché de lectura en el contenedor (desactivado si CACHE_TTL_SEGUNDOS es 0)
+CACHE_TTL_SEGUNDOS = float(os.environ.get("CACHE_TTL_SEGUNDOS", "0"))
+CACHE_MAX_ENTRADAS = int(os.environ.get("CACHE_MAX_ENTRADAS", "256"))
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Contador de versión de cada franquicia: toda escritura lo incrementa y alimenta los ETag de las lecturas
+ATRIBUTO_VERSION = "Version"
+NOMBRES_VERSION = {"#version": ATRIBUTO_VERSION}
+VALORES_VERSION = {":uno_version": 1}
+
+# Atributos de cada franquicia en los listados (sin sucursales) y de cada sucursal en los suyos (sin productos)
+ATRIBUTOS_RESUMEN = ("FranquiciaID", "Nombre", ATRIBUTO_VERSION)
+ATRIBUTOS_SUCURSAL = ("SucursalID", "Nombre")
+
+class StockInsuficiente(Exception):
+    """El ajuste dejaría el stock del producto por debajo de cero."""
+
+class ConflictoConcurrencia(Exception):
+    """La escritura siguió perdiendo contra escrituras concurrentes tras agotar los reintentos."""
+
+class ItemDemasiadoGrande(Exception):
+    """La escritura dejaría el ítem por encima del tamaño máximo de DynamoDB (400 KB)."""
+
+def convert_decimal(obj):
+    """Convierte objetos Decimal de DynamoDB a tipos serializables."""
+    if isinstance(obj, list):
+        return [convert_decimal(i) for i in obj]
+    elif isinstance(obj, dict):
+        return {k: convert_decimal(v) for k, v in obj.items()}
+    elif isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    return obj
+
+def _con_version(update_expression: str) -> str:
+    """Agrega el incremento del contador de versión a una UpdateExpression (en su cláusula ADD si ya tiene una)."""
+    if re.search(r"\bADD\s+", update_expression):
+        return re.sub(r"\bADD\s+", "ADD #version :uno_version, ", update_expression, count=1)
+    return f"{update_expression} ADD #version :uno_version"
+
+def _posicion_cursor(inicio: Optional[Dict[str, Any]], clave: str) -> int:
+    """Posición guardada en el cursor de un listado del diseño anidado (0 sin cursor); ValueError si no es válida."""
+    if inicio is None:
+        return 0
+    posicion = inicio.get(clave) if isinstance(inicio, dict) else None
+    if not isinstance(posicion, int) or isinstance(posicion, bool) or posicion < 0:
+        raise ValueError("El parámetro 'cursor' no es válido.")
+    return posicion
+
+def _condicion_version(version: int):
+    """Condición de escritura optimista: la franquicia sigue en la versión leída (0 = aún sin contador)."""
+    if version:
+        return "#version = :version_leida", {":version_leida": version}
+    return "attribute_not_exists(#version)", {}
+
+def _intentos_con_conflicto(descripcion: str) -> Iterator[int]:
+    """Itera los intentos de una escritura optimista.
+
+    Antes de cada reintento cuenta el conflicto y espera un tiempo aleatorio con backoff exponencial;
+    si se agotan los intentos lanza ConflictoConcurrencia.
+    """
+    for intento in range(INTENTOS_CONFLICTO):
+        if intento:
+            contar("ConflictosEscritura")
+            time.sleep(random.uniform(0, min(ESPERA_MAXIMA_CONFLICTO, ESPERA_BASE_CONFLICTO * 2 ** (intento - 1))))
+        yield intento
+    contar("ConflictosEscritura")
+    contar("ConflictosAgotados")
+    logger.warning("⚠️ Conflicto de concurrencia persistente en %s tras %d intentos.", descripcion, INTENTOS_CONFLICTO)
+    raise ConflictoConcurrencia(descripcion)
+
+def crear_repositorio(table_name: str = "Franquicias"):
+    """Crea el repositorio según el modo de almacenamiento configurado en MODO_ALMACENAMIENTO."""
+    cache = CacheLRU(CACHE_TTL_SEGUNDOS, CACHE_MAX_ENTRADAS, CACHE_MAX_BYTES) if CACHE_TTL_SEGUNDOS > 0 else None
+    modo = os.environ.get("MODO_ALMACENAMIENTO", "anidado").strip().lower()
+    if modo == "normalizado":
+        return NormalizedDynamoRepository(os.environ.get("TABLA_NORMALIZADA", f"{table_name}Normalizado"), cache)
+    if modo == "memoria":
+        from repositories.memoria_repository import MemoriaRepository
+        return MemoriaRepository(
+            table_name,
+            float(os.environ.get("LATENCIA_MEMORIA_MS", "0")) / 1000,
+            float(os.environ.get("VARIACION_LATENCIA_MEMORIA_MS", "0")) / 1000
+        )
+    if modo == "sqlite":
+        from repositories.sqlite_repository import SQLiteRepository
+        return SQLiteRepository(os.environ.get("SQLITE_RUTA", "franquicias.db"))
+    if os.environ.get("LECTURA_BAJO_NIVEL", "").strip().lower() in ("1", "true", "si"):
+        from repositories.dynamo_cliente_repository import ClienteDynamoRepository
+        return ClienteDynamoRepository(table_name, cache)
+    return DynamoRepository(table_name, cache)
+
+_repositorios: Dict[str, "DynamoRepository"] = {}
+_repositorios_lock = threading.Lock()
+
+def obtener_repositorio(table_name: str = "Franquicias"):
+    """Retorna el repositorio compartido del proceso para la tabla.
+
+    Todos los handlers usan la misma instancia, por lo que comparten conexión y caché.
+    """
+    if table_name not in _repositorios:
+        with _repositorios_lock:
+            if table_name not in _repositorios:
+                _repositorios[table_name] = crear_repositorio(table_name)
+    return _repositorios[table_name]
+
+class CacheLRU:
+    """Caché en memoria de franquicias leídas, con TTL y expulsión LRU por entradas y por bytes.
+
+    Los valores se guardan serializados con pickle: cada lectura entrega una copia
+    independiente y el tamaño en bytes es exacto.
+    """
+
+    def __init__(self, ttl: float, max_entradas: int, max_bytes: int):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self._entradas: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: str) -> Optional[Dict[str, Any]]:
+        """Retorna una copia del valor si está vigente; None si no está o expiró."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada[0] < time.monotonic():
+                if entrada is not None:
+                    self._quitar(clave)
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            datos = entrada[1]
+        return pickle.loads(datos)
+
+    def contiene(self, clave: str) -> bool:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            return entrada is not None and entrada[0] >= time.monotonic()
+
+    def guardar(self, clave: str, valor: Dict[str, Any]) -> None:
+        datos = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(datos) > self.max_bytes:
+            return
+        with self._lock:
+            if clave in self._entradas:
+                self._quitar(clave)
+            self._entradas[clave] = (time.monotonic() + self.ttl, datos)
+            self._bytes += len(datos)
+            while len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes:
+                self._quitar(next(iter(self._entradas)))
+                self.expulsiones += 1
+
+    def descartar(self, clave: Optional[str]) -> None:
+        with self._lock:
+            if clave in self._entradas:
+                self._quitar(clave)
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "expulsiones": self.expulsiones,
+                "entradas": len(self._entradas),
+                "bytes": self._bytes
+            }
+
+    def _quitar(self, clave: str) -> None:
+        _, datos = self._entradas.pop(clave)
+        self._bytes -= len(datos)
+
+def _invalida_cache(metodo):
+    """Descarta del caché la franquicia afectada por una escritura.
+
+    El primer argumento del método es el ID de la franquicia o un dict con FranquiciaID.
+    """
+    @functools.wraps(metodo)
+    def envoltura(self, objetivo, *args, **kwargs):
+        try:
+            return metodo(self, objetivo, *args, **kwargs)
+        finally:
+            if self.cache is not None:
+                self.cache.descartar(objetivo if isinstance(objetivo, str) else objetivo.get("FranquiciaID"))
+    return envoltura
+
+def _versiona(metodo):
+    """En el diseño normalizado, incrementa la versión del ítem raíz tras una escritura aplicada sobre otro ítem.
+
+    Se incrementa después de escribir: un lector concurrente puede ver datos nuevos con la versión
+    anterior (y volverá a leer), pero nunca una versión nueva con datos viejos.
+    """
+    @functools.wraps(metodo)
+    def envoltura(self, franquicia_id, *args, **kwargs):
+        resultado = metodo(self, franquicia_id, *args, **kwargs)
+        aplicado = any(resultado.values()) if isinstance(resultado, dict) else resultado
+        if aplicado is not None and aplicado is not False:
+            self._incrementar_version(franquicia_id)
+        return resultado
+    return envoltura
+
+class DynamoRepository:
+    """Clase para interactuar con DynamoDB."""
+
+    # Atributos de la clave primaria de la tabla (los que forman ExclusiveStartKey)
+    CLAVES_TABLA = ("FranquiciaID",)
+
+    # Máximo de productos por llamada a guardar_productos (None: sin límite)
+    MAX_PRODUCTOS_POR_LOTE: Optional[int] = MAX_PRODUCTOS_LOTE_ANIDADO
+
+    def __init__(self, table_name: str, cache: Optional[CacheLRU] = None):
+        self.dynamodb = obtener_recurso_dynamodb()
+        self.table = self.dynamodb.Table(table_name)
+        self.cache = cache
+
+    def get_item(self, key: dict, campos: Optional[Dict[str, dict]] = None):
+        """Obtiene un ítem de la tabla por su clave primaria, pasando por el caché si está activo.
+
+        Con `campos` (ver core.campos.parsear_campos) solo se leen y retornan esos atributos;
+        las lecturas parciales no se guardan en caché.
+        """
+        if self.cache is None:
+            return self._leer_item(key, campos)
+        item = self.cache.obtener(key["FranquiciaID"])
+        if item is not None:
+            return proyectar(item, campos)
+        item = self._leer_item(key, campos)
+        if item is not None and not campos:
+            self.cache.guardar(key["FranquiciaID"], item)
+        return item
+
+    def franquicia_existe(self, franquicia_id: str) -> bool:
+        """Verifica si existe una franquicia; una entrada vigente en caché basta."""
+        if self.cache is not None and self.cache.contiene(franquicia_id):
+            return True
+        return self._existe_en_tabla(franquicia_id)
+
+    def obtener_version(self, franquicia_id: str) -> Optional[int]:
+        """Versión actual de la franquicia leyendo solo ese atributo. False si no existe y None ante error."""
+        if self.cache is not None:
+            item = self.cache.obtener(franquicia_id)
+            if item is not None:
+                return int(item.get(ATRIBUTO_VERSION, 0))
+        return self._leer_version(franquicia_id)
+
+    def _leer_version(self, franquicia_id: str) -> Optional[int]:
+        return self._version_de_item({"FranquiciaID": franquicia_id})
+
+    def _version_de_item(self, key: dict) -> Optional[int]:
+        try:
+            response = self.table.get_item(
+                Key=key,
+                ProjectionExpression=f"{next(iter(key))}, #version",
+                ExpressionAttributeNames=NOMBRES_VERSION
+            )
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Error al obtener versión en DynamoDB: {str(e)}")
+            return None
+        if "Item" not in response:
+            return False
+        return int(response["Item"].get(ATRIBUTO_VERSION, 0))
+
+    def batch_get_items(self, keys: List[dict], campos: Optional[Dict[str, dict]] = None) -> Optional[List[Dict[str, Any]]]:
+        """Obtiene varios ítems; solo se consultan en DynamoDB los que no están en caché.
+
+        Las claves que no existen simplemente no aparecen en el resultado.
+        """
+        if self.cache is None:
+            return self._leer_varios(keys, campos)
+
+        encontrados, faltantes = [], []
+        for key in keys:
+            item = self.cache.obtener(key["FranquiciaID"])
+            if item is None:
+                faltantes.append(key)
+            else:
+                encontrados.append(proyectar(item, campos))
+
+        leidos = self._leer_varios(faltantes, campos) if faltantes else []
+        if leidos is None:
+            return None
+        if not campos:
+            for item in leidos:
+                self.cache.guardar(item["FranquiciaID"], item)
+        return encontrados + leidos
+
+    def _leer_item(self, key: dict, campos: Optional[Dict[str, dict]] = None):
+        """Lee un ítem directamente de la tabla, proyectando los atributos de primer nivel de `campos`."""
+        try:
+            response = self.table.get_item(Key=key, **self._proyeccion(campos))
+            item = response.get("Item")
+            return proyectar(convert_decimal(item), campos) if item else None
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Error al obtener ítem de DynamoDB: {str(e)}")
+            return None
+
+    def _existe_en_tabla(self, franquicia_id: str) -> bool:
+        """Verifica si existe una franquicia leyendo solo su clave."""
+        try:
+            response = self.table.get_item(Key={"FranquiciaID": franquicia_id}, ProjectionExpression="FranquiciaID")
+            return "Item" in response
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Error al verificar franquicia en DynamoDB: {str(e)}")
+            return False
+
+    @_invalida_cache
+    def put_item(self, item: dict):
+        """Inserta un nuevo ítem en la tabla (con versión 1 si no trae una)."""
+        try:
+            self.table.put_item(Item={ATRIBUTO_VERSION: 1, **item})
+            logger.info("✅ Ítem insertado correctamente: %s", item.get("FranquiciaID"))
+            registrar_carga(logger, "Ítem insertado", item)
+            return True
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"❌ Error al insertar ítem en DynamoDB: {str(e)}")
+            return False
+
+    @_invalida_cache
+    def delete_item(self, key: dict) -> bool:
+        """Elimina un ítem de la tabla."""
+        try:
+            self.table.delete_item(Key=key)
+            logger.info("✅ Ítem eliminado correctamente: %s", key)
+            return True
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"❌ Error al eliminar ítem de DynamoDB: {str(e)}")
+            return False
+
+    @_invalida_cache
+    def actualizar_franquicia(self, franquicia_id: str, sucursales: list) -> bool:
+        """Actualiza la lista de sucursales de una franquicia en la base de datos."""
+        try:
+            response = self.table.update_item(
+            Key={"FranquiciaID": franquicia_id},
+            UpdateExpression=_con_version("SET Sucursales = :s"),
+            ExpressionAttributeNames=NOMBRES_VERSION,
+            ExpressionAttributeValues={":s": sucursales, **VALORES_VERSION},
+            ReturnValues="UPDATED_NEW"
+        )
+            return "Attributes" in response
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Error al actualizar franquicia en DynamoDB: {str(e)}")
+        return False
+
+    @_invalida_cache
+    def update_item(self, key: dict, update_expression: str, expression_values: dict):
+        """Actualiza un ítem en la tabla."""
+        try:
+            response = self.table.update_item(
+                Key=key,
+                UpdateExpression=_con_version(update_expression),
+                ExpressionAttributeNames=NOMBRES_VERSION,
+                ExpressionAttributeValues={**expression_values, **VALORES_VERSION},
+                ReturnValues="UPDATED_NEW"
+            )
+            return convert_decimal(response.get("Attributes", {}))
+        except ClientError as e:
+            logger.error(f"Error en update_item: {e.response['Error']['Message']}")
+            return None
+        except BotoCoreError as e:
+            logger.error(f"Error en update_item (BotoCoreError): {str(e)}")
+            return None
+
+    def _leer_varios(self, keys: List[dict], campos: Optional[Dict[str, dict]] = None) -> Optional[List[Dict[str, Any]]]:
+        """Lee varios ítems con BatchGetItem."""
+        items = self._batch_get(self.dynamodb.meta.client, keys, self._proyeccion(campos))
+        return [proyectar(convert_decimal(item), campos) for item in items] if items is not None else None
+
+    def _proyeccion(self, campos: Optional[Dict[str, dict]]) -> Dict[str, Any]:
+        """Parámetros ProjectionExpression/ExpressionAttributeNames para leer solo los atributos pedidos."""
+        if not campos:
+            return {}
+        expresion, nombres = expresion_proyeccion(campos, ("FranquiciaID", ATRIBUTO_VERSION))
+        return {"ProjectionExpression": expresion, "ExpressionAttributeNames": nombres}
+
+    def _batch_get(self, cliente, keys: List[dict], proyeccion: Optional[Dict[str, Any]] = None) -> Optional[List[Dict[str, Any]]]:
+        """Ejecuta BatchGetItem con `cliente` en bloques de 100 claves, reintentando UnprocessedKeys."""
+        items = []
+        for inicio in range(0, len(keys), TAMANO_LOTE_LECTURA):
+            pendientes = {self.table.name: {"Keys": keys[inicio:inicio + TAMANO_LOTE_LECTURA], **(proyeccion or {})}}
+            for intento in range(MAX_REINTENTOS_LOTE):
+                try:
+                    response = cliente.batch_get_item(RequestItems=pendientes)
+                except (ClientError, BotoCoreError) as e:
+                    logger.error(f"Error en batch_get_item: {str(e)}")
+                    return None
+                items.extend(response.get("Responses", {}).get(self.table.name, []))
+                pendientes = response.get("UnprocessedKeys") or {}
+                if not pendientes:
+                    break
+                time.sleep(random.uniform(0, min(ESPERA_MAXIMA_LOTE, ESPERA_BASE_LOTE * 2 ** intento)))
+            if pendientes:
+                logger.error(f"❌ Claves sin procesar tras {MAX_REINTENTOS_LOTE} intentos de batch_get_item.")
+                return None
+        return items
+
+    def listar_franquicias(self, limite: int, inicio: Optional[Dict[str, Any]] = None):
+        """Una página de resúmenes de franquicias (ID, nombre y versión) con Scan y ExclusiveStartKey.
+
+        Retorna (resúmenes, clave para continuar o None si no hay más) y None ante error.
+        """
+        pagina = self._paginar(self.table.scan, self._parametros_resumen(), limite, inicio)
+        if pagina is None:
+            return None
+        items, siguiente = pagina
+        return [self._resumen(item) for item in items], siguiente
+
+    def _paginar(self, operacion: Callable, parametros: Dict[str, Any], limite: int, inicio: Optional[Dict[str, Any]]):
+        """Reúne hasta `limite` ítems de un Scan o Query desde `inicio` (ExclusiveStartKey).
+
+        Retorna (ítems, clave del último ítem retornado o None si no hay más) y None ante error.
+        """
+        # Con filtro, Limit cuenta los ítems leídos antes de filtrar: se leen páginas completas y se recorta
+        if "FilterExpression" not in parametros:
+            parametros["Limit"] = limite
+        if inicio:
+            parametros["ExclusiveStartKey"] = inicio
+
+        items = []
+        while True:
+            try:
+                response = operacion(**parametros)
+            except (ClientError, BotoCoreError) as e:
+                logger.error(f"Error al paginar en DynamoDB: {str(e)}")
+                return None
+            items.extend(response.get("Items", []))
+            siguiente = response.get("LastEvaluatedKey")
+            if len(items) >= limite or not siguiente:
+                break
+            parametros["ExclusiveStartKey"] = siguiente
+
+        if len(items) > limite or (siguiente and items):
+            items = items[:limite]
+            siguiente = {k: items[-1][k] for k in self.CLAVES_TABLA}
+        return items, siguiente
+
+    def escanear_franquicias(self, segmentos: int) -> Optional[List[Dict[str, Any]]]:
+        """Resúmenes de todas las franquicias con un Scan paralelo (Segment/TotalSegments) en un pool de hilos.
+
+        Cada hilo recorre su segmento completo con el cliente del recurso, que a diferencia
+        del recurso mismo se puede compartir entre hilos. None ante error en cualquier segmento.
+        """
+        with ThreadPoolExecutor(max_workers=segmentos) as pool:
+            # Cada tarea corre en una copia del contexto para que sus llamadas cuenten en las métricas de la invocación
+            tareas = [
+                pool.submit(contextvars.copy_context().run, self._escanear_segmento, segmento, segmentos)
+                for segmento in range(segmentos)
+            ]
+            partes = [tarea.result() for tarea in tareas]
+        if any(parte is None for parte in partes):
+            return None
+        return [resumen for parte in partes for resumen in parte]
+
+    def _escanear_segmento(self, segmento: int, segmentos: int) -> Optional[List[Dict[str, Any]]]:
+        paginas = self.dynamodb.meta.client.get_paginator("scan").paginate(
+            TableName=self.table.name, Segment=segmento, TotalSegments=segmentos, **self._parametros_resumen()
+        )
+        resumenes = []
+        try:
+            for pagina in paginas:
+                resumenes.extend(self._resumen(item) for item in pagina.get("Items", []))
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Error en el segmento {segmento} del escaneo de franquicias: {str(e)}")
+            return None
+        return resumenes
+
+    def _parametros_resumen(self) -> Dict[str, Any]:
+        """Parámetros de Scan que leen solo los atributos de resumen."""
+        return {"ProjectionExpression": "FranquiciaID, Nombre, #version", "ExpressionAttributeNames": dict(NOMBRES_VERSION)}
+
+    def _resumen(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        return convert_decimal({k: item[k] for k in ATRIBUTOS_RESUMEN if k in item})
+
+    @_invalida_cache
+    def actualizar_nombre(self, franquicia_id: str, nuevo_nombre: str) -> Optional[bool]:
+        """Actualiza el nombre de una franquicia existente."""
+        return self._actualizar_condicionado(
+            {"FranquiciaID": franquicia_id},
+            "SET Nombre = :nombre",
+            "attribute_exists(FranquiciaID)",
+            {":nombre": nuevo_nombre}
+        )
+
+    # Operaciones por entidad. Retornan True si se aplicó el cambio, False si la
+    # franquicia, sucursal o producto no existe y None ante un error de DynamoDB.
+    # Cada escritura apunta a la ruta exacta dentro de Sucursales (por ejemplo
+    # Sucursales[3].Productos[7].Stock) y se condiciona al ID en esa posición, de
+    # modo que el costo de escritura no depende del tamaño de la franquicia.
+
+    @_invalida_cache
+    def agregar_sucursal(self, franquicia_id: str, sucursal: Dict[str, Any]) -> Optional[bool]:
+        """Agrega una sucursal al final de la lista sin leer la franquicia."""
+        return self._actualizar_condicionado(
+            {"FranquiciaID": franquicia_id},
+            "SET Sucursales = list_append(if_not_exists(Sucursales, :vacia), :nueva)",
+            "attribute_exists(FranquiciaID)",
+            {":vacia": [], ":nueva": [sucursal]}
+        )
+
+    @_invalida_cache
+    def actualizar_sucursal(self, franquicia_id: str, sucursal_id: str, nuevo_nombre: str) -> Optional[bool]:
+        """Actualiza el nombre de una sucursal."""
+        return self._actualizar_en_posicion(
+            franquicia_id, sucursal_id, None,
+            lambda ruta: (f"SET {ruta}.Nombre = :nombre", {":nombre": nuevo_nombre})
+        )
+
+    @_invalida_cache
+    def eliminar_sucursal(self, franquicia_id: str, sucursal_id: str) -> Optional[bool]:
+        """Elimina una sucursal con todos sus productos."""
+        return self._actualizar_en_posicion(
+            franquicia_id, sucursal_id, None,
+            lambda ruta: (f"REMOVE {ruta}", {})
+        )
+
+    @_invalida_cache
+    def agregar_producto(self, franquicia_id: str, sucursal_id: str, producto: Dict[str, Any]) -> Optional[bool]:
+        """Agrega un producto al final de la lista de productos de la sucursal."""
+        return self._actualizar_en_posicion(
+            franquicia_id, sucursal_id, None,
+            lambda ruta: (
+                f"SET {ruta}.Productos = list_append(if_not_exists({ruta}.Productos, :vacia), :nuevo)",
+                {":vacia": [], ":nuevo": [producto]}
+            )
+        )
+
+    @_invalida_cache
+    def actualizar_producto(self, franquicia_id: str, sucursal_id: str, producto_id: str, cambios: Dict[str, Any]) -> Optional[bool]:
+        """Actualiza los atributos indicados en `cambios` de un producto."""
+        def construir(ruta):
+            asignaciones = ", ".join(f"{ruta}.{campo} = :c{i}" for i, campo in enumerate(cambios))
+            return f"SET {asignaciones}", {f":c{i}": valor for i, valor in enumerate(cambios.values())}
+        return self._actualizar_en_posicion(franquicia_id, sucursal_id, producto_id, construir)
+
+    @_invalida_cache
+    def eliminar_producto(self, franquicia_id: str, sucursal_id: str, producto_id: str) -> Optional[bool]:
+        """Elimina un producto de una sucursal."""
+        return self._actualizar_en_posicion(
+            franquicia_id, sucursal_id, producto_id,
+            lambda ruta: (f"REMOVE {ruta}", {})
+        )
+
+    @_invalida_cache
+    def ajustar_stock(self, franquicia_id: str, sucursal_id: str, producto_id: str, delta: int) -> Optional[int]:
+        """Suma `delta` al stock del producto de forma atómica y retorna el nuevo valor.
+
+        Lanza StockInsuficiente si el resultado sería negativo.
+        """
+        for _ in _intentos_con_conflicto(f"ajuste de stock de {producto_id}"):
+            posicion = self._resolver_posicion(franquicia_id, sucursal_id, producto_id)
+            if not posicion:
+                return posicion
+            i, j = posicion
+            ruta = f"Sucursales[{i}].Productos[{j}]"
+            try:
+                response = self.table.update_item(
+                    Key={"FranquiciaID": franquicia_id},
+                    UpdateExpression=_con_version(f"SET {ruta}.Stock = {ruta}.Stock + :d"),
+                    ConditionExpression=f"Sucursales[{i}].SucursalID = :sid AND {ruta}.ProductoID = :pid AND {ruta}.Stock >= :minimo",
+                    ExpressionAttributeNames=NOMBRES_VERSION,
+                    ExpressionAttributeValues={":d": delta, ":sid": sucursal_id, ":pid": producto_id, ":minimo": -delta, **VALORES_VERSION},
+                    ReturnValues="UPDATED_NEW"
+                )
+                return int(_producto_actualizado(response["Attributes"], i, j)["Stock"])
+            except ClientError as e:
+                if not _es_condicion_fallida(e):
+                    logger.error(f"Error al ajustar stock: {e.response['Error']['Message']}")
+                    return None
+                # Si el producto sigue en la misma posición, lo que falló fue el stock mínimo
+                if self._resolver_posicion(franquicia_id, sucursal_id, producto_id) == (i, j):
+                    raise StockInsuficiente(producto_id)
+            except BotoCoreError as e:
+                logger.error(f"Error al ajustar stock (BotoCoreError): {str(e)}")
+                return None
+
+    @_invalida_cache
+    def guardar_productos(self, franquicia_id: str, sucursal_id: str, productos: List[Dict[str, Any]]):
+        """Inserta o reemplaza (por ProductoID) varios productos de una sucursal en una sola escritura.
+
+        Retorna {ProductoID: bool} con el resultado de cada producto, False si la
+        franquicia o la sucursal no existe y None ante un error de DynamoDB.
+        """
+        def combinar(sucursales):
+            sucursal = next((s for s in sucursales if s.get("SucursalID") == sucursal_id), None)
+            if sucursal is None:
+                return False
+            por_id = {p["ProductoID"]: p for p in sucursal.get("Productos", [])}
+            por_id.update((p["ProductoID"], p) for p in productos)
+            sucursal["Productos"] = list(por_id.values())
+            return sucursales
+
+        resultado = self._modificar_sucursales(franquicia_id, combinar, f"carga de productos de {sucursal_id}")
+        return {p["ProductoID"]: True for p in productos} if resultado else resultado
+
+    def obtener_producto(self, franquicia_id: str, sucursal_id: str, producto_id: str,
+                         campos: Optional[Dict[str, dict]] = None):
+        """Retorna el producto (solo `campos` si se indican), False si algo no existe y None ante error."""
+        sucursales = self._leer_sucursales(franquicia_id)
+        if not sucursales:
+            return sucursales if sucursales is None else False
+        sucursal = next((s for s in sucursales if s.get("SucursalID") == sucursal_id), None)
+        producto = next((p for p in (sucursal or {}).get("Productos", []) if p.get("ProductoID") == producto_id), None)
+        return proyectar(convert_decimal(producto), campos) if producto else False
+
+    def productos_mas_stock(self, franquicia_id: str, top: int, sucursal_id: Optional[str] = None):
+        """Retorna los `top` productos con mayor stock (mayor a cero), opcionalmente de una sola sucursal.
+
+        Recorre la lista una sola vez manteniendo un heap de tamaño `top`.
+        False si la franquicia no existe y None ante error.
+        """
+        sucursales = self._leer_sucursales(franquicia_id)
+        if sucursales is None or sucursales is False:
+            return sucursales
+
+        candidatos = (
+            (producto, sucursal.get("SucursalID"))
+            for sucursal in sucursales
+            if sucursal_id is None or sucursal.get("SucursalID") == sucursal_id
+            for producto in sucursal.get("Productos", [])
+            if isinstance(producto.get("Stock"), (int, Decimal)) and producto["Stock"] > 0
+        )
+        mejores = heapq.nlargest(top, candidatos, key=lambda par: par[0]["Stock"])
+        return [convert_decimal({**producto, "SucursalID": sid}) for producto, sid in mejores]
+
+    # Listados paginados dentro de una franquicia. Retornan (elementos, posición para continuar o None),
+    # False si la franquicia o la sucursal no existe y None ante error; ValueError si el cursor no es válido.
+    # En el diseño anidado la posición es el índice en la lista y cada página proyecta solo sus elementos:
+    # DynamoDB cobra la lectura del ítem completo, pero solo viajan y se deserializan los de la página.
+
+    def listar_sucursales(self, franquicia_id: str, limite: int, inicio: Optional[Dict[str, Any]] = None):
+        """Página de sucursales (sin productos), proyectando Sucursales[desde]..Sucursales[desde + limite]."""
+        desde = _posicion_cursor(inicio, "desde")
+        nombres = {"#s": "Sucursales", **{f"#a{k}": atributo for k, atributo in enumerate(ATRIBUTOS_SUCURSAL)}}
+        rutas = [f"#s[{n}].#a{k}" for n in range(desde, desde + limite + 1) for k in range(len(ATRIBUTOS_SUCURSAL))]
+        item = self._leer_rutas(franquicia_id, rutas, nombres)
+        if not item:
+            return item
+        sucursales = convert_decimal(item.get("Sucursales", []))
+        siguiente = {"desde": desde + limite} if len(sucursales) > limite else None
+        return sucursales[:limite], siguiente
+
+    def listar_productos(self, franquicia_id: str, sucursal_id: str, limite: int, inicio: Optional[Dict[str, Any]] = None):
+        """Página de productos de una sucursal.
+
+        La primera página ubica la sucursal leyendo la lista; el cursor guarda su índice para que las siguientes
+        proyecten solo Sucursales[i].Productos[desde]..[desde + limite] (si la sucursal se movió, se vuelve a ubicar).
+        """
+        desde = _posicion_cursor(inicio, "desde")
+        i = _posicion_cursor(inicio, "sucursal") if inicio is not None else None
+        productos = None
+        if i is not None:
+            rutas = [f"#s[{i}].#id", *(f"#s[{i}].#p[{n}]" for n in range(desde, desde + limite + 1))]
+            item = self._leer_rutas(franquicia_id, rutas, {"#s": "Sucursales", "#id": "SucursalID", "#p": "Productos"})
+            if not item:
+                return item
+            sucursal = (item.get("Sucursales") or [{}])[0]
+            if sucursal.get("SucursalID") == sucursal_id:
+                productos = sucursal.get("Productos", [])
+        if productos is None:
+            sucursales = self._leer_sucursales(franquicia_id)
+            if not sucursales:
+                return sucursales if sucursales is None else False
+            i = next((n for n, s in enumerate(sucursales) if s.get("SucursalID") == sucursal_id), -1)
+            if i == -1:
+                return False
+            productos = sucursales[i].get("Productos", [])[desde:desde + limite + 1]
+
+        siguiente = {"sucursal": i, "desde": desde + limite} if len(productos) > limite else None
+        return convert_decimal(productos[:limite]), siguiente
+
+    def _leer_rutas(self, franquicia_id: str, rutas: List[str], nombres: Dict[str, str]):
+        """Lee solo las rutas indicadas de la franquicia. Retorna el ítem, False si no existe y None ante error."""
+        try:
+            response = self.table.get_item(
+                Key={"FranquiciaID": franquicia_id},
+                ProjectionExpression=", ".join(["FranquiciaID", *rutas]),
+                ExpressionAttributeNames=nombres
+            )
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Error al obtener ítem de DynamoDB: {str(e)}")
+            return None
+        return response.get("Item", False)
+
+    def _leer_sucursales(self, franquicia_id: str):
+        """Lee solo la lista de sucursales. Retorna la lista, False si la franquicia no existe y None ante error."""
+        try:
+            response = self.table.get_item(Key={"FranquiciaID": franquicia_id}, ProjectionExpression="Sucursales")
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Error al obtener ítem de DynamoDB: {str(e)}")
+            return None
+        if "Item" not in response:
+            return False
+        return response["Item"].get("Sucursales", [])
+
+    def _modificar_sucursales(self, franquicia_id: str, transformar: Callable[[list], Any], descripcion: str) -> Optional[bool]:
+        """Lee-modifica-escribe la lista de sucursales con concurrencia optimista.
+
+        `transformar` recibe la lista leída y retorna la nueva (o False si algo no existe). La escritura se
+        condiciona a la versión leída; si otra escritura la cambió entretanto, se vuelve a leer y a aplicar.
+        """
+        for _ in _intentos_con_conflicto(descripcion):
+            try:
+                response = self.table.get_item(
+                    Key={"FranquiciaID": franquicia_id},
+                    ProjectionExpression="Sucursales, #version",
+                    ExpressionAttributeNames=NOMBRES_VERSION
+                )
+            except (ClientError, BotoCoreError) as e:
+                logger.error(f"Error al obtener ítem de DynamoDB: {str(e)}")
+                return None
+            if "Item" not in response:
+                return False
+
+            sucursales = transformar(response["Item"].get("Sucursales", []))
+            if sucursales is False:
+                return False
+            condicion, valores = _condicion_version(int(response["Item"].get(ATRIBUTO_VERSION, 0)))
+            resultado = self._actualizar_condicionado(
+                {"FranquiciaID": franquicia_id},
+                "SET Sucursales = :sucursales",
+                f"attribute_exists(FranquiciaID) AND {condicion}",
+                {":sucursales": sucursales, **valores}
+            )
+            if resultado is not False:
+                return resultado
+
+    def _resolver_posicion(self, franquicia_id: str, sucursal_id: str, producto_id: Optional[str]):
+        """Ubica los índices de la sucursal (y del producto) dentro de la franquicia.
+
+        Retorna (i, j) con j=None si no se pidió producto, False si algo no existe y None ante error.
+        """
+        sucursales = self._leer_sucursales(franquicia_id)
+        if not sucursales:
+            return sucursales if sucursales is None else False
+
+        i = next((n for n, s in enumerate(sucursales) if s.get("SucursalID") == sucursal_id), -1)
+        if i == -1:
+            return False
+        if producto_id is None:
+            return i, None
+
+        productos = sucursales[i].get("Productos", [])
+        j = next((n for n, p in enumerate(productos) if p.get("ProductoID") == producto_id), -1)
+        return (i, j) if j != -1 else False
+
+    def _actualizar_en_posicion(self, franquicia_id: str, sucursal_id: str, producto_id: Optional[str],
+                                construir: Callable[[str], tuple]) -> Optional[bool]:
+        """Aplica la expresión que arma `construir` sobre la ruta de la sucursal o del producto.
+
+        Si entre la lectura y la escritura otra solicitud desplazó la lista, la
+        condición falla y se vuelve a resolver la posición. Condicionar al ID en la
+        posición (y no a la versión) evita conflictos entre escrituras a entidades distintas.
+        """
+        for _ in _intentos_con_conflicto(f"actualización de {sucursal_id}"):
+            posicion = self._resolver_posicion(franquicia_id, sucursal_id, producto_id)
+            if not posicion:
+                return posicion
+            i, j = posicion
+
+            ruta = f"Sucursales[{i}]"
+            condicion = f"{ruta}.SucursalID = :sid"
+            valores = {":sid": sucursal_id}
+            if j is not None:
+                ruta = f"{ruta}.Productos[{j}]"
+                condicion += f" AND {ruta}.ProductoID = :pid"
+                valores[":pid"] = producto_id
+
+            expresion, valores_expresion = construir(ruta)
+            resultado = self._actualizar_condicionado(
+                {"FranquiciaID": franquicia_id}, expresion, condicion, {**valores, **valores_expresion}
+            )
+            if resultado is not False:
+                return resultado
+
+    def _actualizar_condicionado(self, key: dict, update_expression: str, condition: str, expression_values: dict) -> Optional[bool]:
+        """Ejecuta un update_item condicionado que además incrementa la versión. False si la condición no se cumple.
+
+        Lanza ItemDemasiadoGrande si el ítem resultante superaría los 400 KB.
+        """
+        parametros = {
+            "Key": key,
+            "UpdateExpression": _con_version(update_expression),
+            "ConditionExpression": condition,
+            "ExpressionAttributeNames": NOMBRES_VERSION,
+            "ExpressionAttributeValues": {**expression_values, **VALORES_VERSION}
+        }
+        try:
+            self.table.update_item(**parametros)
+            return True
+        except ClientError as e:
+            if _es_condicion_fallida(e):
+                return False
+            if _es_item_demasiado_grande(e):
+                logger.warning(f"⚠️ update_item rechazado por tamaño de ítem: {e.response['Error']['Message']}")
+                raise ItemDemasiadoGrande(e.response["Error"]["Message"]) from e
+            logger.error(f"Error en update_item: {e.response['Error']['Message']}")
+            return None
+        except BotoCoreError as e:
+            logger.error(f"Error en update_item (BotoCoreError): {str(e)}")
+            return None
+
+
+# Diseño de tabla única normalizado: cada entidad es un ítem propio dentro de la
+# partición de su franquicia.
+#   PK = FRANQUICIA#<id>   SK = FRANQUICIA                              -> franquicia
+#   PK = FRANQUICIA#<id>   SK = SUCURSAL#<id>                           -> sucursal
+#   PK = FRANQUICIA#<id>   SK = SUCURSAL#<id>#PRODUCTO#<id>             -> producto
+# Los productos llevan además las claves de dos índices secundarios ordenados por
+# Stock, que DynamoDB mantiene sincronizados en cada escritura del producto:
+#   StockFranquiciaIndex: StockFranquicia = FRANQUICIA#<id>, Stock
+#   StockSucursalIndex:   StockSucursal = SUCURSAL#<franquicia>#<sucursal>, Stock
+
+SK_FRANQUICIA = "FRANQUICIA"
+INDICE_STOCK_FRANQUICIA = "StockFranquiciaIndex"
+INDICE_STOCK_SUCURSAL = "StockSucursalIndex"
+ATRIBUTOS_CLAVE = ("PK", "SK", "StockFranquicia", "StockSucursal")
+
+def clave_franquicia(franquicia_id: str) -> Dict[str, str]:
+    return {"PK": f"FRANQUICIA#{franquicia_id}", "SK": SK_FRANQUICIA}
+
+def clave_sucursal(franquicia_id: str, sucursal_id: str) -> Dict[str, str]:
+    return {"PK": f"FRANQUICIA#{franquicia_id}", "SK": f"SUCURSAL#{sucursal_id}"}
+
+def clave_producto(franquicia_id: str, sucursal_id: str, producto_id: str) -> Dict[str, str]:
+    return {"PK": f"FRANQUICIA#{franquicia_id}", "SK": f"SUCURSAL#{sucursal_id}#PRODUCTO#{producto_id}"}
+
+def item_producto(franquicia_id: str, sucursal_id: str, producto: Dict[str, Any]) -> Dict[str, Any]:
+    """Arma el ítem del producto, incluyendo las claves de los índices de stock."""
+    return {
+        **clave_producto(franquicia_id, sucursal_id, producto["ProductoID"]),
+        "StockFranquicia": f"FRANQUICIA#{franquicia_id}",
+        "StockSucursal": f"SUCURSAL#{franquicia_id}#{sucursal_id}",
+        "SucursalID": sucursal_id,
+        **producto
+    }
+
+def _sin_claves(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in item.items() if k not in ATRIBUTOS_CLAVE}
+
+def descomponer_franquicia(franquicia: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Convierte una franquicia anidada en los ítems del diseño normalizado."""
+    franquicia_id = franquicia["FranquiciaID"]
+    raiz = {k: v for k, v in franquicia.items() if k != "Sucursales"}
+    yield {**clave_franquicia(franquicia_id), **raiz}
+
+    for sucursal in franquicia.get("Sucursales", []):
+        sucursal_id = sucursal["SucursalID"]
+        datos_sucursal = {k: v for k, v in sucursal.items() if k != "Productos"}
+        yield {**clave_sucursal(franquicia_id, sucursal_id), **datos_sucursal}
+
+        for producto in sucursal.get("Productos", []):
+            yield item_producto(franquicia_id, sucursal_id, producto)
+
+def componer_franquicia(items: Iterable[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Reconstruye la franquicia anidada a partir de los ítems de su partición ordenados por SK."""
+    franquicia = None
+    sucursales: List[Dict[str, Any]] = []
+    actual = None
+
+    for item in items:
+        datos = _sin_claves(item)
+        if item["SK"] == SK_FRANQUICIA:
+            franquicia = datos
+        elif "#PRODUCTO#" in item["SK"]:
+            datos.pop("SucursalID", None)
+            if actual is not None:
+                actual["Productos"].append(datos)
+        else:
+            actual = {**datos, "Productos": []}
+            sucursales.append(actual)
+
+    if franquicia is None:
+        return None
+    franquicia["Sucursales"] = sucursales
+    return franquicia
+
+def _producto_actualizado(atributos: Dict[str, Any], i: int, j: int) -> Dict[str, Any]:
+    """Extrae el producto de la respuesta UPDATED_NEW de una escritura en Sucursales[i].Productos[j].
+
+    DynamoDB devuelve solo la ruta actualizada (listas de un elemento); se acepta
+    también la lista completa por compatibilidad con emuladores.
+    """
+    sucursales = atributos["Sucursales"]
+    productos = (sucursales[i] if len(sucursales) > i else sucursales[-1])["Productos"]
+    return productos[j] if len(productos) > j else productos[-1]
+
+def _es_condicion_fallida(error: ClientError) -> bool:
+    codigo = error.response["Error"]["Code"]
+    if codigo == "ConditionalCheckFailedException":
+        return True
+    if codigo == "TransactionCanceledException":
+        razones = error.response.get("CancellationReasons", [])
+        return any(r.get("Code") == "ConditionalCheckFailed" for r in razones)
+    return False
+
+def _es_item_demasiado_grande(error: ClientError) -> bool:
+    """DynamoDB rechazó la escritura porque el ítem superaría los 400 KB."""
+    return (error.response["Error"]["Code"] == "ValidationException"
+            and "maximum allowed size" in error.response["Error"].get("Message", ""))
+
+def _es_conflicto_transaccion(error: ClientError) -> bool:
+    """La transacción se canceló porque otra transacción estaba modificando alguno de sus ítems."""
+    codigo = error.response["Error"]["Code"]
+    if codigo == "TransactionConflictException":
+        return True
+    if codigo == "TransactionCanceledException":
+        razones = error.response.get("CancellationReasons", [])
+        return any(r.get("Code") == "TransactionConflict" for r in razones)
+    return False
+
+
+class NormalizedDynamoRepository(DynamoRepository):
+    """Repositorio sobre el diseño normalizado (PK/SK), con un ítem por franquicia, sucursal y producto.
+
+    Expone la misma interfaz que `DynamoRepository`; las claves {"FranquiciaID": id}
+    se traducen a la clave del ítem raíz de la franquicia.
+    """
+
+    CLAVES_TABLA = ("PK", "SK")
+
+    # Cada producto es su propio ítem: el tamaño de la carga no está limitado por el de la franquicia
+    MAX_PRODUCTOS_POR_LOTE = None
+
+    def _leer_item(self, key: dict, campos: Optional[Dict[str, dict]] = None):
+        """Obtiene la franquicia consultando su partición.
+
+        Si `campos` no incluye Sucursales basta con el ítem raíz: se lee un solo ítem en lugar de la partición.
+        """
+        if campos and "Sucursales" not in campos:
+            try:
+                response = self.table.get_item(Key=clave_franquicia(key["FranquiciaID"]), **self._proyeccion(campos))
+            except (ClientError, BotoCoreError) as e:
+                logger.error(f"Error al obtener ítem de DynamoDB: {str(e)}")
+                return None
+            item = response.get("Item")
+            return proyectar(convert_decimal(item), campos) if item else None
+
+        items = self._consultar_particion(key["FranquiciaID"])
+        if items is None:
+            return None
+        franquicia = componer_franquicia(items)
+        return proyectar(convert_decimal(franquicia), campos) if franquicia else None
+
+    def _existe_en_tabla(self, franquicia_id: str) -> bool:
+        """Verifica si existe el ítem raíz de la franquicia."""
+        try:
+            response = self.table.get_item(Key=clave_franquicia(franquicia_id), ProjectionExpression="PK")
+            return "Item" in response
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Error al verificar franquicia en DynamoDB: {str(e)}")
+            return False
+
+    @_invalida_cache
+    def put_item(self, item: dict):
+        """Inserta una franquicia (con sus sucursales y productos) como ítems independientes."""
+        try:
+            with self.table.batch_writer() as batch:
+                for elemento in descomponer_franquicia({ATRIBUTO_VERSION: 1, **item}):
+                    batch.put_item(Item=elemento)
+            logger.info("✅ Franquicia %s insertada correctamente.", item['FranquiciaID'])
+            return True
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"❌ Error al insertar franquicia en DynamoDB: {str(e)}")
+            return False
+
+    @_invalida_cache
+    def delete_item(self, key: dict) -> bool:
+        """Elimina todos los ítems de la partición de la franquicia."""
+        return self._eliminar_claves(self._claves_con_prefijo(key["FranquiciaID"], None))
+
+    @_invalida_cache
+    def update_item(self, key: dict, update_expression: str, expression_values: dict):
+        """Actualiza atributos del ítem raíz de la franquicia."""
+        if "FranquiciaID" in key:
+            key = clave_franquicia(key["FranquiciaID"])
+        return super().update_item(key, update_expression, expression_values)
+
+    def _leer_varios(self, keys: List[dict], campos: Optional[Dict[str, dict]] = None) -> Optional[List[Dict[str, Any]]]:
+        """Obtiene varias franquicias; cada una es una consulta a su partición.
+
+        Si `campos` no incluye Sucursales se leen solo los ítems raíz con BatchGetItem.
+        """
+        if campos and "Sucursales" not in campos:
+            claves = [clave_franquicia(key["FranquiciaID"]) for key in keys]
+            items = self._batch_get(self.dynamodb.meta.client, claves, self._proyeccion(campos))
+            return [proyectar(convert_decimal(item), campos) for item in items] if items is not None else None
+
+        franquicias = []
+        for key in keys:
+            items = self._consultar_particion(key["FranquiciaID"])
+            if items is None:
+                return None
+            franquicia = componer_franquicia(items)
+            if franquicia:
+                franquicias.append(proyectar(convert_decimal(franquicia), campos))
+        return franquicias
+
+    @_invalida_cache
+    def actualizar_nombre(self, franquicia_id: str, nuevo_nombre: str) -> Optional[bool]:
+        """Actualiza el nombre en el ítem raíz de la franquicia (y su versión, en la misma escritura)."""
+        return self._actualizar_existente(clave_franquicia(franquicia_id), {"Nombre": nuevo_nombre}, version=True)
+
+    @_invalida_cache
+    @_versiona
+    def actualizar_franquicia(self, franquicia_id: str, sucursales: list) -> bool:
+        """Reemplaza todas las sucursales de la franquicia.
+
+        Reescribe la partición completa; las operaciones por entidad son preferibles.
+        """
+        actuales = self._claves_con_prefijo(franquicia_id, "SUCURSAL#")
+        if actuales is None:
+            return False
+        nuevos = list(descomponer_franquicia({"FranquiciaID": franquicia_id, "Sucursales": sucursales}))[1:]
+        claves_nuevas = {(i["PK"], i["SK"]) for i in nuevos}
+        try:
+            with self.table.batch_writer() as batch:
+                for clave in actuales:
+                    if (clave["PK"], clave["SK"]) not in claves_nuevas:
+                        batch.delete_item(Key=clave)
+                for elemento in nuevos:
+                    batch.put_item(Item=elemento)
+            return True
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Error al actualizar franquicia en DynamoDB: {str(e)}")
+            return False
+
+    @_invalida_cache
+    def agregar_sucursal(self, franquicia_id: str, sucursal: Dict[str, Any]) -> Optional[bool]:
+        """Agrega el ítem de la sucursal si la franquicia existe."""
+        datos = {k: v for k, v in sucursal.items() if k != "Productos"}
+        return self._transaccion([
+            {"Update": self._incremento_version(franquicia_id)},
+            {"Put": {"TableName": self.table.name, "Item": {**clave_sucursal(franquicia_id, sucursal["SucursalID"]), **datos}}},
+        ])
+
+    @_invalida_cache
+    @_versiona
+    def actualizar_sucursal(self, franquicia_id: str, sucursal_id: str, nuevo_nombre: str) -> Optional[bool]:
+        """Actualiza el nombre de la sucursal escribiendo solo su ítem."""
+        return self._actualizar_existente(clave_sucursal(franquicia_id, sucursal_id), {"Nombre": nuevo_nombre})
+
+    @_invalida_cache
+    @_versiona
+    def eliminar_sucursal(self, franquicia_id: str, sucursal_id: str) -> Optional[bool]:
+        """Elimina la sucursal y sus productos."""
+        claves = self._claves_con_prefijo(franquicia_id, f"SUCURSAL#{sucursal_id}")
+        if claves is None:
+            return None
+        # El prefijo también coincide con sucursales cuyo ID empieza igual
+        claves = [c for c in claves if c["SK"] == f"SUCURSAL#{sucursal_id}" or c["SK"].startswith(f"SUCURSAL#{sucursal_id}#")]
+        if not claves:
+            return False
+        return True if self._eliminar_claves(claves) else None
+
+    @_invalida_cache
+    def agregar_producto(self, franquicia_id: str, sucursal_id: str, producto: Dict[str, Any]) -> Optional[bool]:
+        """Agrega el ítem del producto si la sucursal existe."""
+        item = item_producto(franquicia_id, sucursal_id, producto)
+        return self._transaccion([
+            {"ConditionCheck": self._condicion_existe(clave_sucursal(franquicia_id, sucursal_id))},
+            {"Put": {"TableName": self.table.name, "Item": item}},
+            {"Update": self._incremento_version(franquicia_id)},
+        ])
+
+    @_invalida_cache
+    @_versiona
+    def actualizar_producto(self, franquicia_id: str, sucursal_id: str, producto_id: str, cambios: Dict[str, Any]) -> Optional[bool]:
+        """Actualiza los atributos del producto escribiendo solo su ítem."""
+        return self._actualizar_existente(clave_producto(franquicia_id, sucursal_id, producto_id), cambios)
+
+    @_invalida_cache
+    @_versiona
+    def eliminar_producto(self, franquicia_id: str, sucursal_id: str, producto_id: str) -> Optional[bool]:
+        """Elimina el ítem del producto."""
+        try:
+            self.table.delete_item(
+                Key=clave_producto(franquicia_id, sucursal_id, producto_id),
+                ConditionExpression="attribute_exists(PK)"
+            )
+            return True
+        except ClientError as e:
+            if _es_condicion_fallida(e):
+                return False
+            logger.error(f"Error al eliminar producto en DynamoDB: {e.response['Error']['Message']}")
+            return None
+        except BotoCoreError as e:
+            logger.error(f"Error al eliminar producto en DynamoDB: {str(e)}")
+            return None
+
+    @_invalida_cache
+    @_versiona
+    def ajustar_stock(self, franquicia_id: str, sucursal_id: str, producto_id: str, delta: int) -> Optional[int]:
+        """Suma `delta` al stock del producto en una sola escritura condicionada."""
+        try:
+            response = self.table.update_item(
+                Key=clave_producto(franquicia_id, sucursal_id, producto_id),
+                UpdateExpression="SET Stock = Stock + :d",
+                ConditionExpression="attribute_exists(PK) AND Stock >= :minimo",
+                ExpressionAttributeValues={":d": delta, ":minimo": -delta},
+                ReturnValues="UPDATED_NEW",
+                ReturnValuesOnConditionCheckFailure="ALL_OLD"
+            )
+            return int(response["Attributes"]["Stock"])
+        except ClientError as e:
+            if _es_condicion_fallida(e):
+                if "Item" in e.response:
+                    raise StockInsuficiente(producto_id)
+                return False
+            logger.error(f"Error al ajustar stock: {e.response['Error']['Message']}")
+            return None
+        except BotoCoreError as e:
+            logger.error(f"Error al ajustar stock (BotoCoreError): {str(e)}")
+            return None
+
+    @_invalida_cache
+    @_versiona
+    def guardar_productos(self, franquicia_id: str, sucursal_id: str, productos: List[Dict[str, Any]]):
+        """Inserta o reemplaza productos con BatchWriteItem en lotes de 25, reintentando los no procesados."""
+        try:
+            response = self.table.get_item(Key=clave_sucursal(franquicia_id, sucursal_id), ProjectionExpression="PK")
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Error al obtener ítem de DynamoDB: {str(e)}")
+            return None
+        if "Item" not in response:
+            return False
+
+        resultados = {}
+        for inicio in range(0, len(productos), TAMANO_LOTE_ESCRITURA):
+            lote = productos[inicio:inicio + TAMANO_LOTE_ESCRITURA]
+            solicitudes = [
+                {"PutRequest": {"Item": item_producto(franquicia_id, sucursal_id, p)}}
+                for p in lote
+            ]
+            fallidos = {s["PutRequest"]["Item"]["ProductoID"] for s in self._escribir_lote(solicitudes)}
+            resultados.update((p["ProductoID"], p["ProductoID"] not in fallidos) for p in lote)
+        return resultados
+
+    def obtener_producto(self, franquicia_id: str, sucursal_id: str, producto_id: str,
+                         campos: Optional[Dict[str, dict]] = None):
+        """Lee solo el ítem del producto, proyectando los atributos pedidos."""
+        proyeccion = {}
+        if campos:
+            expresion, nombres = expresion_proyeccion(campos, ("ProductoID",))
+            proyeccion = {"ProjectionExpression": expresion, "ExpressionAttributeNames": nombres}
+        try:
+            response = self.table.get_item(Key=clave_producto(franquicia_id, sucursal_id, producto_id), **proyeccion)
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Error al obtener ítem de DynamoDB: {str(e)}")
+            return None
+        if "Item" not in response:
+            return False
+        producto = _sin_claves(response["Item"])
+        producto.pop("SucursalID", None)
+        return proyectar(convert_decimal(producto), campos)
+
+    def listar_sucursales(self, franquicia_id: str, limite: int, inicio: Optional[Dict[str, Any]] = None):
+        """Página de sucursales con una consulta por rango de claves (SK con prefijo SUCURSAL#).
+
+        Los productos comparten ese rango; un filtro los descarta antes de salir de DynamoDB.
+        """
+        self._validar_cursor(inicio, franquicia_id, "SUCURSAL#")
+        pagina = self._paginar(self.table.query, {
+            "KeyConditionExpression": Key("PK").eq(f"FRANQUICIA#{franquicia_id}") & Key("SK").begins_with("SUCURSAL#"),
+            "FilterExpression": "attribute_not_exists(ProductoID)",
+        }, limite, inicio)
+        if pagina is None:
+            return None
+        items, siguiente = pagina
+        if not items and inicio is None and not self._existe_en_tabla(franquicia_id):
+            return False
+        return [convert_decimal(_sin_claves(item)) for item in items], siguiente
+
+    def listar_productos(self, franquicia_id: str, sucursal_id: str, limite: int, inicio: Optional[Dict[str, Any]] = None):
+        """Página de productos de la sucursal con una consulta por rango de claves, sin leer el resto de la partición."""
+        prefijo = f"SUCURSAL#{sucursal_id}#PRODUCTO#"
+        self._validar_cursor(inicio, franquicia_id, prefijo)
+        pagina = self._paginar(self.table.query, {
+            "KeyConditionExpression": Key("PK").eq(f"FRANQUICIA#{franquicia_id}") & Key("SK").begins_with(prefijo),
+        }, limite, inicio)
+        if pagina is None:
+            return None
+        items, siguiente = pagina
+        if not items and inicio is None:
+            existe = self._existe_item(clave_sucursal(franquicia_id, sucursal_id))
+            if not existe:
+                return existe
+        productos = []
+        for item in items:
+            producto = _sin_claves(item)
+            producto.pop("SucursalID", None)
+            productos.append(convert_decimal(producto))
+        return productos, siguiente
+
+    def _existe_item(self, clave: Dict[str, str]) -> Optional[bool]:
+        try:
+            return "Item" in self.table.get_item(Key=clave, ProjectionExpression="PK")
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Error al verificar ítem en DynamoDB: {str(e)}")
+            return None
+
+    def _validar_cursor(self, inicio: Optional[Dict[str, Any]], franquicia_id: str, prefijo: str) -> None:
+        """El cursor debe ser la clave de un ítem del mismo rango de la partición."""
+        if inicio is None:
+            return
+        if (not isinstance(inicio, dict) or set(inicio) != set(self.CLAVES_TABLA)
+                or inicio["PK"] != f"FRANQUICIA#{franquicia_id}" or not str(inicio["SK"]).startswith(prefijo)):
+            raise ValueError("El parámetro 'cursor' no es válido.")
+
+    def productos_mas_stock(self, franquicia_id: str, top: int, sucursal_id: Optional[str] = None):
+        """Consulta el índice de stock en orden descendente con Limit=top."""
+        if sucursal_id:
+            indice, condicion = INDICE_STOCK_SUCURSAL, Key("StockSucursal").eq(f"SUCURSAL#{franquicia_id}#{sucursal_id}")
+        else:
+            indice, condicion = INDICE_STOCK_FRANQUICIA, Key("StockFranquicia").eq(f"FRANQUICIA#{franquicia_id}")
+        try:
+            response = self.table.query(
+                IndexName=indice,
+                KeyConditionExpression=condicion & Key("Stock").gt(0),
+                ScanIndexForward=False,
+                Limit=top
+            )
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Error al consultar índice de stock: {str(e)}")
+            return None
+
+        productos = [convert_decimal(_sin_claves(item)) for item in response.get("Items", [])]
+        if not productos and not self.franquicia_existe(franquicia_id):
+            return False
+        return productos
+
+    def _escribir_lote(self, solicitudes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Envía un BatchWriteItem y reintenta UnprocessedItems con backoff exponencial. Retorna lo que no se escribió."""
+        pendientes = solicitudes
+        for intento in range(MAX_REINTENTOS_LOTE):
+            try:
+                response = self.dynamodb.meta.client.batch_write_item(RequestItems={self.table.name: pendientes})
+            except (ClientError, BotoCoreError) as e:
+                logger.error(f"Error en batch_write_item: {str(e)}")
+                return pendientes
+            pendientes = response.get("UnprocessedItems", {}).get(self.table.name, [])
+            if not pendientes:
+                return []
+            time.sleep(random.uniform(0, min(ESPERA_MAXIMA_LOTE, ESPERA_BASE_LOTE * 2 ** intento)))
+
+        logger.warning("⚠️ %s ítems sin procesar tras %s intentos.", len(pendientes), MAX_REINTENTOS_LOTE)
+        return pendientes
+
+    def _consultar_particion(self, franquicia_id: str, prefijo: Optional[str] = None, **kwargs) -> Optional[List[Dict]]:
+        """Consulta los ítems de la partición de la franquicia, opcionalmente filtrando por prefijo de SK."""
+        condicion = Key("PK").eq(f"FRANQUICIA#{franquicia_id}")
+        if prefijo:
+            condicion = condicion & Key("SK").begins_with(prefijo)
+        items = []
+        parametros = {"KeyConditionExpression": condicion, **kwargs}
+        try:
+            while True:
+                response = self.table.query(**parametros)
+                items.extend(response.get("Items", []))
+                if "LastEvaluatedKey" not in response:
+                    return items
+                parametros["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Error al consultar partición en DynamoDB: {str(e)}")
+            return None
+
+    def _claves_con_prefijo(self, franquicia_id: str, prefijo: Optional[str]) -> Optional[List[Dict]]:
+        return self._consultar_particion(franquicia_id, prefijo, ProjectionExpression="PK, SK")
+
+    def _eliminar_claves(self, claves: Optional[List[Dict]]) -> bool:
+        if not claves:
+            return False
+        try:
+            with self.table.batch_writer() as batch:
+                for clave in claves:
+                    batch.delete_item(Key=clave)
+            return True
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"❌ Error al eliminar ítems de DynamoDB: {str(e)}")
+            return False
+
+    def _parametros_resumen(self) -> Dict[str, Any]:
+        """Solo los ítems raíz: el listado filtra por SK y proyecta además la clave para continuar."""
+        return {
+            "ProjectionExpression": "PK, SK, FranquiciaID, Nombre, #version",
+            "FilterExpression": "SK = :sk_franquicia",
+            "ExpressionAttributeNames": dict(NOMBRES_VERSION),
+            "ExpressionAttributeValues": {":sk_franquicia": SK_FRANQUICIA}
+        }
+
+    def _condicion_existe(self, clave: Dict[str, str]) -> Dict[str, Any]:
+        return {"TableName": self.table.name, "Key": clave, "ConditionExpression": "attribute_exists(PK)"}
+
+    def _incremento_version(self, franquicia_id: str) -> Dict[str, Any]:
+        """Update (para transacciones) que incrementa la versión del ítem raíz si la franquicia existe."""
+        return {
+            "TableName": self.table.name,
+            "Key": clave_franquicia(franquicia_id),
+            "UpdateExpression": "ADD #version :uno_version",
+            "ConditionExpression": "attribute_exists(PK)",
+            "ExpressionAttributeNames": NOMBRES_VERSION,
+            "ExpressionAttributeValues": VALORES_VERSION
+        }
+
+    def _incrementar_version(self, franquicia_id: str) -> bool:
+        try:
+            self.table.update_item(**{k: v for k, v in self._incremento_version(franquicia_id).items() if k != "TableName"})
+            return True
+        except (ClientError, BotoCoreError) as e:
+            logger.warning("⚠️ No se pudo incrementar la versión de %s: %s", franquicia_id, e)
+            return False
+
+    def _leer_version(self, franquicia_id: str) -> Optional[int]:
+        return self._version_de_item(clave_franquicia(franquicia_id))
+
+    def _transaccion(self, operaciones: List[Dict[str, Any]]) -> Optional[bool]:
+        """Ejecuta la transacción; si choca con otra sobre los mismos ítems (p. ej. la versión raíz), se reintenta."""
+        for _ in _intentos_con_conflicto("transacción"):
+            try:
+                self.dynamodb.meta.client.transact_write_items(TransactItems=operaciones)
+                return True
+            except ClientError as e:
+                if _es_condicion_fallida(e):
+                    return False
+                if _es_conflicto_transaccion(e):
+                    continue
+                logger.error(f"Error en transacción de DynamoDB: {e.response['Error']['Message']}")
+                return None
+            except BotoCoreError as e:
+                logger.error(f"Error en transacción de DynamoDB: {str(e)}")
+                return None
+
+    def _actualizar_existente(self, clave: Dict[str, str], cambios: Dict[str, Any], version: bool = False) -> Optional[bool]:
+        nombres = {f"#c{i}": campo for i, campo in enumerate(cambios)}
+        valores = {f":c{i}": valor for i, valor in enumerate(cambios.values())}
+        expresion = "SET " + ", ".join(f"#c{i} = :c{i}" for i in range(len(cambios)))
+        if version:
+            expresion = _con_version(expresion)
+            nombres.update(NOMBRES_VERSION)
+            valores.update(VALORES_VERSION)
+        try:
+            self.table.update_item(
+                Key=clave,
+                UpdateExpression=expresion,
+                ConditionExpression="attribute_exists(PK)",
+                ExpressionAttributeNames=nombres,
+                ExpressionAttributeValues=valores
+            )
+            return True
+        except ClientError as e:
+            if _es_condicion_fallida(e):
+                return False
+            logger.error(f"Error en update_item: {e.response['Error']['Message']}")
+            return None
+        except BotoCoreError as e:
+            logger.error(f"Error en update_item (BotoCoreError): {str(e)}")
+            return None
@@ -0,0 +1,313 @@
+import re
+import time
+import heapq
+import pickle
+import random
+import bisect
+import logging
+import threading
+from collections import Counter
+from decimal import Decimal
+from typing import Optional, Dict, Any, List, Callable, Tuple
+from core.campos import proyectar
+from repositories.dynamo_repository import (
+    ATRIBUTO_VERSION, ATRIBUTOS_RESUMEN, ATRIBUTOS_SUCURSAL, StockInsuficiente, convert_decimal, _posicion_cursor
+)
+
+logger = logging.getLogger(__name__)
+
+# update_item solo admite asignaciones de primer nivel: SET Nombre = :n, Otro = :o
+_ASIGNACION = re.compile(r"^\s*([A-Za-z_][A-Za-z0-9_]*)\s*=\s*(:[A-Za-z0-9_]+)\s*$")
+
+def _a_dynamo(valor: Any) -> Any:
+    """Números como Decimal, igual que los entrega el recurso de boto3, para que las lecturas paguen convert_decimal."""
+    if isinstance(valor, bool):
+        return valor
+    if isinstance(valor, (int, float)):
+        return Decimal(str(valor))
+    if isinstance(valor, list):
+        return [_a_dynamo(v) for v in valor]
+    if isinstance(valor, dict):
+        return {k: _a_dynamo(v) for k, v in valor.items()}
+    return valor
+
+class MemoriaRepository:
+    """Repositorio en memoria con la interfaz de `DynamoRepository`, para pruebas de carga y benchmarks sin AWS.
+
+    Cada franquicia se guarda serializada con pickle y con los números como Decimal: toda lectura
+    deserializa el ítem completo y pasa por convert_decimal, como en el diseño anidado. `latencia`
+    (más una variación aleatoria de hasta `variacion` segundos) se duerme antes de cada operación,
+    fuera del lock, para simular el viaje de red; `operaciones` cuenta las llamadas por tipo.
+    """
+
+    # Sin límite de tamaño por ítem: guardar_productos acepta cargas de cualquier tamaño
+    MAX_PRODUCTOS_POR_LOTE = None
+
+    def __init__(self, table_name: str = "Franquicias", latencia: float = 0.0, variacion: float = 0.0):
+        self.table_name = table_name
+        self.latencia = latencia
+        self.variacion = variacion
+        self.operaciones: Counter = Counter()
+        self.cache = None
+        # FranquiciaID -> (resumen, ítem serializado)
+        self._items: Dict[str, Tuple[Dict[str, Any], bytes]] = {}
+        self._lock = threading.Lock()
+
+    def get_item(self, key: dict, campos: Optional[Dict[str, dict]] = None):
+        """Obtiene una franquicia por su clave (solo `campos` si se indican); None si no existe."""
+        self._esperar("GetItem")
+        item = self._leer(key["FranquiciaID"])
+        return proyectar(convert_decimal(item), campos) if item is not None else None
+
+    def franquicia_existe(self, franquicia_id: str) -> bool:
+        self._esperar("GetItem")
+        return franquicia_id in self._items
+
+    def obtener_version(self, franquicia_id: str) -> Optional[int]:
+        """Versión actual de la franquicia; False si no existe."""
+        self._esperar("GetItem")
+        entrada = self._items.get(franquicia_id)
+        return int(entrada[0].get(ATRIBUTO_VERSION, 0)) if entrada is not None else False
+
+    def batch_get_items(self, keys: List[dict], campos: Optional[Dict[str, dict]] = None) -> Optional[List[Dict[str, Any]]]:
+        """Obtiene varias franquicias; las claves que no existen no aparecen en el resultado."""
+        self._esperar("BatchGetItem")
+        items = (self._leer(key["FranquiciaID"]) for key in keys)
+        return [proyectar(convert_decimal(item), campos) for item in items if item is not None]
+
+    def put_item(self, item: dict):
+        """Inserta o reemplaza una franquicia (con versión 1 si no trae una)."""
+        self._esperar("PutItem")
+        with self._lock:
+            self._guardar({ATRIBUTO_VERSION: 1, **_a_dynamo(item)})
+        logger.info("✅ Ítem insertado correctamente: %s", item.get("FranquiciaID"))
+        return True
+
+    def delete_item(self, key: dict) -> bool:
+        self._esperar("DeleteItem")
+        with self._lock:
+            self._items.pop(key["FranquiciaID"], None)
+        logger.info("✅ Ítem eliminado correctamente: %s", key)
+        return True
+
+    def actualizar_franquicia(self, franquicia_id: str, sucursales: list) -> bool:
+        """Reemplaza la lista de sucursales (crea el ítem si no existe, como update_item en DynamoDB)."""
+        self._esperar("UpdateItem")
+        with self._lock:
+            item = self._leer(franquicia_id) or {"FranquiciaID": franquicia_id}
+            item["Sucursales"] = _a_dynamo(sucursales)
+            self._incrementar_y_guardar(item)
+        return True
+
+    def update_item(self, key: dict, update_expression: str, expression_values: dict):
+        """Aplica una expresión `SET a = :x, b = :y` sobre atributos de primer nivel y retorna los nuevos valores.
+
+        Otras expresiones no están soportadas: se registra el error y se retorna None.
+        """
+        self._esperar("UpdateItem")
+        clausula, _, asignaciones = update_expression.strip().partition(" ")
+        cambios = {}
+        for asignacion in asignaciones.split(","):
+            coincidencia = _ASIGNACION.match(asignacion)
+            if clausula.upper() != "SET" or not coincidencia or coincidencia.group(2) not in expression_values:
+                logger.error(f"Error en update_item: expresión no soportada en memoria: {update_expression}")
+                return None
+            cambios[coincidencia.group(1)] = _a_dynamo(expression_values[coincidencia.group(2)])
+        with self._lock:
+            item = self._leer(key["FranquiciaID"]) or {"FranquiciaID": key["FranquiciaID"]}
+            item.update(cambios)
+            self._incrementar_y_guardar(item)
+        return convert_decimal({**cambios, ATRIBUTO_VERSION: item[ATRIBUTO_VERSION]})
+
+    def listar_franquicias(self, limite: int, inicio: Optional[Dict[str, Any]] = None):
+        """Página de resúmenes en orden de FranquiciaID; el cursor es la clave del último retornado."""
+        self._esperar("Scan")
+        ids = sorted(self._items)
+        desde = bisect.bisect_right(ids, inicio["FranquiciaID"]) if inicio else 0
+        pagina = ids[desde:desde + limite]
+        resumenes = [convert_decimal(self._items[fid][0]) for fid in pagina if fid in self._items]
+        siguiente = {"FranquiciaID": pagina[-1]} if pagina and desde + limite < len(ids) else None
+        return resumenes, siguiente
+
+    def escanear_franquicias(self, segmentos: int) -> Optional[List[Dict[str, Any]]]:
+        self._esperar("Scan")
+        return [convert_decimal(resumen) for resumen, _ in list(self._items.values())]
+
+    def actualizar_nombre(self, franquicia_id: str, nuevo_nombre: str) -> Optional[bool]:
+        def aplicar(item):
+            item["Nombre"] = nuevo_nombre
+            return True
+        return self._modificar(franquicia_id, aplicar)
+
+    # Operaciones por entidad: True si se aplicó el cambio y False si la franquicia, sucursal o producto no existe
+
+    def agregar_sucursal(self, franquicia_id: str, sucursal: Dict[str, Any]) -> Optional[bool]:
+        def aplicar(item):
+            item.setdefault("Sucursales", []).append(_a_dynamo(sucursal))
+            return True
+        return self._modificar(franquicia_id, aplicar)
+
+    def actualizar_sucursal(self, franquicia_id: str, sucursal_id: str, nuevo_nombre: str) -> Optional[bool]:
+        def aplicar(item):
+            sucursal = _buscar(item.get("Sucursales", []), "SucursalID", sucursal_id)
+            if sucursal is None:
+                return False
+            sucursal["Nombre"] = nuevo_nombre
+            return True
+        return self._modificar(franquicia_id, aplicar)
+
+    def eliminar_sucursal(self, franquicia_id: str, sucursal_id: str) -> Optional[bool]:
+        def aplicar(item):
+            sucursales = item.get("Sucursales", [])
+            restantes = [s for s in sucursales if s.get("SucursalID") != sucursal_id]
+            if len(restantes) == len(sucursales):
+                return False
+            item["Sucursales"] = restantes
+            return True
+        return self._modificar(franquicia_id, aplicar)
+
+    def agregar_producto(self, franquicia_id: str, sucursal_id: str, producto: Dict[str, Any]) -> Optional[bool]:
+        def aplicar(item):
+            sucursal = _buscar(item.get("Sucursales", []), "SucursalID", sucursal_id)
+            if sucursal is None:
+                return False
+            sucursal.setdefault("Productos", []).append(_a_dynamo(producto))
+            return True
+        return self._modificar(franquicia_id, aplicar)
+
+    def actualizar_producto(self, franquicia_id: str, sucursal_id: str, producto_id: str, cambios: Dict[str, Any]) -> Optional[bool]:
+        def aplicar(item):
+            producto = _buscar_producto(item, sucursal_id, producto_id)
+            if producto is None:
+                return False
+            producto.update(_a_dynamo(cambios))
+            return True
+        return self._modificar(franquicia_id, aplicar)
+
+    def eliminar_producto(self, franquicia_id: str, sucursal_id: str, producto_id: str) -> Optional[bool]:
+        def aplicar(item):
+            sucursal = _buscar(item.get("Sucursales", []), "SucursalID", sucursal_id)
+            productos = (sucursal or {}).get("Productos", [])
+            restantes = [p for p in productos if p.get("ProductoID") != producto_id]
+            if sucursal is None or len(restantes) == len(productos):
+                return False
+            sucursal["Productos"] = restantes
+            return True
+        return self._modificar(franquicia_id, aplicar)
+
+    def ajustar_stock(self, franquicia_id: str, sucursal_id: str, producto_id: str, delta: int) -> Optional[int]:
+        """Suma `delta` al stock y retorna el nuevo valor; lanza StockInsuficiente si quedaría negativo."""
+        def aplicar(item):
+            producto = _buscar_producto(item, sucursal_id, producto_id)
+            if producto is None:
+                return False
+            nuevo = producto.get("Stock", 0) + delta
+            if nuevo < 0:
+                raise StockInsuficiente(producto_id)
+            producto["Stock"] = nuevo
+            return int(nuevo)
+        return self._modificar(franquicia_id, aplicar)
+
+    def guardar_productos(self, franquicia_id: str, sucursal_id: str, productos: List[Dict[str, Any]]):
+        """Inserta o reemplaza (por ProductoID) varios productos; {ProductoID: True} o False si algo no existe."""
+        def aplicar(item):
+            sucursal = _buscar(item.get("Sucursales", []), "SucursalID", sucursal_id)
+            if sucursal is None:
+                return False
+            por_id = {p["ProductoID"]: p for p in sucursal.get("Productos", [])}
+            por_id.update((p["ProductoID"], _a_dynamo(p)) for p in productos)
+            sucursal["Productos"] = list(por_id.values())
+            return True
+        resultado = self._modificar(franquicia_id, aplicar)
+        return {p["ProductoID"]: True for p in productos} if resultado else resultado
+
+    def obtener_producto(self, franquicia_id: str, sucursal_id: str, producto_id: str,
+                         campos: Optional[Dict[str, dict]] = None):
+        """Retorna el producto (solo `campos` si se indican) o False si algo no existe."""
+        self._esperar("GetItem")
+        item = self._leer(franquicia_id)
+        producto = _buscar_producto(item, sucursal_id, producto_id) if item is not None else None
+        return proyectar(convert_decimal(producto), campos) if producto else False
+
+    def productos_mas_stock(self, franquicia_id: str, top: int, sucursal_id: Optional[str] = None):
+        """Los `top` productos con mayor stock (mayor a cero); False si la franquicia no existe."""
+        self._esperar("GetItem")
+        item = self._leer(franquicia_id)
+        if item is None:
+            return False
+        candidatos = (
+            (producto, sucursal.get("SucursalID"))
+            for sucursal in item.get("Sucursales", [])
+            if sucursal_id is None or sucursal.get("SucursalID") == sucursal_id
+            for producto in sucursal.get("Productos", [])
+            if isinstance(producto.get("Stock"), (int, Decimal)) and producto["Stock"] > 0
+        )
+        mejores = heapq.nlargest(top, candidatos, key=lambda par: par[0]["Stock"])
+        return [convert_decimal({**producto, "SucursalID": sid}) for producto, sid in mejores]
+
+    def listar_sucursales(self, franquicia_id: str, limite: int, inicio: Optional[Dict[str, Any]] = None):
+        """Página de sucursales (sin productos); mismo cursor por posición que el diseño anidado."""
+        desde = _posicion_cursor(inicio, "desde")
+        self._esperar("GetItem")
+        item = self._leer(franquicia_id)
+        if item is None:
+            return False
+        sucursales = [
+            {k: s[k] for k in ATRIBUTOS_SUCURSAL if k in s}
+            for s in item.get("Sucursales", [])[desde:desde + limite + 1]
+        ]
+        siguiente = {"desde": desde + limite} if len(sucursales) > limite else None
+        return convert_decimal(sucursales[:limite]), siguiente
+
+    def listar_productos(self, franquicia_id: str, sucursal_id: str, limite: int, inicio: Optional[Dict[str, Any]] = None):
+        """Página de productos de una sucursal; False si la franquicia o la sucursal no existe."""
+        desde = _posicion_cursor(inicio, "desde")
+        if inicio is not None:
+            _posicion_cursor(inicio, "sucursal")
+        self._esperar("GetItem")
+        item = self._leer(franquicia_id)
+        sucursales = item.get("Sucursales", []) if item is not None else []
+        i = next((n for n, s in enumerate(sucursales) if s.get("SucursalID") == sucursal_id), -1)
+        if i == -1:
+            return False
+        productos = sucursales[i].get("Productos", [])[desde:desde + limite + 1]
+        siguiente = {"sucursal": i, "desde": desde + limite} if len(productos) > limite else None
+        return convert_decimal(productos[:limite]), siguiente
+
+    def _esperar(self, operacion: str) -> None:
+        """Cuenta la operación y simula su latencia de red."""
+        self.operaciones[operacion] += 1
+        if self.latencia or self.variacion:
+            time.sleep(self.latencia + random.uniform(0, self.variacion))
+
+    def _leer(self, franquicia_id: str) -> Optional[Dict[str, Any]]:
+        """Copia independiente del ítem (con Decimal), o None si no existe."""
+        entrada = self._items.get(franquicia_id)
+        return pickle.loads(entrada[1]) if entrada is not None else None
+
+    def _guardar(self, item: Dict[str, Any]) -> None:
+        resumen = {k: item[k] for k in ATRIBUTOS_RESUMEN if k in item}
+        self._items[item["FranquiciaID"]] = (resumen, pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def _incrementar_y_guardar(self, item: Dict[str, Any]) -> None:
+        item[ATRIBUTO_VERSION] = item.get(ATRIBUTO_VERSION, 0) + 1
+        self._guardar(item)
+
+    def _modificar(self, franquicia_id: str, aplicar: Callable[[Dict[str, Any]], Any]):
+        """Lee-modifica-escribe la franquicia bajo el lock; retorna lo que retorna `aplicar` (False si algo no existe)."""
+        self._esperar("UpdateItem")
+        with self._lock:
+            item = self._leer(franquicia_id)
+            if item is None:
+                return False
+            resultado = aplicar(item)
+            if resultado is not False:
+                self._incrementar_y_guardar(item)
+            return resultado
+
+def _buscar(elementos: List[Dict[str, Any]], atributo: str, valor: str) -> Optional[Dict[str, Any]]:
+    return next((e for e in elementos if e.get(atributo) == valor), None)
+
+def _buscar_producto(item: Dict[str, Any], sucursal_id: str, producto_id: str) -> Optional[Dict[str, Any]]:
+    sucursal = _buscar(item.get("Sucursales", []), "SucursalID", sucursal_id)
+    return _buscar(sucursal.get("Productos", []), "ProductoID", producto_id) if sucursal is not None else None
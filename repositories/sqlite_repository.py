@@ -0,0 +1,447 @@
+import os
+import sqlite3
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List, Iterator, Tuple
+from core.campos import proyectar
+from repositories.dynamo_repository import ATRIBUTO_VERSION, StockInsuficiente, _posicion_cursor
+
+logger = logging.getLogger(__name__)
+
+# Espera máxima por el lock de escritura de SQLite y sentencias preparadas que se conservan por conexión
+ESPERA_BLOQUEO_MS = int(os.environ.get("SQLITE_ESPERA_BLOQUEO_MS", "5000"))
+SENTENCIAS_EN_CACHE = 256
+
+# Las sucursales y productos conservan el orden de inserción con su `id`, que también es la
+# posición de los cursores. `version` es el contador de la franquicia (ETag) y `sincronizada` la
+# última versión enviada a DynamoDB; `eliminadas` guarda las bajas pendientes de sincronizar.
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS franquicias (
+    franquicia_id TEXT PRIMARY KEY,
+    nombre TEXT,
+    version INTEGER NOT NULL DEFAULT 1,
+    sincronizada INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS sucursales (
+    id INTEGER PRIMARY KEY,
+    franquicia_id TEXT NOT NULL REFERENCES franquicias (franquicia_id) ON DELETE CASCADE,
+    sucursal_id TEXT NOT NULL,
+    nombre TEXT,
+    UNIQUE (franquicia_id, sucursal_id)
+);
+CREATE INDEX IF NOT EXISTS sucursales_orden ON sucursales (franquicia_id, id);
+CREATE TABLE IF NOT EXISTS productos (
+    id INTEGER PRIMARY KEY,
+    franquicia_id TEXT NOT NULL,
+    sucursal_id TEXT NOT NULL,
+    producto_id TEXT NOT NULL,
+    nombre TEXT,
+    stock INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (franquicia_id, sucursal_id, producto_id),
+    FOREIGN KEY (franquicia_id, sucursal_id) REFERENCES sucursales (franquicia_id, sucursal_id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS productos_orden ON productos (franquicia_id, sucursal_id, id);
+CREATE INDEX IF NOT EXISTS productos_stock_franquicia ON productos (franquicia_id, stock DESC);
+CREATE INDEX IF NOT EXISTS productos_stock_sucursal ON productos (franquicia_id, sucursal_id, stock DESC);
+CREATE TABLE IF NOT EXISTS eliminadas (franquicia_id TEXT PRIMARY KEY);
+"""
+
+SQL_FRANQUICIA = "SELECT nombre, version FROM franquicias WHERE franquicia_id = ?"
+SQL_EXISTE = "SELECT 1 FROM franquicias WHERE franquicia_id = ?"
+SQL_SUCURSALES = "SELECT sucursal_id, nombre FROM sucursales WHERE franquicia_id = ? ORDER BY id"
+SQL_PRODUCTOS = "SELECT sucursal_id, producto_id, nombre, stock FROM productos WHERE franquicia_id = ? ORDER BY id"
+SQL_PRODUCTO = "SELECT producto_id, nombre, stock FROM productos WHERE franquicia_id = ? AND sucursal_id = ? AND producto_id = ?"
+SQL_EXISTE_SUCURSAL = "SELECT 1 FROM sucursales WHERE franquicia_id = ? AND sucursal_id = ?"
+SQL_INSERTAR_FRANQUICIA = "INSERT INTO franquicias (franquicia_id, nombre, version) VALUES (?, ?, ?)"
+SQL_INSERTAR_SUCURSAL = "INSERT INTO sucursales (franquicia_id, sucursal_id, nombre) VALUES (?, ?, ?)"
+SQL_GUARDAR_PRODUCTO = (
+    "INSERT INTO productos (franquicia_id, sucursal_id, producto_id, nombre, stock) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT (franquicia_id, sucursal_id, producto_id) DO UPDATE SET nombre = excluded.nombre, stock = excluded.stock"
+)
+SQL_INCREMENTAR_VERSION = "UPDATE franquicias SET version = version + 1 WHERE franquicia_id = ?"
+
+def _registra_errores(metodo):
+    """Registra los errores de SQLite y retorna None, como los errores de DynamoDB en los otros repositorios."""
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        try:
+            return metodo(self, *args, **kwargs)
+        except sqlite3.Error as e:
+            logger.error(f"❌ Error de SQLite en {metodo.__name__}: {str(e)}")
+            return None
+    return envoltura
+
+class SQLiteRepository:
+    """Repositorio sobre SQLite en modo WAL para tiendas sin conexión, con la interfaz de `DynamoRepository`.
+
+    Franquicias, sucursales y productos son tablas indexadas: una escritura toca solo las filas de la
+    entidad y el ranking de stock usa un índice. Cada hilo tiene su conexión (con su caché de sentencias
+    preparadas) y cada escritura es una transacción IMMEDIATE que además incrementa la versión de la
+    franquicia. `tools.sincronizar` envía después a DynamoDB las franquicias cuya versión avanzó.
+    """
+
+    # Cada producto es una fila: guardar_productos acepta cargas de cualquier tamaño
+    MAX_PRODUCTOS_POR_LOTE = None
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.cache = None
+        self._local = threading.local()
+        self._conexion().executescript(ESQUEMA)
+
+    def _conexion(self) -> sqlite3.Connection:
+        cx = getattr(self._local, "conexion", None)
+        if cx is None:
+            # isolation_level=None: las transacciones se abren explícitamente con BEGIN IMMEDIATE
+            cx = sqlite3.connect(self.ruta, isolation_level=None, cached_statements=SENTENCIAS_EN_CACHE)
+            cx.execute("PRAGMA journal_mode = WAL")
+            cx.execute("PRAGMA synchronous = NORMAL")
+            cx.execute("PRAGMA foreign_keys = ON")
+            cx.execute(f"PRAGMA busy_timeout = {ESPERA_BLOQUEO_MS}")
+            self._local.conexion = cx
+        return cx
+
+    @contextmanager
+    def _transaccion(self) -> Iterator[sqlite3.Connection]:
+        """Transacción de escritura: toma el lock al empezar para que la lectura previa no quede obsoleta."""
+        cx = self._conexion()
+        cx.execute("BEGIN IMMEDIATE")
+        try:
+            yield cx
+        except BaseException:
+            cx.execute("ROLLBACK")
+            raise
+        cx.execute("COMMIT")
+
+    @contextmanager
+    def _lectura(self) -> Iterator[sqlite3.Connection]:
+        """Transacción de lectura: en WAL todas sus consultas ven la misma instantánea, sin bloquear escrituras."""
+        cx = self._conexion()
+        cx.execute("BEGIN")
+        try:
+            yield cx
+        finally:
+            cx.execute("COMMIT")
+
+    @_registra_errores
+    def get_item(self, key: dict, campos: Optional[Dict[str, dict]] = None):
+        """Obtiene la franquicia con sus sucursales y productos (solo `campos` si se indican); None si no existe.
+
+        Si `campos` no incluye Sucursales basta con la fila de la franquicia.
+        """
+        with self._lectura() as cx:
+            franquicia = self._leer_franquicia(cx, key["FranquiciaID"], not campos or "Sucursales" in campos)
+        return proyectar(franquicia, campos) if franquicia else None
+
+    @_registra_errores
+    def franquicia_existe(self, franquicia_id: str) -> bool:
+        return self._conexion().execute(SQL_EXISTE, (franquicia_id,)).fetchone() is not None
+
+    @_registra_errores
+    def obtener_version(self, franquicia_id: str) -> Optional[int]:
+        """Versión actual de la franquicia; False si no existe."""
+        fila = self._conexion().execute(SQL_FRANQUICIA, (franquicia_id,)).fetchone()
+        return fila[1] if fila else False
+
+    @_registra_errores
+    def batch_get_items(self, keys: List[dict], campos: Optional[Dict[str, dict]] = None) -> Optional[List[Dict[str, Any]]]:
+        """Obtiene varias franquicias en una transacción de lectura; las que no existen no aparecen."""
+        completas = not campos or "Sucursales" in campos
+        with self._lectura() as cx:
+            franquicias = [self._leer_franquicia(cx, key["FranquiciaID"], completas) for key in keys]
+        return [proyectar(f, campos) for f in franquicias if f]
+
+    @_registra_errores
+    def put_item(self, item: dict):
+        """Inserta o reemplaza una franquicia con todas sus filas en una sola transacción."""
+        with self._transaccion() as cx:
+            cx.execute("DELETE FROM franquicias WHERE franquicia_id = ?", (item["FranquiciaID"],))
+            cx.execute("DELETE FROM eliminadas WHERE franquicia_id = ?", (item["FranquiciaID"],))
+            cx.execute(SQL_INSERTAR_FRANQUICIA, (item["FranquiciaID"], item.get("Nombre"), item.get(ATRIBUTO_VERSION, 1)))
+            self._insertar_sucursales(cx, item["FranquiciaID"], item.get("Sucursales", []))
+        logger.info("✅ Ítem insertado correctamente: %s", item.get("FranquiciaID"))
+        return True
+
+    @_registra_errores
+    def delete_item(self, key: dict) -> bool:
+        """Elimina la franquicia (sus filas caen en cascada) y deja la baja pendiente de sincronizar."""
+        with self._transaccion() as cx:
+            cx.execute("DELETE FROM franquicias WHERE franquicia_id = ?", (key["FranquiciaID"],))
+            cx.execute("INSERT OR IGNORE INTO eliminadas (franquicia_id) VALUES (?)", (key["FranquiciaID"],))
+        logger.info("✅ Ítem eliminado correctamente: %s", key)
+        return True
+
+    @_registra_errores
+    def actualizar_franquicia(self, franquicia_id: str, sucursales: list) -> bool:
+        """Reemplaza todas las sucursales (crea la franquicia si no existe, como update_item en DynamoDB)."""
+        with self._transaccion() as cx:
+            if cx.execute(SQL_EXISTE, (franquicia_id,)).fetchone() is None:
+                cx.execute(SQL_INSERTAR_FRANQUICIA, (franquicia_id, None, 0))
+            cx.execute("DELETE FROM sucursales WHERE franquicia_id = ?", (franquicia_id,))
+            self._insertar_sucursales(cx, franquicia_id, sucursales)
+            cx.execute(SQL_INCREMENTAR_VERSION, (franquicia_id,))
+        return True
+
+    @_registra_errores
+    def update_item(self, key: dict, update_expression: str, expression_values: dict):
+        """Solo admite `SET Nombre = :valor`, el único atributo propio de la fila; otras expresiones retornan None."""
+        partes = update_expression.split()
+        if len(partes) != 4 or partes[0].upper() != "SET" or partes[1] != "Nombre" or partes[2] != "=" or partes[3] not in expression_values:
+            logger.error(f"Error en update_item: expresión no soportada en SQLite: {update_expression}")
+            return None
+        with self._transaccion() as cx:
+            fila = cx.execute(
+                "UPDATE franquicias SET nombre = ?, version = version + 1 WHERE franquicia_id = ? RETURNING version",
+                (expression_values[partes[3]], key["FranquiciaID"])
+            ).fetchone()
+        return {"Nombre": expression_values[partes[3]], ATRIBUTO_VERSION: fila[0]} if fila else {}
+
+    @_registra_errores
+    def listar_franquicias(self, limite: int, inicio: Optional[Dict[str, Any]] = None):
+        """Página de resúmenes en orden de FranquiciaID; el cursor es la clave del último retornado."""
+        filas = self._conexion().execute(
+            "SELECT franquicia_id, nombre, version FROM franquicias WHERE franquicia_id > ? ORDER BY franquicia_id LIMIT ?",
+            ((inicio or {}).get("FranquiciaID", ""), limite + 1)
+        ).fetchall()
+        resumenes = [_resumen(fila) for fila in filas[:limite]]
+        siguiente = {"FranquiciaID": resumenes[-1]["FranquiciaID"]} if len(filas) > limite else None
+        return resumenes, siguiente
+
+    @_registra_errores
+    def escanear_franquicias(self, segmentos: int) -> Optional[List[Dict[str, Any]]]:
+        """Resúmenes de todas las franquicias; en SQLite un solo recorrido del índice basta."""
+        filas = self._conexion().execute("SELECT franquicia_id, nombre, version FROM franquicias").fetchall()
+        return [_resumen(fila) for fila in filas]
+
+    @_registra_errores
+    def actualizar_nombre(self, franquicia_id: str, nuevo_nombre: str) -> Optional[bool]:
+        with self._transaccion() as cx:
+            cursor = cx.execute(
+                "UPDATE franquicias SET nombre = ?, version = version + 1 WHERE franquicia_id = ?", (nuevo_nombre, franquicia_id)
+            )
+        return cursor.rowcount > 0
+
+    # Operaciones por entidad: True si se aplicó el cambio, False si la franquicia, sucursal o producto
+    # no existe y None ante un error de SQLite. Todas tocan solo las filas de la entidad.
+
+    @_registra_errores
+    def agregar_sucursal(self, franquicia_id: str, sucursal: Dict[str, Any]) -> Optional[bool]:
+        with self._transaccion() as cx:
+            if cx.execute(SQL_EXISTE, (franquicia_id,)).fetchone() is None:
+                return False
+            self._insertar_sucursales(cx, franquicia_id, [sucursal])
+            cx.execute(SQL_INCREMENTAR_VERSION, (franquicia_id,))
+        return True
+
+    @_registra_errores
+    def actualizar_sucursal(self, franquicia_id: str, sucursal_id: str, nuevo_nombre: str) -> Optional[bool]:
+        return self._escribir_entidad(
+            franquicia_id, "UPDATE sucursales SET nombre = ? WHERE franquicia_id = ? AND sucursal_id = ?",
+            (nuevo_nombre, franquicia_id, sucursal_id)
+        )
+
+    @_registra_errores
+    def eliminar_sucursal(self, franquicia_id: str, sucursal_id: str) -> Optional[bool]:
+        return self._escribir_entidad(
+            franquicia_id, "DELETE FROM sucursales WHERE franquicia_id = ? AND sucursal_id = ?", (franquicia_id, sucursal_id)
+        )
+
+    @_registra_errores
+    def agregar_producto(self, franquicia_id: str, sucursal_id: str, producto: Dict[str, Any]) -> Optional[bool]:
+        with self._transaccion() as cx:
+            if cx.execute(SQL_EXISTE_SUCURSAL, (franquicia_id, sucursal_id)).fetchone() is None:
+                return False
+            cx.execute(SQL_GUARDAR_PRODUCTO, _fila_producto(franquicia_id, sucursal_id, producto))
+            cx.execute(SQL_INCREMENTAR_VERSION, (franquicia_id,))
+        return True
+
+    @_registra_errores
+    def actualizar_producto(self, franquicia_id: str, sucursal_id: str, producto_id: str, cambios: Dict[str, Any]) -> Optional[bool]:
+        columnas = {"Nombre": "nombre", "Stock": "stock"}
+        asignaciones = [(columnas[campo], valor) for campo, valor in cambios.items() if campo in columnas]
+        if not asignaciones:
+            return False
+        return self._escribir_entidad(
+            franquicia_id,
+            f"UPDATE productos SET {', '.join(f'{columna} = ?' for columna, _ in asignaciones)} "
+            "WHERE franquicia_id = ? AND sucursal_id = ? AND producto_id = ?",
+            (*(valor for _, valor in asignaciones), franquicia_id, sucursal_id, producto_id)
+        )
+
+    @_registra_errores
+    def eliminar_producto(self, franquicia_id: str, sucursal_id: str, producto_id: str) -> Optional[bool]:
+        return self._escribir_entidad(
+            franquicia_id, "DELETE FROM productos WHERE franquicia_id = ? AND sucursal_id = ? AND producto_id = ?",
+            (franquicia_id, sucursal_id, producto_id)
+        )
+
+    @_registra_errores
+    def ajustar_stock(self, franquicia_id: str, sucursal_id: str, producto_id: str, delta: int) -> Optional[int]:
+        """Suma `delta` al stock en una sola sentencia y retorna el nuevo valor.
+
+        Lanza StockInsuficiente si el resultado sería negativo.
+        """
+        with self._transaccion() as cx:
+            fila = cx.execute(
+                "UPDATE productos SET stock = stock + ? WHERE franquicia_id = ? AND sucursal_id = ? AND producto_id = ? "
+                "AND stock + ? >= 0 RETURNING stock",
+                (delta, franquicia_id, sucursal_id, producto_id, delta)
+            ).fetchone()
+            if fila is None:
+                if cx.execute(SQL_PRODUCTO, (franquicia_id, sucursal_id, producto_id)).fetchone() is not None:
+                    raise StockInsuficiente(producto_id)
+                return False
+            cx.execute(SQL_INCREMENTAR_VERSION, (franquicia_id,))
+        return fila[0]
+
+    @_registra_errores
+    def guardar_productos(self, franquicia_id: str, sucursal_id: str, productos: List[Dict[str, Any]]):
+        """Inserta o reemplaza (por ProductoID) varios productos con un solo executemany.
+
+        Retorna {ProductoID: True}, False si la franquicia o la sucursal no existe y None ante error.
+        """
+        with self._transaccion() as cx:
+            if cx.execute(SQL_EXISTE_SUCURSAL, (franquicia_id, sucursal_id)).fetchone() is None:
+                return False
+            cx.executemany(SQL_GUARDAR_PRODUCTO, (_fila_producto(franquicia_id, sucursal_id, p) for p in productos))
+            cx.execute(SQL_INCREMENTAR_VERSION, (franquicia_id,))
+        return {p["ProductoID"]: True for p in productos}
+
+    @_registra_errores
+    def obtener_producto(self, franquicia_id: str, sucursal_id: str, producto_id: str,
+                         campos: Optional[Dict[str, dict]] = None):
+        """Retorna el producto (solo `campos` si se indican) o False si algo no existe."""
+        fila = self._conexion().execute(SQL_PRODUCTO, (franquicia_id, sucursal_id, producto_id)).fetchone()
+        return proyectar(_producto(fila), campos) if fila else False
+
+    @_registra_errores
+    def productos_mas_stock(self, franquicia_id: str, top: int, sucursal_id: Optional[str] = None):
+        """Los `top` productos con mayor stock (mayor a cero), leídos en orden del índice de stock.
+
+        False si la franquicia no existe.
+        """
+        cx = self._conexion()
+        if sucursal_id is None:
+            filas = cx.execute(
+                "SELECT producto_id, nombre, stock, sucursal_id FROM productos "
+                "WHERE franquicia_id = ? AND stock > 0 ORDER BY stock DESC LIMIT ?", (franquicia_id, top)
+            ).fetchall()
+        else:
+            filas = cx.execute(
+                "SELECT producto_id, nombre, stock, sucursal_id FROM productos "
+                "WHERE franquicia_id = ? AND sucursal_id = ? AND stock > 0 ORDER BY stock DESC LIMIT ?",
+                (franquicia_id, sucursal_id, top)
+            ).fetchall()
+        if not filas and cx.execute(SQL_EXISTE, (franquicia_id,)).fetchone() is None:
+            return False
+        return [{**_producto(fila), "SucursalID": fila[3]} for fila in filas]
+
+    # Listados paginados: la posición del cursor es el `id` de la última fila retornada
+
+    @_registra_errores
+    def listar_sucursales(self, franquicia_id: str, limite: int, inicio: Optional[Dict[str, Any]] = None):
+        """Página de sucursales (sin productos). False si la franquicia no existe."""
+        desde = _posicion_cursor(inicio, "desde")
+        cx = self._conexion()
+        filas = cx.execute(
+            "SELECT id, sucursal_id, nombre FROM sucursales WHERE franquicia_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (franquicia_id, desde, limite + 1)
+        ).fetchall()
+        if not filas and cx.execute(SQL_EXISTE, (franquicia_id,)).fetchone() is None:
+            return False
+        siguiente = {"desde": filas[limite - 1][0]} if len(filas) > limite else None
+        return [_sucursal(fila[1:]) for fila in filas[:limite]], siguiente
+
+    @_registra_errores
+    def listar_productos(self, franquicia_id: str, sucursal_id: str, limite: int, inicio: Optional[Dict[str, Any]] = None):
+        """Página de productos de una sucursal. False si la franquicia o la sucursal no existe."""
+        desde = _posicion_cursor(inicio, "desde")
+        cx = self._conexion()
+        filas = cx.execute(
+            "SELECT id, producto_id, nombre, stock FROM productos "
+            "WHERE franquicia_id = ? AND sucursal_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (franquicia_id, sucursal_id, desde, limite + 1)
+        ).fetchall()
+        if not filas and cx.execute(SQL_EXISTE_SUCURSAL, (franquicia_id, sucursal_id)).fetchone() is None:
+            return False
+        siguiente = {"desde": filas[limite - 1][0]} if len(filas) > limite else None
+        return [_producto(fila[1:]) for fila in filas[:limite]], siguiente
+
+    # Sincronización con DynamoDB (ver tools.sincronizar)
+
+    @_registra_errores
+    def pendientes_de_sincronizar(self) -> Optional[Tuple[List[Tuple[str, int]], List[str]]]:
+        """(franquicias cuya versión avanzó desde el último envío con su versión, IDs de franquicias eliminadas)."""
+        cx = self._conexion()
+        modificadas = cx.execute("SELECT franquicia_id, version FROM franquicias WHERE version > sincronizada").fetchall()
+        eliminadas = [fila[0] for fila in cx.execute("SELECT franquicia_id FROM eliminadas").fetchall()]
+        return modificadas, eliminadas
+
+    @_registra_errores
+    def marcar_sincronizada(self, franquicia_id: str, version: int) -> bool:
+        """Registra que la franquicia se envió en `version`; si cambió después, seguirá pendiente."""
+        with self._transaccion() as cx:
+            cx.execute("UPDATE franquicias SET sincronizada = ? WHERE franquicia_id = ?", (version, franquicia_id))
+        return True
+
+    @_registra_errores
+    def marcar_eliminacion_sincronizada(self, franquicia_id: str) -> bool:
+        with self._transaccion() as cx:
+            cx.execute("DELETE FROM eliminadas WHERE franquicia_id = ?", (franquicia_id,))
+        return True
+
+    def _leer_franquicia(self, cx: sqlite3.Connection, franquicia_id: str, completa: bool = True) -> Optional[Dict[str, Any]]:
+        fila = cx.execute(SQL_FRANQUICIA, (franquicia_id,)).fetchone()
+        if fila is None:
+            return None
+        franquicia = {"FranquiciaID": franquicia_id, ATRIBUTO_VERSION: fila[1]}
+        if fila[0] is not None:
+            franquicia["Nombre"] = fila[0]
+        if not completa:
+            return franquicia
+
+        sucursales = {}
+        for sucursal_id, nombre in cx.execute(SQL_SUCURSALES, (franquicia_id,)):
+            sucursales[sucursal_id] = {**_sucursal((sucursal_id, nombre)), "Productos": []}
+        for sucursal_id, *producto in cx.execute(SQL_PRODUCTOS, (franquicia_id,)):
+            sucursales[sucursal_id]["Productos"].append(_producto(producto))
+        franquicia["Sucursales"] = list(sucursales.values())
+        return franquicia
+
+    def _insertar_sucursales(self, cx: sqlite3.Connection, franquicia_id: str, sucursales: List[Dict[str, Any]]) -> None:
+        """Inserta sucursales y productos con un executemany por tabla."""
+        cx.executemany(SQL_INSERTAR_SUCURSAL, ((franquicia_id, s["SucursalID"], s.get("Nombre")) for s in sucursales))
+        cx.executemany(SQL_GUARDAR_PRODUCTO, (
+            _fila_producto(franquicia_id, s["SucursalID"], p) for s in sucursales for p in s.get("Productos", [])
+        ))
+
+    def _escribir_entidad(self, franquicia_id: str, sql: str, parametros: tuple) -> bool:
+        """Ejecuta una escritura sobre una fila; si la afectó, incrementa la versión en la misma transacción."""
+        with self._transaccion() as cx:
+            if cx.execute(sql, parametros).rowcount == 0:
+                return False
+            cx.execute(SQL_INCREMENTAR_VERSION, (franquicia_id,))
+        return True
+
+def _resumen(fila: tuple) -> Dict[str, Any]:
+    resumen = {"FranquiciaID": fila[0], ATRIBUTO_VERSION: fila[2]}
+    if fila[1] is not None:
+        resumen["Nombre"] = fila[1]
+    return resumen
+
+def _sucursal(fila: tuple) -> Dict[str, Any]:
+    sucursal = {"SucursalID": fila[0]}
+    if fila[1] is not None:
+        sucursal["Nombre"] = fila[1]
+    return sucursal
+
+def _producto(fila: tuple) -> Dict[str, Any]:
+    producto = {"ProductoID": fila[0], "Stock": fila[2]}
+    if fila[1] is not None:
+        producto["Nombre"] = fila[1]
+    return producto
+
+def _fila_producto(franquicia_id: str, sucursal_id: str, producto: Dict[str, Any]) -> tuple:
+    return (franquicia_id, sucursal_id, producto["ProductoID"], producto.get("Nombre"), int(producto.get("Stock", 0)))
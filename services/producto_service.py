@@ -1,119 +1,214 @@
-import json
-import uuid
-from http import HTTPStatus
-from typing import Dict, Any, Optional
-from repositories.dynamo_repository import DynamoRepository
-from services.sucursal_service import SucursalService
-from decimal import Decimal
-
-class ProductoService:
-    """Servicio para gestionar productos en sucursales."""
-
-    def __init__(self, repositorio: Optional[DynamoRepository] = None):
-        """Inicializa el servicio con un repositorio de DynamoDB."""
-        self.repositorio = repositorio or DynamoRepository("Franquicias")
-        self.sucursal_service = SucursalService(self.repositorio)
-
-    def agregar_producto(self, franquicia_id: str, sucursal_id: str, nombre: str, stock: int = 0) -> Dict[str, Any]:
-        """Agrega un producto a una sucursal específica de una franquicia."""
-        if not all(isinstance(param, str) and param.strip() for param in [franquicia_id, sucursal_id, nombre]) or not isinstance(stock, int):
-            return self._response(HTTPStatus.BAD_REQUEST, "Parámetros inválidos.")
-
-        franquicia = self.repositorio.get_item({"FranquiciaID": franquicia_id})
-        if not franquicia:
-            return self._response(HTTPStatus.NOT_FOUND, "Franquicia no encontrada.")
-
-        sucursal = next((s for s in franquicia.get("Sucursales", []) if s["SucursalID"] == sucursal_id), None)
-        if not sucursal:
-            return self._response(HTTPStatus.NOT_FOUND, "Sucursal no encontrada.")
-
-        producto_id = str(uuid.uuid4())
-        sucursal.setdefault("Productos", []).append({"ProductoID": producto_id, "Nombre": nombre, "Stock": stock})
-
-        if self.repositorio.actualizar_franquicia(franquicia_id, franquicia["Sucursales"]):
-            return self._response(HTTPStatus.CREATED, "Producto agregado exitosamente.", {"ProductoID": producto_id})
-        return self._response(HTTPStatus.INTERNAL_SERVER_ERROR, "Error al actualizar franquicia en DynamoDB.")
-
-    def actualizar_producto(self, franquicia_id: str, sucursal_id: str, producto_id: str, nombre: Optional[str] = None, stock: Optional[int] = None) -> Dict[str, Any]:
-        """Actualiza los datos de un producto en una sucursal específica."""
-        if not all(isinstance(param, str) and param.strip() for param in [franquicia_id, sucursal_id, producto_id]):
-            return self._response(HTTPStatus.BAD_REQUEST, "Parámetros inválidos.")
-
-        if nombre is None and stock is None:
-            return self._response(HTTPStatus.BAD_REQUEST, "Debe proporcionar al menos un parámetro para actualizar.")
-
-        franquicia = self.repositorio.get_item({"FranquiciaID": franquicia_id})
-        if not franquicia:
-            return self._response(HTTPStatus.NOT_FOUND, "Franquicia no encontrada.")
-
-        sucursal = next((s for s in franquicia.get("Sucursales", []) if s["SucursalID"] == sucursal_id), None)
-        if not sucursal:
-            return self._response(HTTPStatus.NOT_FOUND, "Sucursal no encontrada.")
-
-        producto = next((p for p in sucursal.get("Productos", []) if p["ProductoID"] == producto_id), None)
-        if not producto:
-            return self._response(HTTPStatus.NOT_FOUND, "Producto no encontrado.")
-
-        if nombre:
-            producto["Nombre"] = nombre
-        if stock is not None:
-            producto["Stock"] = stock
-
-        if self.repositorio.actualizar_franquicia(franquicia_id, franquicia["Sucursales"]):
-            return self._response(HTTPStatus.OK, "Producto actualizado exitosamente.")
-        return self._response(HTTPStatus.INTERNAL_SERVER_ERROR, "Error al actualizar franquicia en DynamoDB.")
-
-    def eliminar_producto(self, franquicia_id: str, sucursal_id: str, producto_id: str) -> Dict[str, Any]:
-        """Elimina un producto de una sucursal específica."""
-        if not all(isinstance(param, str) and param.strip() for param in [franquicia_id, sucursal_id, producto_id]):
-            return self._response(HTTPStatus.BAD_REQUEST, "Parámetros inválidos.")
-
-        franquicia = self.repositorio.get_item({"FranquiciaID": franquicia_id})
-        if not franquicia:
-            return self._response(HTTPStatus.NOT_FOUND, "Franquicia no encontrada.")
-
-        sucursal = next((s for s in franquicia.get("Sucursales", []) if s["SucursalID"] == sucursal_id), None)
-        if not sucursal:
-            return self._response(HTTPStatus.NOT_FOUND, "Sucursal no encontrada.")
-
-        productos = sucursal.get("Productos", [])
-        nuevos_productos = [p for p in productos if p["ProductoID"] != producto_id]
-
-        if len(nuevos_productos) == len(productos):
-            return self._response(HTTPStatus.NOT_FOUND, "Producto no encontrado.")
-
-        sucursal["Productos"] = nuevos_productos
-
-        if self.repositorio.actualizar_franquicia(franquicia_id, franquicia["Sucursales"]):
-            return self._response(HTTPStatus.OK, "Producto eliminado exitosamente.")
-        return self._response(HTTPStatus.INTERNAL_SERVER_ERROR, "Error al actualizar franquicia en DynamoDB.")
-
-    def obtener_producto_mas_stock(self, franquicia_id: str) -> Dict[str, Any]:
-        """Obtiene el producto con mayor stock dentro de una franquicia."""
-        franquicia = self.repositorio.get_item({"FranquiciaID": franquicia_id})
-        if not franquicia:
-            return self._response(HTTPStatus.NOT_FOUND, "Franquicia no encontrada.")
-
-        productos = []
-        for sucursal in franquicia.get("Sucursales", []):
-            for producto in sucursal.get("Productos", []):
-                try:
-                    stock = int(Decimal(producto.get("Stock", 0)))  # Convertir Decimal a int
-                    if stock > 0:
-                        productos.append({**producto, "Stock": stock, "SucursalID": sucursal["SucursalID"]})
-                except (ValueError, TypeError):
-                    continue
-
-        if not productos:
-            return self._response(HTTPStatus.NOT_FOUND, "No se encontraron productos con stock en la franquicia.")
-
-        producto_mas_stock = max(productos, key=lambda p: p["Stock"])
-        return self._response(HTTPStatus.OK, "Producto con mayor stock encontrado.", producto_mas_stock)
-
-    @staticmethod
-    def _response(status_code: int, message: str, data: Optional[Dict] = None) -> Dict[str, Any]:
-        """Genera una respuesta estándar en formato JSON."""
-        response_body = {"message": message}
-        if data:
-            response_body["data"] = data
-        return {"statusCode": status_code, "body": json.dumps(response_body)}
+import uuid
+from http import HTTPStatus
+from typing import Dict, Any, Optional, List
+from core.campos import proyectar
+from core.paginacion import parsear_limite, codificar_cursor, decodificar_cursor
+from core.respuestas import respuesta
+from repositories.dynamo_repository import DynamoRepository, StockInsuficiente, ConflictoConcurrencia, ItemDemasiadoGrande, obtener_repositorio
+from services.sucursal_service import SucursalService, MENSAJE_CONFLICTO, MENSAJE_ITEM_GRANDE, MAX_PAGINA
+
+# Máximo de productos que puede pedir el ranking de stock
+MAX_TOP_STOCK = 100
+
+class ProductoService:
+    """Servicio para gestionar productos en sucursales."""
+
+    def __init__(self, repositorio: Optional[DynamoRepository] = None):
+        """Inicializa el servicio con un repositorio de DynamoDB."""
+        self.repositorio = repositorio or obtener_repositorio("Franquicias")
+        self.sucursal_service = SucursalService(self.repositorio)
+
+    def obtener_producto(self, franquicia_id: str, sucursal_id: str, producto_id: str, campos: Optional[Dict[str, dict]] = None) -> Dict[str, Any]:
+        """Obtiene un producto de una sucursal (solo `campos` si se indican)."""
+        if not all(isinstance(param, str) and param.strip() for param in [franquicia_id, sucursal_id, producto_id]):
+            return respuesta(HTTPStatus.BAD_REQUEST, "Parámetros inválidos.")
+
+        producto = self.repositorio.obtener_producto(franquicia_id, sucursal_id, producto_id, campos)
+
+        if producto is None:
+            return respuesta(HTTPStatus.INTERNAL_SERVER_ERROR, "Error al consultar productos en DynamoDB.")
+        if producto is False:
+            return self._no_encontrado(franquicia_id, "Sucursal o producto no encontrado.")
+        return respuesta(HTTPStatus.OK, "Producto obtenido.", producto)
+
+    def listar_productos(self, franquicia_id: str, sucursal_id: str, limite: Optional[Any] = None, cursor: Optional[str] = None,
+                         campos: Optional[Dict[str, dict]] = None) -> Dict[str, Any]:
+        """Página de productos de una sucursal, con `cursor` para pedir la siguiente."""
+        if not all(isinstance(param, str) and param.strip() for param in [franquicia_id, sucursal_id]):
+            return respuesta(HTTPStatus.BAD_REQUEST, "Parámetros inválidos.")
+
+        try:
+            pagina = self.repositorio.listar_productos(franquicia_id, sucursal_id, parsear_limite(limite, maximo=MAX_PAGINA), decodificar_cursor(cursor))
+        except ValueError as e:
+            return respuesta(HTTPStatus.BAD_REQUEST, str(e))
+
+        if pagina is None:
+            return respuesta(HTTPStatus.INTERNAL_SERVER_ERROR, "Error al consultar productos en DynamoDB.")
+        if pagina is False:
+            return self._no_encontrado(franquicia_id, "Sucursal no encontrada.")
+        productos, siguiente = pagina
+        return respuesta(HTTPStatus.OK, "Productos obtenidos.", {"productos": proyectar(productos, campos), "cursor": codificar_cursor(siguiente)})
+
+    def agregar_producto(self, franquicia_id: str, sucursal_id: str, nombre: str, stock: int = 0) -> Dict[str, Any]:
+        """Agrega un producto a una sucursal específica de una franquicia."""
+        if not all(isinstance(param, str) and param.strip() for param in [franquicia_id, sucursal_id, nombre]) or not isinstance(stock, int):
+            return respuesta(HTTPStatus.BAD_REQUEST, "Parámetros inválidos.")
+
+        producto_id = str(uuid.uuid4())
+        try:
+            resultado = self.repositorio.agregar_producto(franquicia_id, sucursal_id, {"ProductoID": producto_id, "Nombre": nombre, "Stock": stock})
+        except ConflictoConcurrencia:
+            return respuesta(HTTPStatus.CONFLICT, MENSAJE_CONFLICTO)
+        except ItemDemasiadoGrande:
+            return respuesta(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, MENSAJE_ITEM_GRANDE)
+
+        if resultado is None:
+            return respuesta(HTTPStatus.INTERNAL_SERVER_ERROR, "Error al actualizar franquicia en DynamoDB.")
+        if not resultado:
+            return self._no_encontrado(franquicia_id, "Sucursal no encontrada.")
+        return respuesta(HTTPStatus.CREATED, "Producto agregado exitosamente.", {"ProductoID": producto_id})
+
+    def actualizar_producto(self, franquicia_id: str, sucursal_id: str, producto_id: str, nombre: Optional[str] = None, stock: Optional[int] = None) -> Dict[str, Any]:
+        """Actualiza los datos de un producto en una sucursal específica."""
+        if not all(isinstance(param, str) and param.strip() for param in [franquicia_id, sucursal_id, producto_id]):
+            return respuesta(HTTPStatus.BAD_REQUEST, "Parámetros inválidos.")
+
+        if nombre is None and stock is None:
+            return respuesta(HTTPStatus.BAD_REQUEST, "Debe proporcionar al menos un parámetro para actualizar.")
+
+        cambios = {}
+        if nombre:
+            cambios["Nombre"] = nombre
+        if stock is not None:
+            cambios["Stock"] = stock
+        if not cambios:
+            return respuesta(HTTPStatus.BAD_REQUEST, "Debe proporcionar al menos un parámetro para actualizar.")
+
+        try:
+            resultado = self.repositorio.actualizar_producto(franquicia_id, sucursal_id, producto_id, cambios)
+        except ConflictoConcurrencia:
+            return respuesta(HTTPStatus.CONFLICT, MENSAJE_CONFLICTO)
+        except ItemDemasiadoGrande:
+            return respuesta(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, MENSAJE_ITEM_GRANDE)
+
+        if resultado is None:
+            return respuesta(HTTPStatus.INTERNAL_SERVER_ERROR, "Error al actualizar franquicia en DynamoDB.")
+        if not resultado:
+            return self._no_encontrado(franquicia_id, "Sucursal o producto no encontrado.")
+        return respuesta(HTTPStatus.OK, "Producto actualizado exitosamente.")
+
+    def eliminar_producto(self, franquicia_id: str, sucursal_id: str, producto_id: str) -> Dict[str, Any]:
+        """Elimina un producto de una sucursal específica."""
+        if not all(isinstance(param, str) and param.strip() for param in [franquicia_id, sucursal_id, producto_id]):
+            return respuesta(HTTPStatus.BAD_REQUEST, "Parámetros inválidos.")
+
+        try:
+            resultado = self.repositorio.eliminar_producto(franquicia_id, sucursal_id, producto_id)
+        except ConflictoConcurrencia:
+            return respuesta(HTTPStatus.CONFLICT, MENSAJE_CONFLICTO)
+
+        if resultado is None:
+            return respuesta(HTTPStatus.INTERNAL_SERVER_ERROR, "Error al actualizar franquicia en DynamoDB.")
+        if not resultado:
+            return self._no_encontrado(franquicia_id, "Sucursal o producto no encontrado.")
+        return respuesta(HTTPStatus.OK, "Producto eliminado exitosamente.")
+
+    def ajustar_stock(self, franquicia_id: str, sucursal_id: str, producto_id: str, delta: int) -> Dict[str, Any]:
+        """Aplica un incremento o decremento de stock en una sola operación atómica."""
+        if not all(isinstance(param, str) and param.strip() for param in [franquicia_id, sucursal_id, producto_id]):
+            return respuesta(HTTPStatus.BAD_REQUEST, "Parámetros inválidos.")
+
+        if not isinstance(delta, int) or isinstance(delta, bool) or delta == 0:
+            return respuesta(HTTPStatus.BAD_REQUEST, "El parámetro 'delta' debe ser un entero distinto de cero.")
+
+        try:
+            nuevo_stock = self.repositorio.ajustar_stock(franquicia_id, sucursal_id, producto_id, delta)
+        except StockInsuficiente:
+            return respuesta(HTTPStatus.CONFLICT, "Stock insuficiente para aplicar el ajuste.")
+        except ConflictoConcurrencia:
+            return respuesta(HTTPStatus.CONFLICT, MENSAJE_CONFLICTO)
+
+        if nuevo_stock is None:
+            return respuesta(HTTPStatus.INTERNAL_SERVER_ERROR, "Error al actualizar franquicia en DynamoDB.")
+        if nuevo_stock is False:
+            return self._no_encontrado(franquicia_id, "Sucursal o producto no encontrado.")
+        return respuesta(HTTPStatus.OK, "Stock ajustado exitosamente.", {"ProductoID": producto_id, "Stock": nuevo_stock})
+
+    def guardar_productos(self, franquicia_id: str, sucursal_id: str, productos: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Inserta o reemplaza varios productos de una sucursal y reporta el resultado de cada uno."""
+        if not all(isinstance(param, str) and param.strip() for param in [franquicia_id, sucursal_id]):
+            return respuesta(HTTPStatus.BAD_REQUEST, "Parámetros inválidos.")
+
+        if not isinstance(productos, list) or not productos:
+            return respuesta(HTTPStatus.BAD_REQUEST, "El parámetro 'productos' debe ser una lista no vacía.")
+
+        # En el diseño anidado la carga completa se escribe dentro del ítem de la franquicia
+        maximo = self.repositorio.MAX_PRODUCTOS_POR_LOTE
+        if maximo is not None and len(productos) > maximo:
+            return respuesta(
+                HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                f"La carga admite hasta {maximo} productos por solicitud con el almacenamiento anidado; "
+                "divídala en varias solicitudes o use MODO_ALMACENAMIENTO=normalizado o tools/importar.py."
+            )
+
+        resultados = []
+        validos = {}
+        for indice, datos in enumerate(productos):
+            datos = datos if isinstance(datos, dict) else {}
+            nombre = datos.get("nombre")
+            stock = datos.get("stock", 0)
+            producto_id = datos.get("producto_id") or str(uuid.uuid4())
+
+            if not (isinstance(nombre, str) and nombre.strip()) or not isinstance(stock, int) or not isinstance(producto_id, str):
+                resultados.append({"indice": indice, "estado": "invalido"})
+                continue
+
+            validos[producto_id] = {"ProductoID": producto_id, "Nombre": nombre, "Stock": stock}
+            resultados.append({"indice": indice, "ProductoID": producto_id})
+
+        try:
+            escritos = self.repositorio.guardar_productos(franquicia_id, sucursal_id, list(validos.values())) if validos else {}
+        except ConflictoConcurrencia:
+            return respuesta(HTTPStatus.CONFLICT, MENSAJE_CONFLICTO)
+        except ItemDemasiadoGrande:
+            return respuesta(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, MENSAJE_ITEM_GRANDE)
+
+        if escritos is None:
+            return respuesta(HTTPStatus.INTERNAL_SERVER_ERROR, "Error al actualizar franquicia en DynamoDB.")
+        if escritos is False:
+            return self._no_encontrado(franquicia_id, "Sucursal no encontrada.")
+
+        for resultado in resultados:
+            if "ProductoID" in resultado:
+                resultado["estado"] = "guardado" if escritos.get(resultado["ProductoID"]) else "error"
+
+        completo = all(r["estado"] == "guardado" for r in resultados)
+        estado = HTTPStatus.OK if completo else HTTPStatus.MULTI_STATUS
+        return respuesta(estado, "Carga de productos procesada.", {"resultados": resultados})
+
+    def obtener_producto_mas_stock(self, franquicia_id: str, top: Optional[Any] = None, sucursal_id: Optional[str] = None) -> Dict[str, Any]:
+        """Obtiene el producto con mayor stock, o los `top` primeros, dentro de una franquicia o sucursal."""
+        try:
+            cantidad = 1 if top is None else int(top)
+        except (ValueError, TypeError):
+            cantidad = 0
+        if not 1 <= cantidad <= MAX_TOP_STOCK:
+            return respuesta(HTTPStatus.BAD_REQUEST, f"El parámetro 'top' debe estar entre 1 y {MAX_TOP_STOCK}.")
+
+        productos = self.repositorio.productos_mas_stock(franquicia_id, cantidad, sucursal_id or None)
+        if productos is None:
+            return respuesta(HTTPStatus.INTERNAL_SERVER_ERROR, "Error al consultar productos en DynamoDB.")
+        if productos is False:
+            return respuesta(HTTPStatus.NOT_FOUND, "Franquicia no encontrada.")
+        if not productos:
+            return respuesta(HTTPStatus.NOT_FOUND, "No se encontraron productos con stock en la franquicia.")
+
+        if top is None:
+            return respuesta(HTTPStatus.OK, "Producto con mayor stock encontrado.", productos[0])
+        return respuesta(HTTPStatus.OK, "Productos con mayor stock encontrados.", {"productos": productos})
+
+    def _no_encontrado(self, franquicia_id: str, mensaje: str) -> Dict[str, Any]:
+        """Distingue si lo que falta es la franquicia o la entidad dentro de ella."""
+        if not self.repositorio.franquicia_existe(franquicia_id):
+            return respuesta(HTTPStatus.NOT_FOUND, "Franquicia no encontrada.")
+        return respuesta(HTTPStatus.NOT_FOUND, mensaje)
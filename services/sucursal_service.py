@@ -1,98 +1,134 @@
-import json
-import uuid
-from typing import Optional, Dict, Any, List
-from repositories.dynamo_repository import DynamoRepository
-
-class SucursalService:
-    """Servicio para gestionar sucursales en franquicias."""
-
-    def __init__(self, repository: DynamoRepository):
-        self.repository = repository
-
-    def obtener_franquicia(self, franquicia_id: str) -> Optional[Dict]:
-        """Obtiene una franquicia por su ID."""
-        return self.repository.get_item({"FranquiciaID": franquicia_id}) if franquicia_id else None
-
-    def obtener_sucursales(self, franquicia_id: str) -> Dict[str, Any]:
-        """Obtiene todas las sucursales de una franquicia."""
-        franquicia = self.obtener_franquicia(franquicia_id)
-        if not franquicia:
-            return self._response(404, "Franquicia no encontrada.")
-
-        return self._response(200, "Sucursales obtenidas.", {"sucursales": franquicia.get("Sucursales", [])})
-
-    def agregar_sucursal(self, franquicia_id: str, nombre_sucursal: str) -> Dict[str, Any]:
-        """Agrega una nueva sucursal a una franquicia."""
-        franquicia = self.obtener_franquicia(franquicia_id)
-        if not franquicia:
-            return self._response(404, "Franquicia no encontrada.")
-
-        nueva_sucursal = {"SucursalID": str(uuid.uuid4()), "Nombre": nombre_sucursal}
-        franquicia.setdefault("Sucursales", []).append(nueva_sucursal)
-
-        self.actualizar_franquicia(franquicia_id, franquicia["Sucursales"])
-        return self._response(201, "Sucursal agregada exitosamente.", nueva_sucursal)
-
-    def actualizar_sucursal(self, franquicia_id: str, sucursal_id: str, nuevo_nombre: str) -> Dict[str, Any]:
-        """Actualiza el nombre de una sucursal en una franquicia."""
-        if not all([franquicia_id, sucursal_id, nuevo_nombre]):
-            return self._response(400, "Todos los parámetros son requeridos.")
-
-        franquicia = self.obtener_franquicia(franquicia_id)
-        if not franquicia:
-            return self._response(404, "Franquicia no encontrada.")
-
-        sucursales = franquicia.get("Sucursales", [])
-        sucursal_encontrada = None
-
-        for sucursal in sucursales:
-            if sucursal["SucursalID"] == sucursal_id:
-                sucursal["Nombre"] = nuevo_nombre
-                sucursal_encontrada = sucursal
-                break
-
-        if not sucursal_encontrada:
-            return self._response(404, "Sucursal no encontrada.")
-
-        self.actualizar_franquicia(franquicia_id, sucursales)
-        return self._response(200, "Sucursal actualizada exitosamente.", sucursal_encontrada)
-
-    def eliminar_sucursal(self, franquicia_id: str, sucursal_id: str) -> Dict[str, Any]:
-        """Elimina una sucursal de una franquicia."""
-        franquicia = self.obtener_franquicia(franquicia_id)
-        if not franquicia:
-            return self._response(404, "Franquicia no encontrada.")
-
-        sucursales = [s for s in franquicia.get("Sucursales", []) if s["SucursalID"] != sucursal_id]
-
-        if len(sucursales) == len(franquicia.get("Sucursales", [])):
-            return self._response(404, "Sucursal no encontrada.")
-
-        self.actualizar_franquicia(franquicia_id, sucursales)
-        return self._response(200, "Sucursal eliminada exitosamente.")
-
-    def crear_franquicia_con_sucursal(self, nombre_franquicia: str, nombre_sucursal: str) -> Dict[str, Any]:
-        """Crea una franquicia con su primera sucursal."""
-        franquicia_id = str(uuid.uuid4())
-        sucursal_id = str(uuid.uuid4())
-
-        nueva_franquicia = {
-            "FranquiciaID": franquicia_id,
-            "Nombre": nombre_franquicia,
-            "Sucursales": [{"SucursalID": sucursal_id, "Nombre": nombre_sucursal}]
-        }
-
-        self.repository.put_item(nueva_franquicia)
-        return self._response(201, "Franquicia creada con sucursal.", nueva_franquicia)
-
-    def actualizar_franquicia(self, franquicia_id: str, sucursales: List[Dict]) -> None:
-        """Actualiza la lista de sucursales de una franquicia en DynamoDB."""
-        self.repository.update_item({"FranquiciaID": franquicia_id}, "SET Sucursales = :s", {":s": sucursales})
-
-    @staticmethod
-    def _response(status_code: int, message: str, data: Optional[Dict] = None) -> Dict[str, Any]:
-        """Genera una respuesta estándar."""
-        response_body = {"message": message}
-        if data:
-            response_body["data"] = data
-        return {"statusCode": status_code, "body": json.dumps(response_body)}
+import uuid
+from typing import Optional, Dict, Any, List
+from core.campos import proyectar
+from core.paginacion import parsear_limite, codificar_cursor, decodificar_cursor
+from core.respuestas import respuesta, no_modificado, etiqueta, coincide_etag
+from repositories.dynamo_repository import DynamoRepository, ConflictoConcurrencia, ItemDemasiadoGrande
+
+# Respuesta cuando una escritura agota los reintentos por escrituras concurrentes sobre la franquicia
+MENSAJE_CONFLICTO = "La franquicia está recibiendo escrituras simultáneas; intente de nuevo."
+
+# Respuesta cuando la franquicia ya no cabe en un ítem de DynamoDB (diseño anidado)
+MENSAJE_ITEM_GRANDE = (
+    "La franquicia superaría el tamaño máximo de un ítem de DynamoDB (400 KB). "
+    "Para catálogos grandes use MODO_ALMACENAMIENTO=normalizado o tools/importar.py."
+)
+
+# Máximo de elementos por página en los listados de sucursales y productos
+MAX_PAGINA = 100
+
+class SucursalService:
+    """Servicio para gestionar sucursales en franquicias."""
+
+    def __init__(self, repository: DynamoRepository):
+        self.repository = repository
+
+    def obtener_franquicia(self, franquicia_id: str, campos: Optional[Dict[str, dict]] = None) -> Optional[Dict]:
+        """Obtiene una franquicia por su ID (solo `campos` si se indican)."""
+        return self.repository.get_item({"FranquiciaID": franquicia_id}, campos) if franquicia_id else None
+
+    def obtener_sucursales(self, franquicia_id: str, campos: Optional[Dict[str, dict]] = None,
+                           if_none_match: Optional[str] = None) -> Dict[str, Any]:
+        """Obtiene todas las sucursales de una franquicia; `campos` se aplica a cada sucursal.
+
+        Con `if_none_match` se lee primero solo la versión: si el ETag sigue vigente se responde 304 sin leer la franquicia.
+        """
+        if if_none_match and franquicia_id:
+            version = self.repository.obtener_version(franquicia_id)
+            if version is False:
+                return respuesta(404, "Franquicia no encontrada.")
+            if version is not None and coincide_etag(if_none_match, etiqueta(franquicia_id, version, "sucursales", campos)):
+                return no_modificado(etiqueta(franquicia_id, version, "sucursales", campos))
+
+        franquicia = self.obtener_franquicia(franquicia_id, {"Sucursales": campos} if campos else None)
+        if not franquicia:
+            return respuesta(404, "Franquicia no encontrada.")
+
+        etag = etiqueta(franquicia_id, franquicia.get("Version", 0), "sucursales", campos)
+        return respuesta(200, "Sucursales obtenidas.", {"sucursales": franquicia.get("Sucursales", [])}, {"ETag": etag})
+
+    def listar_sucursales(self, franquicia_id: str, limite: Optional[Any] = None, cursor: Optional[str] = None,
+                          campos: Optional[Dict[str, dict]] = None) -> Dict[str, Any]:
+        """Página de sucursales (sin productos) con `cursor` para la siguiente; los productos se listan por sucursal."""
+        try:
+            pagina = self.repository.listar_sucursales(franquicia_id, parsear_limite(limite, maximo=MAX_PAGINA), decodificar_cursor(cursor))
+        except ValueError as e:
+            return respuesta(400, str(e))
+
+        if pagina is None:
+            return respuesta(500, "Error al listar las sucursales.")
+        if pagina is False:
+            return respuesta(404, "Franquicia no encontrada.")
+        sucursales, siguiente = pagina
+        return respuesta(200, "Sucursales obtenidas.", {"sucursales": proyectar(sucursales, campos), "cursor": codificar_cursor(siguiente)})
+
+    def agregar_sucursal(self, franquicia_id: str, nombre_sucursal: str) -> Dict[str, Any]:
+        """Agrega una nueva sucursal a una franquicia."""
+        nueva_sucursal = {"SucursalID": str(uuid.uuid4()), "Nombre": nombre_sucursal}
+        try:
+            resultado = self.repository.agregar_sucursal(franquicia_id, nueva_sucursal)
+        except ConflictoConcurrencia:
+            return respuesta(409, MENSAJE_CONFLICTO)
+        except ItemDemasiadoGrande:
+            return respuesta(413, MENSAJE_ITEM_GRANDE)
+
+        if resultado is None:
+            return respuesta(500, "Error al agregar la sucursal.")
+        if not resultado:
+            return respuesta(404, "Franquicia no encontrada.")
+        return respuesta(201, "Sucursal agregada exitosamente.", nueva_sucursal)
+
+    def actualizar_sucursal(self, franquicia_id: str, sucursal_id: str, nuevo_nombre: str) -> Dict[str, Any]:
+        """Actualiza el nombre de una sucursal en una franquicia."""
+        if not all([franquicia_id, sucursal_id, nuevo_nombre]):
+            return respuesta(400, "Todos los parámetros son requeridos.")
+
+        try:
+            resultado = self.repository.actualizar_sucursal(franquicia_id, sucursal_id, nuevo_nombre)
+        except ConflictoConcurrencia:
+            return respuesta(409, MENSAJE_CONFLICTO)
+        except ItemDemasiadoGrande:
+            return respuesta(413, MENSAJE_ITEM_GRANDE)
+
+        if resultado is None:
+            return respuesta(500, "Error al actualizar la sucursal.")
+        if not resultado:
+            return self._no_encontrada(franquicia_id, "Sucursal no encontrada.")
+        return respuesta(200, "Sucursal actualizada exitosamente.", {"SucursalID": sucursal_id, "Nombre": nuevo_nombre})
+
+    def eliminar_sucursal(self, franquicia_id: str, sucursal_id: str) -> Dict[str, Any]:
+        """Elimina una sucursal de una franquicia."""
+        try:
+            resultado = self.repository.eliminar_sucursal(franquicia_id, sucursal_id)
+        except ConflictoConcurrencia:
+            return respuesta(409, MENSAJE_CONFLICTO)
+
+        if resultado is None:
+            return respuesta(500, "Error al eliminar la sucursal.")
+        if not resultado:
+            return self._no_encontrada(franquicia_id, "Sucursal no encontrada.")
+        return respuesta(200, "Sucursal eliminada exitosamente.")
+
+    def crear_franquicia_con_sucursal(self, nombre_franquicia: str, nombre_sucursal: str) -> Dict[str, Any]:
+        """Crea una franquicia con su primera sucursal."""
+        franquicia_id = str(uuid.uuid4())
+        sucursal_id = str(uuid.uuid4())
+
+        nueva_franquicia = {
+            "FranquiciaID": franquicia_id,
+            "Nombre": nombre_franquicia,
+            "Sucursales": [{"SucursalID": sucursal_id, "Nombre": nombre_sucursal}]
+        }
+
+        self.repository.put_item(nueva_franquicia)
+        return respuesta(201, "Franquicia creada con sucursal.", nueva_franquicia)
+
+    def actualizar_franquicia(self, franquicia_id: str, sucursales: List[Dict]) -> None:
+        """Actualiza la lista de sucursales de una franquicia en DynamoDB."""
+        self.repository.actualizar_franquicia(franquicia_id, sucursales)
+
+    def _no_encontrada(self, franquicia_id: str, mensaje: str) -> Dict[str, Any]:
+        """Distingue si lo que falta es la franquicia o la entidad dentro de ella."""
+        if not self.repository.franquicia_existe(franquicia_id):
+            return respuesta(404, "Franquicia no encontrada.")
+        return respuesta(404, mensaje)
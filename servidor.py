@@ -0,0 +1,341 @@
+"""Sirve la API fuera de Lambda, como proceso de larga duración con varios procesos trabajadores (pre-fork).
+
+Cada solicitud HTTP se convierte en el evento de API Gateway que espera `lambda_function.lambda_handler`,
+y su respuesta vuelve a HTTP. El proceso maestro abre el socket y crea los trabajadores; cada trabajador
+importa la aplicación después del fork, así que tiene su propio repositorio y su propio pool de conexiones.
+La salud es la ruta `GET /` de la API.
+
+Uso:
+    python servidor.py --puerto 8000 --trabajadores 4
+    gunicorn -w 4 -b 0.0.0.0:8000 servidor:aplicacion          # WSGI
+    uvicorn servidor:aplicacion_asgi --workers 4 --port 8000    # ASGI
+
+Con SIGTERM o SIGINT el maestro deja de aceptar conexiones, espera hasta --gracia segundos a que los
+trabajadores terminen las solicitudes en curso y fuerza la salida de los que sigan activos.
+"""
+import os
+import sys
+import time
+import uuid
+import base64
+import signal
+import socket
+import asyncio
+import logging
+import argparse
+import threading
+from http import HTTPStatus
+from urllib.parse import parse_qs
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler
+from core.registro import configurar_registro
+
+logger = logging.getLogger(__name__)
+
+# Hilos que atienden solicitudes dentro de cada trabajador. Con 1 el repositorio no se comparte entre hilos
+# (el recurso de boto3 no es seguro entre hilos): la concurrencia viene de los procesos.
+HILOS_POR_TRABAJADOR = int(os.environ.get("SERVIDOR_HILOS", "1"))
+
+# Un trabajador que termina antes de ARRANQUE_MINIMO_S segundos cuenta como fallo de arranque: se relanza con
+# espera exponencial y, si hay MAX_FALLOS_ARRANQUE fallos en VENTANA_FALLOS_S segundos, el servidor se detiene
+ARRANQUE_MINIMO_S = float(os.environ.get("SERVIDOR_ARRANQUE_MINIMO_S", "5"))
+MAX_FALLOS_ARRANQUE = int(os.environ.get("SERVIDOR_MAX_FALLOS_ARRANQUE", "5"))
+VENTANA_FALLOS_S = float(os.environ.get("SERVIDOR_VENTANA_FALLOS_S", "60"))
+ESPERA_BASE_RELANZAR_S = 0.5
+ESPERA_MAXIMA_RELANZAR_S = 30.0
+
+_manejador = None
+_ejecutor_asgi: Optional[ThreadPoolExecutor] = None
+
+def obtener_manejador():
+    """lambda_handler, importado la primera vez que se usa en el proceso (después del fork)."""
+    global _manejador
+    if _manejador is None:
+        from lambda_function import lambda_handler
+        _manejador = lambda_handler
+    return _manejador
+
+def crear_evento(metodo: str, ruta: str, query: str, cabeceras: Dict[str, str], cuerpo: bytes,
+                 ip: Optional[str] = None) -> Dict[str, Any]:
+    """Evento de API Gateway (proxy REST) para una solicitud HTTP.
+
+    Sin `resource`, el router resuelve la plantilla a partir de `path` y completa pathParameters.
+    Un cuerpo que no es UTF-8 viaja en base64 con isBase64Encoded, como lo entrega API Gateway.
+    """
+    parametros = parse_qs(query, keep_blank_values=True)
+    try:
+        body, base64_ = (cuerpo.decode("utf-8"), False) if cuerpo else (None, False)
+    except UnicodeDecodeError:
+        body, base64_ = base64.b64encode(cuerpo).decode("ascii"), True
+    solicitud_id = str(uuid.uuid4())
+    return {
+        "resource": None,
+        "path": ruta or "/",
+        "httpMethod": metodo.upper(),
+        "headers": cabeceras,
+        "queryStringParameters": {clave: valores[-1] for clave, valores in parametros.items()} or None,
+        "multiValueQueryStringParameters": parametros or None,
+        "pathParameters": None,
+        "body": body,
+        "isBase64Encoded": base64_,
+        "requestContext": {"requestId": solicitud_id, "identity": {"sourceIp": ip}},
+    }
+
+def atender(evento: Dict[str, Any]) -> Tuple[int, List[Tuple[str, str]], bytes]:
+    """Ejecuta lambda_handler y retorna (estado, cabeceras, cuerpo en bytes)."""
+    try:
+        resultado = obtener_manejador()(evento, None)
+    except Exception:
+        logger.exception("❌ Error no controlado al atender %s %s", evento.get("httpMethod"), evento.get("path"))
+        resultado = {"statusCode": 500, "headers": {"Content-Type": "application/json"}, "body": '{"error": "Error interno en el servidor"}'}
+
+    cuerpo = resultado.get("body") or ""
+    datos = base64.b64decode(cuerpo) if resultado.get("isBase64Encoded") else cuerpo.encode("utf-8")
+    cabeceras = [(nombre, str(valor)) for nombre, valor in (resultado.get("headers") or {}).items() if nombre.lower() != "content-length"]
+    for nombre, valores in (resultado.get("multiValueHeaders") or {}).items():
+        cabeceras.extend((nombre, str(valor)) for valor in valores)
+    cabeceras.append(("Content-Length", str(len(datos))))
+    return int(resultado.get("statusCode", 200)), cabeceras, datos
+
+def _linea_estado(estado: int) -> str:
+    try:
+        return f"{estado} {HTTPStatus(estado).phrase}"
+    except ValueError:
+        return str(estado)
+
+def aplicacion(environ, start_response):
+    """Aplicación WSGI."""
+    try:
+        largo = int(environ.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        largo = 0
+    cuerpo = environ["wsgi.input"].read(largo) if largo > 0 else b""
+
+    cabeceras = {clave[5:].replace("_", "-").title(): valor for clave, valor in environ.items() if clave.startswith("HTTP_")}
+    if environ.get("CONTENT_TYPE"):
+        cabeceras["Content-Type"] = environ["CONTENT_TYPE"]
+    # PEP 3333 entrega PATH_INFO como bytes decodificados en latin-1
+    ruta = environ.get("PATH_INFO", "/").encode("latin-1").decode("utf-8", "replace")
+
+    evento = crear_evento(environ["REQUEST_METHOD"], ruta, environ.get("QUERY_STRING", ""), cabeceras, cuerpo, environ.get("REMOTE_ADDR"))
+    estado, cabeceras_respuesta, datos = atender(evento)
+    start_response(_linea_estado(estado), cabeceras_respuesta)
+    return [datos]
+
+async def aplicacion_asgi(scope, receive, send):
+    """Aplicación ASGI: el handler es bloqueante y corre en un pool de SERVIDOR_HILOS hilos por proceso."""
+    global _ejecutor_asgi
+    if scope["type"] == "lifespan":
+        while True:
+            mensaje = await receive()
+            if mensaje["type"] == "lifespan.startup":
+                _ejecutor_asgi = ThreadPoolExecutor(max_workers=HILOS_POR_TRABAJADOR)
+                await asyncio.get_running_loop().run_in_executor(_ejecutor_asgi, obtener_manejador)
+                await send({"type": "lifespan.startup.complete"})
+            elif mensaje["type"] == "lifespan.shutdown":
+                if _ejecutor_asgi is not None:
+                    _ejecutor_asgi.shutdown(wait=True)
+                    _ejecutor_asgi = None
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    partes, mas = [], True
+    while mas:
+        mensaje = await receive()
+        partes.append(mensaje.get("body", b""))
+        mas = mensaje.get("more_body", False)
+
+    cabeceras: Dict[str, str] = {}
+    for nombre, valor in scope.get("headers", []):
+        nombre = nombre.decode("latin-1")
+        cabeceras[nombre] = f"{cabeceras[nombre]},{valor.decode('latin-1')}" if nombre in cabeceras else valor.decode("latin-1")
+    cliente = scope.get("client") or (None,)
+    evento = crear_evento(scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"),
+                          cabeceras, b"".join(partes), cliente[0])
+
+    if _ejecutor_asgi is None:
+        _ejecutor_asgi = ThreadPoolExecutor(max_workers=HILOS_POR_TRABAJADOR)
+    estado, cabeceras_respuesta, datos = await asyncio.get_running_loop().run_in_executor(_ejecutor_asgi, atender, evento)
+    await send({
+        "type": "http.response.start",
+        "status": estado,
+        "headers": [(nombre.lower().encode("latin-1"), valor.encode("latin-1")) for nombre, valor in cabeceras_respuesta],
+    })
+    await send({"type": "http.response.body", "body": datos})
+
+class _Registro(WSGIRequestHandler):
+    """Handler HTTP de wsgiref sin la línea por solicitud en stderr (la API ya registra cada solicitud)."""
+
+    def log_message(self, formato, *args):
+        logger.debug(formato, *args)
+
+class ServidorWSGI(WSGIServer):
+    """Servidor WSGI de la biblioteca estándar sobre un socket ya abierto, con un pool acotado de hilos."""
+
+    def __init__(self, sock: socket.socket, hilos: int = 1):
+        super().__init__(sock.getsockname()[:2], _Registro, bind_and_activate=False)
+        self.socket.close()
+        self.socket = sock
+        self.server_name = socket.getfqdn(self.server_address[0])
+        self.server_port = self.server_address[1]
+        self.setup_environ()
+        self.set_app(aplicacion)
+        self.pool = ThreadPoolExecutor(max_workers=hilos) if hilos > 1 else None
+
+    def process_request(self, request, client_address):
+        if self.pool is None:
+            return super().process_request(request, client_address)
+        self.pool.submit(self._atender_en_hilo, request, client_address)
+
+    def _atender_en_hilo(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        """Cierra el socket de escucha y espera a que terminen las solicitudes en curso."""
+        super().server_close()
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+
+def trabajador(sock: socket.socket, hilos: int) -> None:
+    """Bucle de un trabajador: carga la aplicación, atiende hasta recibir SIGTERM/SIGINT y termina lo pendiente."""
+    detener = threading.Event()
+    for senal in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(senal, lambda *_: detener.set())
+
+    obtener_manejador()
+    servidor = ServidorWSGI(sock, hilos)
+    hilo = threading.Thread(target=servidor.serve_forever, kwargs={"poll_interval": 0.5}, daemon=True)
+    hilo.start()
+    logger.info("Trabajador %d atendiendo en %s:%d", os.getpid(), *servidor.server_address[:2])
+
+    detener.wait()
+    # shutdown espera a que serve_forever termine la solicitud en curso
+    servidor.shutdown()
+    servidor.server_close()
+    logger.info("Trabajador %d detenido.", os.getpid())
+
+def _lanzar(sock: socket.socket, hilos: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        codigo = 0
+        try:
+            trabajador(sock, hilos)
+        except BaseException:
+            logger.exception("❌ El trabajador %d terminó con error.", os.getpid())
+            codigo = 1
+        finally:
+            logging.shutdown()
+            os._exit(codigo)
+    return pid
+
+def servir(host: str, puerto: int, trabajadores: int, hilos: int = HILOS_POR_TRABAJADOR, gracia: float = 30.0) -> int:
+    """Proceso maestro: abre el socket, mantiene `trabajadores` procesos vivos y coordina el apagado.
+
+    Retorna el código de salida: 0 tras SIGTERM/SIGINT, 1 si los trabajadores fallan repetidamente al arrancar.
+    """
+    sock = socket.create_server((host, puerto), backlog=1024)
+    if not hasattr(os, "fork"):
+        logger.warning("⚠️ fork no está disponible: se atiende en un solo proceso.")
+        trabajador(sock, hilos)
+        return 0
+
+    detener = threading.Event()
+    for senal in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(senal, lambda *_: detener.set())
+
+    # Cada puesto guarda cuándo arrancó su proceso y cuántos fallos de arranque seguidos lleva
+    puestos = [{"inicio": time.monotonic(), "fallos": 0} for _ in range(trabajadores)]
+    procesos = {_lanzar(sock, hilos): puesto for puesto in range(trabajadores)}
+    relanzar: Dict[int, float] = {}
+    fallos_recientes: deque = deque()
+    codigo = 0
+    logger.info("Servidor en %s:%d con %d trabajadores (pid %d)", host, puerto, trabajadores, os.getpid())
+
+    while not detener.is_set():
+        ahora = time.monotonic()
+        for puesto, momento in list(relanzar.items()):
+            if momento <= ahora:
+                del relanzar[puesto]
+                puestos[puesto]["inicio"] = ahora
+                procesos[_lanzar(sock, hilos)] = puesto
+
+        # Mientras todos los puestos esperan su relanzamiento no hay hijos que recoger
+        pid, estado = os.waitpid(-1, os.WNOHANG) if procesos else (0, 0)
+        if pid == 0:
+            espera = min([0.5] + [momento - ahora for momento in relanzar.values()])
+            detener.wait(max(espera, 0.01))
+            continue
+        puesto = procesos.pop(pid, None)
+        if puesto is None or detener.is_set():
+            continue
+
+        ahora = time.monotonic()
+        if ahora - puestos[puesto]["inicio"] >= ARRANQUE_MINIMO_S:
+            puestos[puesto]["fallos"] = 0
+            logger.warning("⚠️ El trabajador %d terminó (estado %d); se reemplaza.", pid, estado)
+            relanzar[puesto] = ahora
+            continue
+
+        fallos_recientes.append(ahora)
+        while fallos_recientes and ahora - fallos_recientes[0] > VENTANA_FALLOS_S:
+            fallos_recientes.popleft()
+        if len(fallos_recientes) >= MAX_FALLOS_ARRANQUE:
+            logger.error("❌ %d trabajadores fallaron al arrancar en %.0f s; se detiene el servidor.", len(fallos_recientes), VENTANA_FALLOS_S)
+            codigo = 1
+            break
+        puestos[puesto]["fallos"] += 1
+        espera = min(ESPERA_MAXIMA_RELANZAR_S, ESPERA_BASE_RELANZAR_S * 2 ** (puestos[puesto]["fallos"] - 1))
+        logger.warning("⚠️ El trabajador %d falló al arrancar (estado %d); se relanza en %.1f s.", pid, estado, espera)
+        relanzar[puesto] = ahora + espera
+
+    sock.close()
+    _detener_trabajadores(set(procesos), gracia)
+    return codigo
+
+def _detener_trabajadores(procesos: set, gracia: float) -> None:
+    """Envía SIGTERM, espera hasta `gracia` segundos y fuerza la salida de los que sigan activos."""
+    logger.info("Apagando: esperando hasta %.0f s a %d trabajadores.", gracia, len(procesos))
+    for pid in procesos:
+        _senal(pid, signal.SIGTERM)
+    limite = time.monotonic() + gracia
+    while procesos and time.monotonic() < limite:
+        pid, _ = os.waitpid(-1, os.WNOHANG)
+        if pid:
+            procesos.discard(pid)
+        else:
+            time.sleep(0.1)
+    for pid in procesos:
+        logger.warning("⚠️ El trabajador %d no terminó a tiempo; se fuerza la salida.", pid)
+        _senal(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+
+def _senal(pid: int, senal: int) -> None:
+    try:
+        os.kill(pid, senal)
+    except ProcessLookupError:
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Sirve la API con varios procesos trabajadores.")
+    parser.add_argument("--host", default=os.environ.get("SERVIDOR_HOST", "0.0.0.0"))
+    parser.add_argument("--puerto", type=int, default=int(os.environ.get("SERVIDOR_PUERTO", "8000")))
+    parser.add_argument("--trabajadores", type=int, default=int(os.environ.get("SERVIDOR_TRABAJADORES", str(os.cpu_count() or 1))),
+                        help="Procesos trabajadores (por defecto, uno por núcleo).")
+    parser.add_argument("--hilos", type=int, default=HILOS_POR_TRABAJADOR, help="Hilos por trabajador.")
+    parser.add_argument("--gracia", type=float, default=30.0, help="Segundos para terminar las solicitudes en curso al apagar.")
+    args = parser.parse_args()
+
+    configurar_registro()
+    sys.exit(servir(args.host, args.puerto, args.trabajadores, args.hilos, args.gracia))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import os
+
+# Los handlers crean el repositorio compartido al importarse: el entorno debe quedar listo antes.
+# Las pruebas corren sin AWS sobre MemoriaRepository y sin emitir métricas EMF por stdout.
+os.environ["MODO_ALMACENAMIENTO"] = "memoria"
+os.environ["METRICAS_EMF"] = "0"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
@@ -0,0 +1,262 @@
+import gzip
+import json
+import base64
+import unittest
+from unittest import mock
+
+from core import respuestas
+from lambda_function import lambda_handler
+from repositories.dynamo_repository import ConflictoConcurrencia, obtener_repositorio
+
+repositorio = obtener_repositorio("Franquicias")
+
+def evento(metodo: str, ruta: str, cuerpo=None, query=None, cabeceras=None, recurso=None, parametros=None) -> dict:
+    """Evento de API Gateway; sin `recurso` el router resuelve la plantilla desde `ruta`."""
+    return {
+        "resource": recurso,
+        "path": ruta,
+        "httpMethod": metodo,
+        "headers": cabeceras or {},
+        "pathParameters": parametros,
+        "queryStringParameters": query,
+        "body": json.dumps(cuerpo) if cuerpo is not None else None,
+        "isBase64Encoded": False,
+    }
+
+def llamar(metodo: str, ruta: str, **kwargs):
+    """Ejecuta la solicitud y retorna (estado, cuerpo JSON o None, cabeceras)."""
+    respuesta = lambda_handler(evento(metodo, ruta, **kwargs), None)
+    cuerpo = respuesta.get("body") or None
+    if cuerpo and respuesta.get("isBase64Encoded"):
+        cuerpo = gzip.decompress(base64.b64decode(cuerpo)).decode("utf-8")
+    return respuesta["statusCode"], json.loads(cuerpo) if cuerpo else None, respuesta.get("headers") or {}
+
+class ApiTest(unittest.TestCase):
+    """Cada prueba crea su propia franquicia en el repositorio en memoria compartido."""
+
+    def crear_franquicia(self, sucursales: int = 1, productos=()) -> tuple:
+        estado, franquicia, _ = llamar("POST", "/franquicias", cuerpo={"nombre": "Franquicia"})
+        self.assertEqual(estado, 201)
+        fid = franquicia["FranquiciaID"]
+        sids = []
+        for i in range(sucursales):
+            estado, cuerpo, _ = llamar("POST", f"/franquicias/{fid}/sucursales", cuerpo={"nombre": f"Sucursal {i}"})
+            self.assertEqual(estado, 201)
+            sids.append(cuerpo["data"]["SucursalID"])
+        pids = []
+        for i, stock in enumerate(productos):
+            estado, cuerpo, _ = llamar("POST", f"/franquicias/{fid}/sucursales/{sids[0]}/productos", cuerpo={"nombre": f"Producto {i}", "stock": stock})
+            self.assertEqual(estado, 201)
+            pids.append(cuerpo["data"]["ProductoID"])
+        return fid, sids, pids
+
+class RutasTest(ApiTest):
+    def test_salud(self):
+        self.assertEqual(llamar("GET", "/")[:2], (200, {"message": "API funcionando correctamente"}))
+
+    def test_resuelve_la_plantilla_desde_la_ruta(self):
+        fid, _, _ = self.crear_franquicia()
+        estado, franquicia, _ = llamar("GET", f"/franquicias/{fid}/")
+        self.assertEqual(estado, 200)
+        self.assertEqual(franquicia["FranquiciaID"], fid)
+
+    def test_usa_la_plantilla_de_api_gateway(self):
+        fid, _, _ = self.crear_franquicia()
+        estado, franquicia, _ = llamar("GET", f"/franquicias/{fid}", recurso="/franquicias/{franquicia_id}", parametros={"franquicia_id": fid})
+        self.assertEqual((estado, franquicia["FranquiciaID"]), (200, fid))
+
+    def test_ruta_inexistente_y_metodo_no_soportado(self):
+        self.assertEqual(llamar("GET", "/nada")[0], 404)
+        self.assertEqual(llamar("DELETE", "/franquicias")[0], 405)
+        self.assertEqual(llamar("PATCH", "/franquicias")[0], 405)
+
+    def test_json_invalido(self):
+        respuesta = lambda_handler({**evento("POST", "/franquicias"), "body": "{no"}, None)
+        self.assertEqual(respuesta["statusCode"], 400)
+
+class AjusteStockTest(ApiTest):
+    def ajustar(self, fid, sid, pid, delta):
+        return llamar("POST", "/productos/stock", cuerpo={"franquicia_id": fid, "sucursal_id": sid, "producto_id": pid, "delta": delta})
+
+    def test_incrementa_y_decrementa(self):
+        fid, (sid,), (pid,) = self.crear_franquicia(productos=[5])
+        estado, cuerpo, _ = self.ajustar(fid, sid, pid, 3)
+        self.assertEqual((estado, cuerpo["data"]["Stock"]), (200, 8))
+        estado, cuerpo, _ = self.ajustar(fid, sid, pid, -8)
+        self.assertEqual((estado, cuerpo["data"]["Stock"]), (200, 0))
+
+    def test_stock_insuficiente_no_modifica_el_producto(self):
+        fid, (sid,), (pid,) = self.crear_franquicia(productos=[2])
+        estado, cuerpo, _ = self.ajustar(fid, sid, pid, -3)
+        self.assertEqual(estado, 409)
+        self.assertIn("Stock insuficiente", cuerpo["message"])
+        _, producto, _ = llamar("GET", "/productos", query={"franquicia_id": fid, "sucursal_id": sid, "producto_id": pid})
+        self.assertEqual(producto["data"]["Stock"], 2)
+
+    def test_delta_invalido(self):
+        fid, (sid,), (pid,) = self.crear_franquicia(productos=[1])
+        for delta in ("3", 1.5, True, 0):
+            self.assertEqual(self.ajustar(fid, sid, pid, delta)[0], 400, delta)
+
+    def test_producto_o_franquicia_inexistente(self):
+        fid, (sid,), (pid,) = self.crear_franquicia(productos=[1])
+        self.assertEqual(self.ajustar(fid, sid, "no-existe", 1)[0], 404)
+        self.assertEqual(self.ajustar("no-existe", sid, pid, 1)[0], 404)
+
+    def test_conflicto_persistente_responde_409(self):
+        fid, (sid,), (pid,) = self.crear_franquicia(productos=[1])
+        with mock.patch.object(repositorio, "ajustar_stock", side_effect=ConflictoConcurrencia("ajuste")):
+            estado, cuerpo, _ = self.ajustar(fid, sid, pid, 1)
+        self.assertEqual(estado, 409)
+        self.assertIn("escrituras simultáneas", cuerpo["message"])
+
+class CargaProductosTest(ApiTest):
+    def cargar(self, fid, sid, productos):
+        return llamar("POST", "/productos/lote", cuerpo={"franquicia_id": fid, "sucursal_id": sid, "productos": productos})
+
+    def test_reporta_el_resultado_de_cada_producto(self):
+        fid, (sid,), _ = self.crear_franquicia()
+        estado, cuerpo, _ = self.cargar(fid, sid, [{"nombre": "A", "stock": 1}, {"nombre": ""}, {"producto_id": "p-1", "nombre": "B", "stock": 2}])
+        self.assertEqual(estado, 207)
+        self.assertEqual([r["estado"] for r in cuerpo["data"]["resultados"]], ["guardado", "invalido", "guardado"])
+
+    def test_reemplaza_por_producto_id(self):
+        fid, (sid,), _ = self.crear_franquicia()
+        self.assertEqual(self.cargar(fid, sid, [{"producto_id": "p-1", "nombre": "B", "stock": 2}])[0], 200)
+        self.assertEqual(self.cargar(fid, sid, [{"producto_id": "p-1", "nombre": "C", "stock": 9}])[0], 200)
+        _, cuerpo, _ = llamar("GET", f"/franquicias/{fid}/sucursales/{sid}/productos")
+        self.assertEqual(cuerpo["data"]["productos"], [{"ProductoID": "p-1", "Nombre": "C", "Stock": 9}])
+
+    def test_sucursal_inexistente(self):
+        fid, _, _ = self.crear_franquicia()
+        self.assertEqual(self.cargar(fid, "no-existe", [{"nombre": "A"}])[0], 404)
+
+    def test_limite_por_solicitud(self):
+        fid, (sid,), _ = self.crear_franquicia()
+        with mock.patch.object(repositorio, "MAX_PRODUCTOS_POR_LOTE", 2):
+            estado, cuerpo, _ = self.cargar(fid, sid, [{"nombre": f"P{i}"} for i in range(3)])
+        self.assertEqual(estado, 413)
+        self.assertIn("tools/importar.py", cuerpo["message"])
+
+    def test_conflicto_persistente_responde_409(self):
+        fid, (sid,), _ = self.crear_franquicia()
+        with mock.patch.object(repositorio, "guardar_productos", side_effect=ConflictoConcurrencia("carga")):
+            self.assertEqual(self.cargar(fid, sid, [{"nombre": "A"}])[0], 409)
+
+class RankingStockTest(ApiTest):
+    def test_ordena_por_stock_y_filtra_por_sucursal(self):
+        fid, sids, _ = self.crear_franquicia(sucursales=2, productos=[4, 0, 9, 1])
+        llamar("POST", f"/franquicias/{fid}/sucursales/{sids[1]}/productos", cuerpo={"nombre": "Otra", "stock": 7})
+
+        estado, cuerpo, _ = llamar("GET", "/productos/mas_stock", query={"franquicia_id": fid, "top": "3"})
+        self.assertEqual(estado, 200)
+        self.assertEqual([p["Stock"] for p in cuerpo["data"]["productos"]], [9, 7, 4])
+
+        _, cuerpo, _ = llamar("GET", "/productos/mas_stock", query={"franquicia_id": fid, "top": "10", "sucursal_id": sids[0]})
+        self.assertEqual([p["Stock"] for p in cuerpo["data"]["productos"]], [9, 4, 1])
+
+    def test_top_fuera_de_rango(self):
+        fid, _, _ = self.crear_franquicia()
+        for top in ("0", "101", "x"):
+            self.assertEqual(llamar("GET", "/productos/mas_stock", query={"franquicia_id": fid, "top": top})[0], 400, top)
+
+class EtagTest(ApiTest):
+    def test_304_mientras_la_version_no_cambie(self):
+        fid, _, _ = self.crear_franquicia()
+        estado, _, cabeceras = llamar("GET", f"/franquicias/{fid}")
+        etag = cabeceras["ETag"]
+        self.assertEqual(estado, 200)
+
+        estado, cuerpo, cabeceras = llamar("GET", f"/franquicias/{fid}", cabeceras={"If-None-Match": etag})
+        self.assertEqual((estado, cuerpo, cabeceras["ETag"]), (304, None, etag))
+        self.assertEqual(llamar("GET", f"/franquicias/{fid}", cabeceras={"If-None-Match": f'W/"otro", {etag}'})[0], 304)
+
+        llamar("PUT", f"/franquicias/{fid}", cuerpo={"nombre": "Renombrada"})
+        estado, cuerpo, cabeceras = llamar("GET", f"/franquicias/{fid}", cabeceras={"If-None-Match": etag})
+        self.assertEqual((estado, cuerpo["Nombre"]), (200, "Renombrada"))
+        self.assertNotEqual(cabeceras["ETag"], etag)
+
+    def test_cada_proyeccion_tiene_su_etag(self):
+        fid, _, _ = self.crear_franquicia()
+        _, _, completa = llamar("GET", f"/franquicias/{fid}")
+        _, _, parcial = llamar("GET", f"/franquicias/{fid}", query={"fields": "Nombre"})
+        self.assertNotEqual(completa["ETag"], parcial["ETag"])
+        estado, _, _ = llamar("GET", f"/franquicias/{fid}", query={"fields": "Nombre"}, cabeceras={"If-None-Match": completa["ETag"]})
+        self.assertEqual(estado, 200)
+
+class PaginacionTest(ApiTest):
+    def recorrer(self, ruta: str, clave: str, limite: int) -> list:
+        elementos, cursor, paginas = [], None, 0
+        while True:
+            query = {"limit": str(limite), **({"cursor": cursor} if cursor else {})}
+            estado, cuerpo, _ = llamar("GET", ruta, query=query)
+            self.assertEqual(estado, 200)
+            pagina = cuerpo["data"][clave]
+            self.assertLessEqual(len(pagina), limite)
+            elementos.extend(pagina)
+            paginas += 1
+            cursor = cuerpo["data"]["cursor"]
+            if cursor is None:
+                return elementos
+            self.assertLess(paginas, 20)
+
+    def test_recorre_sucursales_sin_repetir(self):
+        fid, sids, _ = self.crear_franquicia(sucursales=5)
+        sucursales = self.recorrer(f"/franquicias/{fid}/sucursales", "sucursales", 2)
+        self.assertEqual([s["SucursalID"] for s in sucursales], sids)
+
+    def test_recorre_productos_de_una_sucursal(self):
+        fid, (sid,), pids = self.crear_franquicia(productos=[1, 2, 3, 4])
+        productos = self.recorrer(f"/franquicias/{fid}/sucursales/{sid}/productos", "productos", 3)
+        self.assertEqual([p["ProductoID"] for p in productos], pids)
+
+    def test_parametros_invalidos(self):
+        fid, _, _ = self.crear_franquicia()
+        for query in ({"limit": "0"}, {"limit": "101"}, {"limit": "x"}, {"cursor": "%%%"}):
+            self.assertEqual(llamar("GET", f"/franquicias/{fid}/sucursales", query=query)[0], 400, query)
+
+class CamposTest(ApiTest):
+    def test_proyecta_franquicia_sucursales_y_producto(self):
+        fid, (sid,), (pid,) = self.crear_franquicia(productos=[3])
+        _, franquicia, _ = llamar("GET", f"/franquicias/{fid}", query={"fields": "Nombre"})
+        self.assertNotIn("Sucursales", franquicia)
+        self.assertEqual((franquicia["FranquiciaID"], franquicia["Nombre"]), (fid, "Franquicia"))
+
+        _, franquicia, _ = llamar("GET", f"/franquicias/{fid}", query={"fields": "Sucursales[*].Nombre"})
+        self.assertEqual(franquicia["Sucursales"], [{"SucursalID": sid, "Nombre": "Sucursal 0"}])
+
+        _, producto, _ = llamar("GET", "/productos", query={"franquicia_id": fid, "sucursal_id": sid, "producto_id": pid, "fields": "Stock"})
+        self.assertEqual(producto["data"], {"ProductoID": pid, "Stock": 3})
+
+    def test_campo_invalido(self):
+        fid, _, _ = self.crear_franquicia()
+        self.assertEqual(llamar("GET", f"/franquicias/{fid}", query={"fields": "Nombre("})[0], 400)
+
+class CompresionTest(ApiTest):
+    def test_desactivada_por_defecto(self):
+        fid, _, _ = self.crear_franquicia()
+        respuesta = lambda_handler(evento("GET", f"/franquicias/{fid}", cabeceras={"Accept-Encoding": "gzip"}), None)
+        self.assertFalse(respuesta.get("isBase64Encoded"))
+        self.assertNotIn("Content-Encoding", respuesta["headers"])
+
+    def test_negocia_gzip(self):
+        fid, _, _ = self.crear_franquicia(productos=[1])
+        _, esperado, _ = llamar("GET", f"/franquicias/{fid}")
+        with mock.patch.object(respuestas, "COMPRESION_MIN_BYTES", 0):
+            for aceptada, comprime in (("gzip", True), ("deflate, gzip;q=0.5", True), ("*", True), ("gzip;q=0", False), ("br", False)):
+                respuesta = lambda_handler(evento("GET", f"/franquicias/{fid}", cabeceras={"Accept-Encoding": aceptada}), None)
+                self.assertEqual(bool(respuesta.get("isBase64Encoded")), comprime, aceptada)
+                if comprime:
+                    self.assertEqual(respuesta["headers"]["Content-Encoding"], "gzip")
+                    self.assertEqual(json.loads(gzip.decompress(base64.b64decode(respuesta["body"]))), esperado)
+
+    def test_no_comprime_un_304(self):
+        fid, _, _ = self.crear_franquicia()
+        _, _, cabeceras = llamar("GET", f"/franquicias/{fid}")
+        with mock.patch.object(respuestas, "COMPRESION_MIN_BYTES", 0):
+            respuesta = lambda_handler(evento("GET", f"/franquicias/{fid}", cabeceras={"Accept-Encoding": "gzip", "If-None-Match": cabeceras["ETag"]}), None)
+        self.assertEqual((respuesta["statusCode"], respuesta["body"]), (304, ""))
+        self.assertNotIn("Content-Encoding", respuesta["headers"])
+
+if __name__ == "__main__":
+    unittest.main()
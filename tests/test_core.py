@@ -0,0 +1,85 @@
+import unittest
+
+from core.paginacion import codificar_cursor, decodificar_cursor, parsear_limite
+from core.respuestas import acepta_gzip, coincide_etag, etiqueta
+from core.rutas import Router
+
+class CursorTest(unittest.TestCase):
+    def test_ida_y_vuelta(self):
+        for posicion in ({"desde": 2}, {"desde": 1, "sucursal": 3}, {"FranquiciaID": "ñandú/+?"}):
+            cursor = codificar_cursor(posicion)
+            self.assertNotIn("=", cursor)
+            self.assertTrue(all(c.isalnum() or c in "-_" for c in cursor), cursor)
+            self.assertEqual(decodificar_cursor(cursor), posicion)
+
+    def test_sin_cursor(self):
+        self.assertIsNone(codificar_cursor(None))
+        self.assertIsNone(decodificar_cursor(None))
+        self.assertIsNone(decodificar_cursor(""))
+
+    def test_cursor_invalido(self):
+        for cursor in ("%%%", "bm8gZXMganNvbg", "////"):
+            with self.assertRaises(ValueError):
+                decodificar_cursor(cursor)
+
+    def test_limite(self):
+        self.assertEqual(parsear_limite(None), 50)
+        self.assertEqual(parsear_limite("7", maximo=10), 7)
+        for texto in ("0", "11", "x", "-1"):
+            with self.assertRaises(ValueError):
+                parsear_limite(texto, maximo=10)
+
+class EtagTest(unittest.TestCase):
+    def test_variantes(self):
+        self.assertEqual(etiqueta("f1", 3), 'W/"f1-3"')
+        self.assertNotEqual(etiqueta("f1", 3, "sucursales"), etiqueta("f1", 3))
+        self.assertEqual(etiqueta("f1", 3, "sucursales"), etiqueta("f1", 3, "sucursales"))
+
+    def test_coincidencia_debil(self):
+        etag = etiqueta("f1", 3)
+        self.assertTrue(coincide_etag(etag, etag))
+        self.assertTrue(coincide_etag('"f1-3"', etag))
+        self.assertTrue(coincide_etag('W/"otro", W/"f1-3"', etag))
+        self.assertTrue(coincide_etag("*", etag))
+        self.assertFalse(coincide_etag('W/"f1-2"', etag))
+        self.assertFalse(coincide_etag(None, etag))
+        self.assertFalse(coincide_etag("", etag))
+
+class AceptaGzipTest(unittest.TestCase):
+    def acepta(self, valor):
+        return acepta_gzip({"headers": {"accept-encoding": valor}})
+
+    def test_negociacion(self):
+        self.assertTrue(self.acepta("gzip"))
+        self.assertTrue(self.acepta("deflate, GZIP;q=0.5"))
+        self.assertTrue(self.acepta("*"))
+        self.assertFalse(self.acepta("gzip;q=0"))
+        self.assertFalse(self.acepta("*, gzip;q=0"))
+        self.assertFalse(self.acepta("br"))
+        self.assertFalse(acepta_gzip({"headers": {}}))
+        self.assertFalse(acepta_gzip({}))
+
+class RouterTest(unittest.TestCase):
+    def setUp(self):
+        self.router = Router()
+        self.router.agregar(["GET"], "/", "salud")
+        self.router.agregar(["GET", "PUT"], "/franquicias/{franquicia_id}", "franquicia")
+        self.router.agregar(["GET"], "/franquicias/{franquicia_id}/sucursales/{sucursal_id}/productos", "productos")
+
+    def test_plantilla_de_api_gateway(self):
+        self.assertEqual(self.router.resolver("GET", "/franquicias/{franquicia_id}", "/franquicias/1"),
+                         ("/franquicias/{franquicia_id}", "franquicia", {}))
+
+    def test_resuelve_desde_la_ruta(self):
+        self.assertEqual(self.router.resolver("PUT", None, "/franquicias/1/"),
+                         ("/franquicias/{franquicia_id}", "franquicia", {"franquicia_id": "1"}))
+        self.assertEqual(self.router.resolver("GET", "", "/franquicias/1/sucursales/2/productos")[2],
+                         {"franquicia_id": "1", "sucursal_id": "2"})
+        self.assertEqual(self.router.resolver("GET", None, "/")[:2], ("/", "salud"))
+
+    def test_ruta_o_metodo_inexistente(self):
+        self.assertEqual(self.router.resolver("GET", None, "/franquicias/1/otra"), (None, None, {}))
+        self.assertEqual(self.router.resolver("DELETE", None, "/franquicias/1"), ("/franquicias/{franquicia_id}", None, {"franquicia_id": "1"}))
+
+if __name__ == "__main__":
+    unittest.main()
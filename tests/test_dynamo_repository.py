@@ -0,0 +1,86 @@
+import unittest
+from decimal import Decimal
+from unittest import mock
+
+from botocore.exceptions import ClientError
+
+from repositories import dynamo_repository
+from repositories.dynamo_repository import ConflictoConcurrencia, DynamoRepository, ItemDemasiadoGrande
+from services.producto_service import ProductoService
+
+def error_dynamo(codigo: str, mensaje: str = "") -> ClientError:
+    return ClientError({"Error": {"Code": codigo, "Message": mensaje}}, "UpdateItem")
+
+class TablaFalsa:
+    """Tabla con una franquicia de una sucursal; update_item lanza los errores de `fallos` antes de escribir."""
+
+    def __init__(self, fallos=()):
+        self.fallos = list(fallos)
+        self.item = {"FranquiciaID": "f1", "Version": Decimal(1), "Sucursales": [{"SucursalID": "s1", "Nombre": "S", "Productos": []}]}
+        self.escrituras = 0
+
+    def get_item(self, Key, **kwargs):
+        return {"Item": self.item} if Key["FranquiciaID"] == "f1" else {}
+
+    def update_item(self, **parametros):
+        self.escrituras += 1
+        if self.fallos:
+            raise self.fallos.pop(0)
+        self.item = {**self.item, "Sucursales": parametros["ExpressionAttributeValues"][":sucursales"]}
+
+def repositorio(tabla: TablaFalsa) -> DynamoRepository:
+    repo = DynamoRepository("Franquicias")
+    repo.table = tabla
+    return repo
+
+PRODUCTOS = [{"ProductoID": "p1", "Nombre": "A", "Stock": 1}]
+
+@mock.patch.object(dynamo_repository.time, "sleep")
+class EscrituraOptimistaTest(unittest.TestCase):
+    def test_reintenta_si_la_version_cambio(self, _sleep):
+        tabla = TablaFalsa([error_dynamo("ConditionalCheckFailedException")] * 2)
+        self.assertEqual(repositorio(tabla).guardar_productos("f1", "s1", PRODUCTOS), {"p1": True})
+        self.assertEqual(tabla.escrituras, 3)
+        self.assertEqual(tabla.item["Sucursales"][0]["Productos"], PRODUCTOS)
+
+    def test_agota_los_reintentos(self, _sleep):
+        tabla = TablaFalsa([error_dynamo("ConditionalCheckFailedException")] * dynamo_repository.INTENTOS_CONFLICTO)
+        with self.assertRaises(ConflictoConcurrencia):
+            repositorio(tabla).guardar_productos("f1", "s1", PRODUCTOS)
+        self.assertEqual(tabla.escrituras, dynamo_repository.INTENTOS_CONFLICTO)
+
+    def test_conflicto_agotado_responde_409(self, _sleep):
+        tabla = TablaFalsa([error_dynamo("ConditionalCheckFailedException")] * dynamo_repository.INTENTOS_CONFLICTO)
+        resultado = ProductoService(repositorio(tabla)).guardar_productos("f1", "s1", [{"nombre": "A", "stock": 1}])
+        self.assertEqual(resultado["statusCode"], 409)
+
+    def test_franquicia_o_sucursal_inexistente(self, _sleep):
+        repo = repositorio(TablaFalsa())
+        self.assertIs(repo.guardar_productos("otra", "s1", PRODUCTOS), False)
+        self.assertIs(repo.guardar_productos("f1", "otra", PRODUCTOS), False)
+
+class TamanoItemTest(unittest.TestCase):
+    def test_item_demasiado_grande_responde_413(self):
+        tabla = TablaFalsa([error_dynamo("ValidationException", "Item size to update has exceeded the maximum allowed size")])
+        with self.assertRaises(ItemDemasiadoGrande):
+            repositorio(tabla).guardar_productos("f1", "s1", PRODUCTOS)
+
+        tabla = TablaFalsa([error_dynamo("ValidationException", "Item size to update has exceeded the maximum allowed size")])
+        resultado = ProductoService(repositorio(tabla)).guardar_productos("f1", "s1", [{"nombre": "A", "stock": 1}])
+        self.assertEqual(resultado["statusCode"], 413)
+
+    def test_otros_errores_de_validacion_siguen_siendo_500(self):
+        tabla = TablaFalsa([error_dynamo("ValidationException", "Invalid UpdateExpression")])
+        resultado = ProductoService(repositorio(tabla)).guardar_productos("f1", "s1", [{"nombre": "A", "stock": 1}])
+        self.assertEqual(resultado["statusCode"], 500)
+
+    def test_limite_de_productos_en_el_diseno_anidado(self):
+        tabla = TablaFalsa()
+        maximo = DynamoRepository.MAX_PRODUCTOS_POR_LOTE
+        productos = [{"nombre": f"P{i}", "stock": 1} for i in range(maximo + 1)]
+        resultado = ProductoService(repositorio(tabla)).guardar_productos("f1", "s1", productos)
+        self.assertEqual(resultado["statusCode"], 413)
+        self.assertEqual(tabla.escrituras, 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import unittest
+from concurrent.futures import Future
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from tools.importar import Importacion
+
+class EjecutorInmediato:
+    """Ejecuta cada lote al enviarlo: el lote termina antes de que se encole el siguiente ítem."""
+
+    def submit(self, funcion, *args):
+        futuro = Future()
+        try:
+            futuro.set_result(funcion(*args))
+        except Exception as error:
+            futuro.set_exception(error)
+        return futuro
+
+    def shutdown(self, wait=True):
+        pass
+
+def franquicia(franquicia_id: str, productos: int) -> dict:
+    return {
+        "FranquiciaID": franquicia_id,
+        "Nombre": franquicia_id,
+        "Sucursales": [{
+            "SucursalID": "s1",
+            "Productos": [{"ProductoID": f"p{i}", "Stock": i} for i in range(productos)],
+        }],
+    }
+
+class ImportacionTest(unittest.TestCase):
+    def crear(self) -> Importacion:
+        importacion = Importacion("FranquiciasNormalizado", "normalizado", hilos=1, en_vuelo=2, checkpoint=None, simulacion=True)
+        importacion.pool = EjecutorInmediato()
+        return importacion
+
+    def test_checkpoint_no_pasa_una_franquicia_con_items_sin_enviar(self):
+        importacion = self.crear()
+        # 1 franquicia + 1 sucursal + 30 productos = 32 ítems: el primer lote termina a mitad del grupo
+        importacion.agregar(franquicia("f1", 30), fin=32)
+        self.assertEqual(len(importacion._lote), 7)
+        self.assertEqual(importacion._confirmados, 0)
+
+        importacion.terminar()
+        self.assertEqual(importacion._confirmados, 32)
+
+    def test_checkpoint_avanza_con_franquicias_completas(self):
+        importacion = self.crear()
+        importacion.agregar(franquicia("f1", 23), fin=25)
+        self.assertEqual(importacion._confirmados, 25)
+        importacion.agregar(franquicia("f2", 1), fin=28)
+        self.assertEqual(importacion._confirmados, 25)
+
+        importacion.terminar()
+        self.assertEqual(importacion._confirmados, 28)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import io
+import logging
+import unittest
+
+from core import registro
+
+SECRETOS = ("token-admin-secreto", "token-perfilado-secreto", "Bearer jwt-secreto", "api-key-secreta", "sesion=secreta")
+
+def evento() -> dict:
+    return {
+        "httpMethod": "GET",
+        "path": "/franquicias",
+        "headers": {
+            "x-admin-token": "token-admin-secreto",
+            "X-Perfilar": "token-perfilado-secreto",
+            "Authorization": "Bearer jwt-secreto",
+            "X-Api-Key": "api-key-secreta",
+            "Cookie": "sesion=secreta",
+            "Accept": "application/json",
+        },
+        "multiValueHeaders": {
+            "X-Admin-Token": ["token-admin-secreto"],
+            "Accept": ["application/json"],
+        },
+        "requestContext": {"requestId": "r-1", "identity": {"apiKey": "api-key-secreta", "sourceIp": "10.0.0.1"}},
+    }
+
+class RegistrarCargaTest(unittest.TestCase):
+    def setUp(self):
+        self.salida = io.StringIO()
+        self.handler = logging.StreamHandler(self.salida)
+        self.handler.setFormatter(registro.FormateadorJSON())
+        self.logger = logging.getLogger("test_registro")
+        self.logger.addHandler(self.handler)
+        self.logger.propagate = False
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        registro._muestreada.set(False)
+
+    def test_solicitud_muestreada_no_registra_secretos(self):
+        self.logger.setLevel(logging.INFO)
+        registro._muestreada.set(True)
+        original = evento()
+        registro.registrar_carga(self.logger, "Evento recibido", original)
+
+        linea = self.salida.getvalue()
+        self.assertIn('"muestreada":true', linea)
+        self.assertIn("application/json", linea)
+        self.assertIn("10.0.0.1", linea)
+        for secreto in SECRETOS:
+            self.assertNotIn(secreto, linea)
+        # El evento que reciben los handlers conserva las cabeceras
+        self.assertEqual(original, evento())
+
+    def test_debug_no_registra_secretos(self):
+        self.logger.setLevel(logging.DEBUG)
+        registro.registrar_carga(self.logger, "Evento recibido", evento())
+
+        linea = self.salida.getvalue()
+        self.assertIn("Evento recibido", linea)
+        for secreto in SECRETOS:
+            self.assertNotIn(secreto, linea)
+
+    def test_sin_muestreo_ni_debug_no_registra_la_carga(self):
+        self.logger.setLevel(logging.INFO)
+        registro.registrar_carga(self.logger, "Evento recibido", evento())
+        self.assertEqual(self.salida.getvalue(), "")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+
+from repositories.memoria_repository import MemoriaRepository
+from repositories.sqlite_repository import SQLiteRepository
+from tools.sincronizar import sincronizar
+
+class SincronizarTest(unittest.TestCase):
+    """Sincroniza una base SQLite contra un MemoriaRepository que hace de DynamoDB."""
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.origen = SQLiteRepository(os.path.join(self.directorio.name, "tienda.db"))
+        self.destino = MemoriaRepository()
+        self.origen.put_item({"FranquiciaID": "f1", "Nombre": "Tienda", "Sucursales": []})
+        self.origen.agregar_sucursal("f1", {"SucursalID": "s1", "Nombre": "Centro"})
+        self.origen.agregar_producto("f1", "s1", {"ProductoID": "p1", "Nombre": "A", "Stock": 4})
+
+    def tearDown(self):
+        self.directorio.cleanup()
+
+    def test_envia_solo_lo_pendiente(self):
+        self.assertEqual([f for f, _ in self.origen.pendientes_de_sincronizar()[0]], ["f1"])
+        self.assertEqual(sincronizar(self.origen, self.destino), {"enviadas": 1, "eliminadas": 0, "fallidas": 0})
+        self.assertEqual(self.origen.pendientes_de_sincronizar(), ([], []))
+
+        remota = self.destino.get_item({"FranquiciaID": "f1"})
+        self.assertEqual(remota["Sucursales"][0]["Productos"], [{"ProductoID": "p1", "Nombre": "A", "Stock": 4}])
+        self.assertEqual(sincronizar(self.origen, self.destino)["enviadas"], 0)
+
+    def test_un_cambio_posterior_vuelve_a_quedar_pendiente(self):
+        sincronizar(self.origen, self.destino)
+        self.origen.ajustar_stock("f1", "s1", "p1", -1)
+        self.assertEqual([f for f, _ in self.origen.pendientes_de_sincronizar()[0]], ["f1"])
+
+        sincronizar(self.origen, self.destino)
+        remota = self.destino.get_item({"FranquiciaID": "f1"})
+        self.assertEqual(remota["Sucursales"][0]["Productos"][0]["Stock"], 3)
+
+    def test_la_version_enviada_supera_la_remota(self):
+        sincronizar(self.origen, self.destino)
+        for _ in range(5):
+            self.destino.actualizar_nombre("f1", "Cambiada en la nube")
+        remota = self.destino.obtener_version("f1")
+
+        self.origen.actualizar_nombre("f1", "Cambiada en la tienda")
+        sincronizar(self.origen, self.destino)
+        self.assertGreater(self.destino.obtener_version("f1"), remota)
+        self.assertEqual(self.destino.get_item({"FranquiciaID": "f1"})["Nombre"], "Cambiada en la tienda")
+
+    def test_replica_las_eliminaciones(self):
+        sincronizar(self.origen, self.destino)
+        self.origen.delete_item({"FranquiciaID": "f1"})
+        self.assertEqual(self.origen.pendientes_de_sincronizar(), ([], ["f1"]))
+
+        self.assertEqual(sincronizar(self.origen, self.destino), {"enviadas": 0, "eliminadas": 1, "fallidas": 0})
+        self.assertFalse(self.destino.franquicia_existe("f1"))
+        self.assertEqual(self.origen.pendientes_de_sincronizar(), ([], []))
+
+    def test_simulacion_no_escribe_ni_marca(self):
+        self.assertEqual(sincronizar(self.origen, self.destino, simulacion=True)["enviadas"], 1)
+        self.assertFalse(self.destino.franquicia_existe("f1"))
+        self.assertEqual(len(self.origen.pendientes_de_sincronizar()[0]), 1)
+
+if __name__ == "__main__":
+    unittest.main()
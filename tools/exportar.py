@@ -0,0 +1,183 @@
+"""Exporta el catálogo completo (franquicias, sucursales y productos) como filas planas en NDJSON o CSV.
+
+La tabla se recorre con un Scan paralelo (Segment/TotalSegments) en un pool de hilos. Cada hilo aplana
+sus páginas y las entrega a una cola acotada que el hilo principal escribe en la salida, así que la
+memoria depende del número de hilos y no del tamaño de la tabla.
+
+Uso:
+    python -m tools.exportar --formato ndjson --salida catalogo.ndjson.gz --segmentos 16
+    python -m tools.exportar --modo normalizado --formato csv --salida -
+
+También puede desplegarse como Lambda programada con el handler `tools.exportar.lambda_handler`.
+"""
+import os
+import sys
+import csv
+import gzip
+import queue
+import argparse
+import logging
+import tempfile
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, TextIO
+import boto3
+from core.respuestas import serializar
+from repositories.conexion import obtener_recurso_dynamodb
+from repositories.dynamo_repository import SK_FRANQUICIA
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Columnas de las filas exportadas; cada fila es de tipo franquicia, sucursal o producto
+COLUMNAS = ("tipo", "franquicia_id", "sucursal_id", "producto_id", "nombre", "stock", "version")
+
+# Páginas de Scan en espera por hilo: acota la memoria cuando la salida es más lenta que la lectura
+PAGINAS_EN_COLA = 2
+_FIN = object()
+
+def filas_franquicia(franquicia: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Aplana una franquicia del diseño anidado en una fila por franquicia, sucursal y producto."""
+    franquicia_id = franquicia["FranquiciaID"]
+    yield {"tipo": "franquicia", "franquicia_id": franquicia_id, "nombre": franquicia.get("Nombre"),
+           "version": franquicia.get("Version", 0)}
+    for sucursal in franquicia.get("Sucursales", []):
+        sucursal_id = sucursal.get("SucursalID")
+        yield {"tipo": "sucursal", "franquicia_id": franquicia_id, "sucursal_id": sucursal_id, "nombre": sucursal.get("Nombre")}
+        for producto in sucursal.get("Productos", []):
+            yield _fila_producto(franquicia_id, sucursal_id, producto)
+
+def filas_item_normalizado(item: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Fila de un ítem del diseño normalizado, que ya es una entidad por ítem."""
+    franquicia_id = item["PK"].split("#", 1)[1]
+    if item["SK"] == SK_FRANQUICIA:
+        yield {"tipo": "franquicia", "franquicia_id": franquicia_id, "nombre": item.get("Nombre"), "version": item.get("Version", 0)}
+    elif "#PRODUCTO#" in item["SK"]:
+        yield _fila_producto(franquicia_id, item.get("SucursalID"), item)
+    else:
+        yield {"tipo": "sucursal", "franquicia_id": franquicia_id, "sucursal_id": item.get("SucursalID"), "nombre": item.get("Nombre")}
+
+def _fila_producto(franquicia_id: str, sucursal_id: str, producto: Dict[str, Any]) -> Dict[str, Any]:
+    return {"tipo": "producto", "franquicia_id": franquicia_id, "sucursal_id": sucursal_id,
+            "producto_id": producto.get("ProductoID"), "nombre": producto.get("Nombre"), "stock": producto.get("Stock")}
+
+def exportar(tabla: str, salida: TextIO, formato: str = "ndjson", segmentos: int = 8, modo: str = "anidado") -> int:
+    """Escribe en `salida` todas las filas de `tabla` y retorna cuántas se exportaron.
+
+    El orden de las filas depende de qué segmento termina primero cada página; dentro de una
+    franquicia anidada se conserva el orden franquicia, sucursal, productos.
+    """
+    aplanar = filas_item_normalizado if modo == "normalizado" else filas_franquicia
+    escribir = _escritor(formato, salida)
+    cliente = obtener_recurso_dynamodb().meta.client
+    cola: "queue.Queue" = queue.Queue(maxsize=segmentos * PAGINAS_EN_COLA)
+    detener = threading.Event()
+
+    filas = 0
+    with ThreadPoolExecutor(max_workers=segmentos) as pool:
+        for segmento in range(segmentos):
+            pool.submit(_escanear_segmento, cliente, tabla, segmento, segmentos, aplanar, cola, detener)
+        activos = segmentos
+        try:
+            while activos:
+                pagina = cola.get()
+                if pagina is _FIN:
+                    activos -= 1
+                elif isinstance(pagina, BaseException):
+                    raise pagina
+                else:
+                    for fila in pagina:
+                        escribir(fila)
+                    filas += len(pagina)
+        except BaseException:
+            detener.set()
+            raise
+    return filas
+
+def _escanear_segmento(cliente, tabla: str, segmento: int, segmentos: int, aplanar: Callable,
+                       cola: "queue.Queue", detener: threading.Event) -> None:
+    """Recorre un segmento y encola las filas de cada página; los errores viajan por la cola al hilo principal."""
+    try:
+        paginas = cliente.get_paginator("scan").paginate(TableName=tabla, Segment=segmento, TotalSegments=segmentos)
+        for pagina in paginas:
+            if not _encolar(cola, [fila for item in pagina.get("Items", []) for fila in aplanar(item)], detener):
+                return
+    except Exception as e:
+        logger.error(f"❌ Error en el segmento {segmento}: {str(e)}")
+        _encolar(cola, e, detener)
+    finally:
+        _encolar(cola, _FIN, detener)
+
+def _encolar(cola: "queue.Queue", valor: Any, detener: threading.Event) -> bool:
+    """Espera lugar en la cola (backpressure) salvo que la exportación se haya detenido."""
+    while not detener.is_set():
+        try:
+            cola.put(valor, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _escritor(formato: str, salida: TextIO) -> Callable[[Dict[str, Any]], None]:
+    if formato == "csv":
+        escritor = csv.DictWriter(salida, fieldnames=COLUMNAS, extrasaction="ignore")
+        escritor.writeheader()
+        return escritor.writerow
+    if formato == "ndjson":
+        return lambda fila: salida.write(serializar(fila) + "\n")
+    raise ValueError(f"Formato no soportado: {formato}")
+
+def abrir_salida(ruta: str) -> TextIO:
+    """Archivo de salida; '-' es stdout y la extensión .gz comprime con gzip."""
+    if ruta == "-":
+        return sys.stdout
+    if ruta.endswith(".gz"):
+        return gzip.open(ruta, "wt", encoding="utf-8", newline="")
+    return open(ruta, "w", encoding="utf-8", newline="")
+
+def tabla_por_defecto(modo: str) -> str:
+    if modo == "normalizado":
+        return os.environ.get("TABLA_NORMALIZADA", "FranquiciasNormalizado")
+    return "Franquicias"
+
+def lambda_handler(event, context):
+    """Modo Lambda (por ejemplo, programada con EventBridge): exporta a /tmp y sube el archivo a S3.
+
+    Evento: {"bucket": "...", "clave": "...", "formato": "ndjson"|"csv", "segmentos": 8, "modo": "anidado"|"normalizado"}
+    """
+    modo = event.get("modo") or os.environ.get("MODO_ALMACENAMIENTO", "anidado")
+    formato = event.get("formato", "ndjson")
+    clave = event.get("clave") or f"exportaciones/catalogo-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.{formato}.gz"
+    ruta = os.path.join(tempfile.gettempdir(), os.path.basename(clave))
+
+    try:
+        with abrir_salida(ruta) as salida:
+            filas = exportar(event.get("tabla") or tabla_por_defecto(modo), salida, formato, int(event.get("segmentos", 8)), modo)
+        boto3.client("s3").upload_file(ruta, event["bucket"], clave)
+    finally:
+        if os.path.exists(ruta):
+            os.remove(ruta)
+    logger.info(f"✅ Exportación finalizada: {filas} filas en s3://{event['bucket']}/{clave}")
+    return {"filas": filas, "bucket": event["bucket"], "clave": clave}
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta franquicias, sucursales y productos como filas planas.")
+    parser.add_argument("--modo", default=os.environ.get("MODO_ALMACENAMIENTO", "anidado"), choices=("anidado", "normalizado"),
+                        help="Diseño de la tabla a exportar.")
+    parser.add_argument("--tabla", help="Tabla a exportar (por defecto, la del modo).")
+    parser.add_argument("--formato", default="ndjson", choices=("ndjson", "csv"))
+    parser.add_argument("--salida", default="-", help="Archivo de salida ('-' para stdout, .gz para comprimir).")
+    parser.add_argument("--segmentos", type=int, default=8, help="Segmentos del Scan paralelo (hilos).")
+    args = parser.parse_args()
+
+    salida = abrir_salida(args.salida)
+    try:
+        filas = exportar(args.tabla or tabla_por_defecto(args.modo), salida, args.formato, args.segmentos, args.modo)
+    finally:
+        if salida is not sys.stdout:
+            salida.close()
+    logger.info(f"Exportación finalizada: {filas} filas.")
+
+if __name__ == "__main__":
+    main()
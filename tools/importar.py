@@ -0,0 +1,330 @@
+"""Importa cadenas completas (franquicias, sucursales y productos) desde NDJSON o CSV con escrituras por lote.
+
+La entrada usa las mismas filas planas que `tools.exportar` (tipo, franquicia_id, sucursal_id, producto_id,
+nombre, stock); si falta `tipo` se deduce de los IDs presentes. Las filas deben venir agrupadas por
+franquicia_id: cada franquicia se arma en memoria una sola vez y se escribe con BatchWriteItem, con un
+número acotado de lotes en vuelo. El checkpoint guarda cuántos registros de la entrada ya quedaron
+escritos, de modo que una importación interrumpida se retoma desde ahí.
+
+Uso:
+    python -m tools.importar --entrada cadenas.ndjson.gz --hilos 16
+    python -m tools.importar --modo normalizado --entrada erp.csv --checkpoint erp.checkpoint
+"""
+import os
+import csv
+import sys
+import gzip
+import json
+import time
+import random
+import argparse
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from botocore.exceptions import ClientError
+from repositories.conexion import obtener_recurso_dynamodb
+from repositories.dynamo_repository import (
+    ATRIBUTO_VERSION, TAMANO_LOTE_ESCRITURA, MAX_REINTENTOS_LOTE, ESPERA_BASE_LOTE, ESPERA_MAXIMA_LOTE,
+    descomponer_franquicia
+)
+from tools.exportar import tabla_por_defecto
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Errores de DynamoDB que indican throttling: se reintentan con la espera compartida
+ERRORES_LIMITE = {"ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded"}
+
+# Frecuencia mínima con la que se reescribe el checkpoint
+SEGUNDOS_CHECKPOINT = 2.0
+
+class EntradaDesordenada(ValueError):
+    """Una franquicia reaparece después de que su grupo ya se cerró."""
+
+class Regulador:
+    """Espera compartida por todos los hilos: se duplica con cada throttling y se reduce con cada lote completo.
+
+    Complementa el modo de reintento adaptativo de botocore, que no cubre los UnprocessedItems de BatchWriteItem.
+    """
+
+    def __init__(self, base: float = ESPERA_BASE_LOTE, maxima: float = ESPERA_MAXIMA_LOTE):
+        self.base = base
+        self.maxima = maxima
+        self.espera = 0.0
+        self.limitaciones = 0
+        self._lock = threading.Lock()
+
+    def esperar(self) -> None:
+        espera = self.espera
+        if espera:
+            time.sleep(random.uniform(espera / 2, espera))
+
+    def limitado(self) -> None:
+        with self._lock:
+            self.limitaciones += 1
+            self.espera = min(self.maxima, max(self.base, self.espera * 2))
+
+    def exito(self) -> None:
+        with self._lock:
+            self.espera = self.espera * 0.8 if self.espera > self.base else 0.0
+
+def leer_registros(entrada: TextIO, formato: str) -> Iterator[Dict[str, Any]]:
+    """Registros de la entrada como dicts, leídos de a uno."""
+    if formato == "csv":
+        yield from csv.DictReader(entrada)
+        return
+    for linea in entrada:
+        if linea.strip():
+            yield json.loads(linea)
+
+def agrupar_por_franquicia(registros: Iterable[Dict[str, Any]], omitir: int = 0) -> Iterator[Tuple[Dict[str, Any], int]]:
+    """Arma cada franquicia anidada a partir de sus registros consecutivos.
+
+    Retorna (franquicia, registros consumidos hasta su último registro). Los primeros `omitir`
+    registros se saltan (ya importados según el checkpoint).
+    """
+    actual, cerradas, indice = None, set(), 0
+    for indice, registro in enumerate(registros, start=1):
+        if indice <= omitir:
+            continue
+        franquicia_id = str(registro.get("franquicia_id") or "").strip()
+        if not franquicia_id:
+            raise ValueError(f"Registro {indice} sin franquicia_id.")
+        if actual is None or actual["FranquiciaID"] != franquicia_id:
+            if actual is not None:
+                cerradas.add(actual["FranquiciaID"])
+                yield _cerrar(actual), indice - 1
+            if franquicia_id in cerradas:
+                raise EntradaDesordenada(f"La franquicia {franquicia_id} reaparece en el registro {indice}; agrupe la entrada por franquicia_id.")
+            actual = {"FranquiciaID": franquicia_id, "Sucursales": {}}
+        _aplicar(actual, registro, indice)
+    if actual is not None:
+        yield _cerrar(actual), indice
+
+def _aplicar(franquicia: Dict[str, Any], registro: Dict[str, Any], indice: int) -> None:
+    tipo = registro.get("tipo") or ("producto" if registro.get("producto_id") else "sucursal" if registro.get("sucursal_id") else "franquicia")
+    nombre = registro.get("nombre") or None
+    if tipo == "franquicia":
+        if nombre:
+            franquicia["Nombre"] = nombre
+        return
+
+    sucursal_id = str(registro.get("sucursal_id") or "").strip()
+    if not sucursal_id:
+        raise ValueError(f"Registro {indice} de tipo {tipo} sin sucursal_id.")
+    sucursal = franquicia["Sucursales"].setdefault(sucursal_id, {"SucursalID": sucursal_id, "Productos": {}})
+    if tipo == "sucursal":
+        if nombre:
+            sucursal["Nombre"] = nombre
+        return
+
+    producto_id = str(registro.get("producto_id") or "").strip()
+    try:
+        stock = int(registro.get("stock") or 0)
+    except (TypeError, ValueError):
+        raise ValueError(f"Registro {indice}: stock inválido {registro.get('stock')!r}.")
+    if not producto_id:
+        raise ValueError(f"Registro {indice} de tipo producto sin producto_id.")
+    producto = {"ProductoID": producto_id, "Stock": stock}
+    if nombre:
+        producto["Nombre"] = nombre
+    sucursal["Productos"][producto_id] = producto
+
+def _cerrar(franquicia: Dict[str, Any]) -> Dict[str, Any]:
+    """Convierte los índices por ID en las listas del ítem anidado.
+
+    La versión parte de la hora de importación para que ningún ETag emitido antes coincida con el contenido nuevo.
+    """
+    sucursales = [
+        {**sucursal, "Productos": list(sucursal["Productos"].values())}
+        for sucursal in franquicia["Sucursales"].values()
+    ]
+    return {**franquicia, "Sucursales": sucursales, ATRIBUTO_VERSION: int(time.time())}
+
+class Importacion:
+    """Escribe los ítems de las franquicias en lotes de 25 con un máximo de `en_vuelo` lotes pendientes.
+
+    Los lotes pueden mezclar ítems de varias franquicias; el checkpoint avanza solo hasta la última
+    franquicia cuyos lotes, y los de todas las anteriores, ya terminaron.
+    """
+
+    def __init__(self, tabla: str, modo: str, hilos: int, en_vuelo: int, checkpoint: Optional[str],
+                 simulacion: bool = False, confirmados: int = 0):
+        self.tabla = tabla
+        self.modo = modo
+        self.cliente = obtener_recurso_dynamodb().meta.client
+        self.pool = ThreadPoolExecutor(max_workers=hilos)
+        self.cupos = threading.BoundedSemaphore(en_vuelo)
+        self.regulador = Regulador()
+        self.checkpoint = checkpoint
+        self.simulacion = simulacion
+        self.error: Optional[BaseException] = None
+        self.franquicias = 0
+        self.items = 0
+        self._grupos: deque = deque()
+        self._lote: List[Dict[str, Any]] = []
+        self._grupos_lote: List[dict] = []
+        self._confirmados = confirmados
+        self._ultimo_guardado = 0.0
+        self._lock = threading.Lock()
+
+    def agregar(self, franquicia: Dict[str, Any], fin: int) -> None:
+        """Encola los ítems de una franquicia; `fin` es el registro de entrada con el que termina."""
+        if self.error is not None:
+            raise self.error
+        items = list(descomponer_franquicia(franquicia)) if self.modo == "normalizado" else [franquicia]
+        # El 1 inicial reserva el grupo mientras se encolan sus ítems: un lote que termina a mitad
+        # del grupo no puede confirmarlo antes de que el resto de sus ítems esté en algún lote
+        grupo = {"fin": fin, "pendientes": 1}
+        with self._lock:
+            self._grupos.append(grupo)
+        for item in items:
+            self._lote.append({"PutRequest": {"Item": item}})
+            if not self._grupos_lote or self._grupos_lote[-1] is not grupo:
+                with self._lock:
+                    grupo["pendientes"] += 1
+                self._grupos_lote.append(grupo)
+            if len(self._lote) == TAMANO_LOTE_ESCRITURA:
+                self._enviar()
+        with self._lock:
+            grupo["pendientes"] -= 1
+            self._avanzar()
+        self.franquicias += 1
+        self.items += len(items)
+        self._guardar_checkpoint()
+
+    def terminar(self) -> None:
+        """Envía el último lote, espera los pendientes y deja el checkpoint al día."""
+        try:
+            if self._lote and self.error is None:
+                self._enviar()
+        finally:
+            self.pool.shutdown(wait=True)
+            self._guardar_checkpoint(forzar=True)
+        if self.error is not None:
+            raise self.error
+
+    def _enviar(self) -> None:
+        lote, grupos = self._lote, self._grupos_lote
+        self._lote, self._grupos_lote = [], []
+        # Backpressure: sin cupo libre la lectura de la entrada espera a que termine algún lote
+        self.cupos.acquire()
+        futuro = self.pool.submit(self._escribir, lote)
+        futuro.add_done_callback(lambda f: self._lote_terminado(f, grupos))
+
+    def _escribir(self, solicitudes: List[Dict[str, Any]]) -> None:
+        if self.simulacion:
+            return
+        pendientes = solicitudes
+        for _ in range(MAX_REINTENTOS_LOTE * 2):
+            self.regulador.esperar()
+            try:
+                response = self.cliente.batch_write_item(RequestItems={self.tabla: pendientes})
+            except ClientError as e:
+                if e.response["Error"]["Code"] in ERRORES_LIMITE:
+                    self.regulador.limitado()
+                    continue
+                raise
+            pendientes = response.get("UnprocessedItems", {}).get(self.tabla, [])
+            if not pendientes:
+                self.regulador.exito()
+                return
+            self.regulador.limitado()
+        raise RuntimeError(f"{len(pendientes)} ítems sin procesar tras {MAX_REINTENTOS_LOTE * 2} intentos.")
+
+    def _lote_terminado(self, futuro, grupos: List[dict]) -> None:
+        self.cupos.release()
+        error = futuro.exception()
+        with self._lock:
+            if error is not None:
+                if self.error is None:
+                    logger.error(f"❌ Error al escribir un lote: {str(error)}")
+                    self.error = error
+                return
+            for grupo in grupos:
+                grupo["pendientes"] -= 1
+            self._avanzar()
+
+    def _avanzar(self) -> None:
+        """Avanza el checkpoint sobre el prefijo de franquicias completamente escritas; requiere `_lock`."""
+        while self._grupos and self._grupos[0]["pendientes"] == 0:
+            self._confirmados = self._grupos.popleft()["fin"]
+
+    def _guardar_checkpoint(self, forzar: bool = False) -> None:
+        if not self.checkpoint or self.simulacion:
+            return
+        ahora = time.monotonic()
+        if not forzar and ahora - self._ultimo_guardado < SEGUNDOS_CHECKPOINT:
+            return
+        self._ultimo_guardado = ahora
+        with self._lock:
+            estado = {"registros": self._confirmados, "tabla": self.tabla, "modo": self.modo}
+        temporal = f"{self.checkpoint}.tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump(estado, archivo)
+        os.replace(temporal, self.checkpoint)
+
+def leer_checkpoint(ruta: Optional[str]) -> int:
+    """Registros ya importados según el checkpoint (0 si no existe)."""
+    if not ruta or not os.path.exists(ruta):
+        return 0
+    with open(ruta, encoding="utf-8") as archivo:
+        return int(json.load(archivo).get("registros", 0))
+
+def abrir_entrada(ruta: str) -> TextIO:
+    """Archivo de entrada; '-' es stdin y la extensión .gz se descomprime al leer."""
+    if ruta == "-":
+        return sys.stdin
+    if ruta.endswith(".gz"):
+        return gzip.open(ruta, "rt", encoding="utf-8", newline="")
+    return open(ruta, encoding="utf-8", newline="")
+
+def importar(entrada: TextIO, formato: str, tabla: str, modo: str = "anidado", hilos: int = 8,
+             en_vuelo: Optional[int] = None, checkpoint: Optional[str] = None, simulacion: bool = False) -> Importacion:
+    """Importa la entrada y retorna la importación terminada (franquicias, ítems y throttling observados)."""
+    omitir = leer_checkpoint(checkpoint)
+    if omitir:
+        logger.info(f"Retomando la importación después del registro {omitir}.")
+    importacion = Importacion(tabla, modo, hilos, en_vuelo or hilos * 2, checkpoint, simulacion, omitir)
+    try:
+        for franquicia, fin in agrupar_por_franquicia(leer_registros(entrada, formato), omitir):
+            importacion.agregar(franquicia, fin)
+    finally:
+        importacion.terminar()
+    return importacion
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa franquicias desde NDJSON o CSV con escrituras por lote.")
+    parser.add_argument("--entrada", default="-", help="Archivo de entrada ('-' para stdin, .gz comprimido).")
+    parser.add_argument("--formato", choices=("ndjson", "csv"), help="Por defecto se deduce de la extensión.")
+    parser.add_argument("--modo", default=os.environ.get("MODO_ALMACENAMIENTO", "anidado"), choices=("anidado", "normalizado"))
+    parser.add_argument("--tabla", help="Tabla de destino (por defecto, la del modo).")
+    parser.add_argument("--hilos", type=int, default=8, help="Hilos que escriben lotes en paralelo.")
+    parser.add_argument("--en-vuelo", type=int, help="Máximo de lotes pendientes (por defecto, 2 por hilo).")
+    parser.add_argument("--checkpoint", help="Archivo de checkpoint (por defecto, <entrada>.checkpoint).")
+    parser.add_argument("--reiniciar", action="store_true", help="Ignora el checkpoint existente.")
+    parser.add_argument("--simulacion", action="store_true", help="Lee y arma las franquicias sin escribir.")
+    args = parser.parse_args()
+
+    formato = args.formato or ("csv" if ".csv" in os.path.basename(args.entrada) else "ndjson")
+    checkpoint = args.checkpoint or (f"{args.entrada}.checkpoint" if args.entrada != "-" else None)
+    if args.reiniciar and checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    inicio = time.monotonic()
+    entrada = abrir_entrada(args.entrada)
+    try:
+        resultado = importar(entrada, formato, args.tabla or tabla_por_defecto(args.modo), args.modo,
+                             args.hilos, args.en_vuelo, checkpoint, args.simulacion)
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+    logger.info(
+        f"Importación finalizada: {resultado.franquicias} franquicias, {resultado.items} ítems, "
+        f"{resultado.regulador.limitaciones} limitaciones, {time.monotonic() - inicio:.1f} s."
+    )
+
+if __name__ == "__main__":
+    main()
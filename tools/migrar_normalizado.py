@@ -0,0 +1,50 @@
+"""Migra las franquicias anidadas de la tabla original al diseño normalizado PK/SK.
+
+Uso:
+    python -m tools.migrar_normalizado --origen Franquicias --destino FranquiciasNormalizado
+"""
+import argparse
+import logging
+from repositories.conexion import obtener_recurso_dynamodb
+from repositories.dynamo_repository import descomponer_franquicia
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def migrar(origen: str, destino: str, simulacion: bool = False) -> int:
+    """Copia cada franquicia de `origen` a `destino` como ítems independientes. Retorna las franquicias migradas."""
+    dynamodb = obtener_recurso_dynamodb()
+    tabla_origen = dynamodb.Table(origen)
+    tabla_destino = dynamodb.Table(destino)
+
+    migradas = 0
+    parametros = {}
+    with tabla_destino.batch_writer() as batch:
+        while True:
+            response = tabla_origen.scan(**parametros)
+            for franquicia in response.get("Items", []):
+                items = list(descomponer_franquicia(franquicia))
+                if not simulacion:
+                    for item in items:
+                        batch.put_item(Item=item)
+                migradas += 1
+                logger.info(f"Franquicia {franquicia['FranquiciaID']} migrada ({len(items)} ítems).")
+
+            if "LastEvaluatedKey" not in response:
+                break
+            parametros["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    return migradas
+
+def main():
+    parser = argparse.ArgumentParser(description="Migra franquicias al diseño normalizado de tabla única.")
+    parser.add_argument("--origen", default="Franquicias", help="Tabla con las franquicias anidadas.")
+    parser.add_argument("--destino", default="FranquiciasNormalizado", help="Tabla con clave PK/SK.")
+    parser.add_argument("--simulacion", action="store_true", help="Recorre el origen sin escribir en el destino.")
+    args = parser.parse_args()
+
+    total = migrar(args.origen, args.destino, args.simulacion)
+    logger.info(f"Migración finalizada: {total} franquicias.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""Benchmarks y pruebas de carga sin AWS, sobre el repositorio en memoria (MODO_ALMACENAMIENTO=memoria).
+
+Invoca `lambda_function.lambda_handler` con eventos sintéticos de API Gateway contra franquicias de
+distintos tamaños (sucursales x productos por sucursal) y reporta solicitudes por segundo, percentiles
+de latencia y el pico de memoria asignada por solicitud (tracemalloc). Incluye microbenchmarks de
+convert_decimal, obtener_producto_mas_stock y la codificación de respuestas. Los resultados pueden
+guardarse como línea base y compararse contra una anterior: la salida es 1 si alguna métrica empeora
+más que --tolerancia.
+
+Uso:
+    python -m tools.rendimiento --tamanos 2x5,10x10,20x50,100x100 --iteraciones 200
+    python -m tools.rendimiento --latencia-ms 5 --concurrencia 8 --escenarios obtener_franquicia,ajuste_stock
+    python -m tools.rendimiento --comparar tools/rendimiento_base.json
+"""
+import os
+import gc
+import sys
+import json
+import random
+import timeit
+import argparse
+import platform
+import statistics
+import tracemalloc
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# Tamaños por defecto: de 10 a 10.000 productos por franquicia
+TAMANOS_POR_DEFECTO = "2x5,10x10,20x50,100x100"
+
+# Solicitudes medidas con tracemalloc por escenario (la instrumentación distorsiona la latencia)
+MUESTRAS_MEMORIA = 20
+
+# Métricas comparadas contra la línea base; True si un valor mayor es mejor
+METRICAS_COMPARADAS = {"p50_ms": False, "p95_ms": False, "rps": True, "pico_kb": False, "us_por_llamada": False}
+
+class Datos:
+    """IDs de una franquicia sintética y generador de IDs al azar (con semilla fija) para los eventos."""
+
+    def __init__(self, sucursales: int, productos: int, semilla: int = 7):
+        self.tamano = f"{sucursales}x{productos}"
+        self.franquicia_id = f"bench-{self.tamano}"
+        self.sucursales = [f"s{i}" for i in range(sucursales)]
+        self.productos = [f"p{j}" for j in range(productos)]
+        self.azar = random.Random(semilla)
+
+    def franquicia(self) -> Dict[str, Any]:
+        return {
+            "FranquiciaID": self.franquicia_id,
+            "Nombre": f"Franquicia {self.franquicia_id}",
+            "Sucursales": [
+                {"SucursalID": sid, "Nombre": f"Sucursal {sid}", "Productos": [
+                    {"ProductoID": pid, "Nombre": f"Producto {pid}", "Stock": self.azar.randint(0, 500)}
+                    for pid in self.productos
+                ]}
+                for sid in self.sucursales
+            ]
+        }
+
+    def sucursal(self) -> str:
+        return self.azar.choice(self.sucursales)
+
+    def producto(self) -> str:
+        return self.azar.choice(self.productos)
+
+def evento(metodo: str, recurso: str, parametros: Optional[Dict[str, str]] = None, query: Optional[Dict[str, str]] = None,
+           cuerpo: Optional[Dict[str, Any]] = None, gzip: bool = False) -> Dict[str, Any]:
+    """Evento de API Gateway (proxy REST) para la plantilla `recurso` con sus parámetros de ruta."""
+    ruta = recurso
+    for nombre, valor in (parametros or {}).items():
+        ruta = ruta.replace(f"{{{nombre}}}", valor)
+    return {
+        "resource": recurso,
+        "path": ruta,
+        "httpMethod": metodo,
+        "headers": {"Accept-Encoding": "gzip"} if gzip else {},
+        "pathParameters": parametros,
+        "queryStringParameters": query,
+        "body": json.dumps(cuerpo) if cuerpo is not None else None,
+        "isBase64Encoded": False,
+    }
+
+RUTA_PRODUCTO = "/franquicias/{franquicia_id}/sucursales/{sucursal_id}/productos"
+
+# Cada escenario arma un evento nuevo por solicitud: el handler agrega claves al evento que recibe
+ESCENARIOS: Dict[str, Callable[[Datos, bool], Dict[str, Any]]] = {
+    "obtener_franquicia": lambda d, gz: evento(
+        "GET", "/franquicias/{franquicia_id}", {"franquicia_id": d.franquicia_id}, gzip=gz),
+    "sucursales": lambda d, gz: evento(
+        "GET", "/franquicias/{franquicia_id}/sucursales", {"franquicia_id": d.franquicia_id}, gzip=gz),
+    "productos_paginados": lambda d, gz: evento(
+        "GET", RUTA_PRODUCTO, {"franquicia_id": d.franquicia_id, "sucursal_id": d.sucursal()}, {"limit": "50"}, gzip=gz),
+    "mas_stock": lambda d, gz: evento(
+        "GET", "/productos/mas_stock", query={"franquicia_id": d.franquicia_id, "top": "10"}, gzip=gz),
+    "ajuste_stock": lambda d, gz: evento(
+        "POST", "/productos/stock", cuerpo={"franquicia_id": d.franquicia_id, "sucursal_id": d.sucursal(),
+                                            "producto_id": d.producto(), "delta": 1}, gzip=gz),
+    "actualizar_producto": lambda d, gz: evento(
+        "PUT", RUTA_PRODUCTO + "/{producto_id}",
+        {"franquicia_id": d.franquicia_id, "sucursal_id": d.sucursal(), "producto_id": d.producto()},
+        cuerpo={"stock": d.azar.randint(0, 500)}, gzip=gz),
+}
+
+def percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+def medir_escenario(handler: Callable, crear: Callable[[], Dict[str, Any]], iteraciones: int, concurrencia: int = 1) -> Dict[str, Any]:
+    """Ejecuta `iteraciones` solicitudes repartidas en `concurrencia` hilos y resume latencia y throughput."""
+    def ejecutar(cantidad: int):
+        latencias, errores = [], 0
+        for _ in range(cantidad):
+            solicitud = crear()
+            inicio = perf_counter()
+            resultado = handler(solicitud, None)
+            latencias.append((perf_counter() - inicio) * 1000)
+            errores += resultado.get("statusCode", 500) >= 500
+        return latencias, errores
+
+    for _ in range(min(10, iteraciones)):
+        handler(crear(), None)
+
+    inicio = perf_counter()
+    if concurrencia <= 1:
+        partes = [ejecutar(iteraciones)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+            cuotas = [iteraciones // concurrencia + (i < iteraciones % concurrencia) for i in range(concurrencia)]
+            partes = list(pool.map(ejecutar, cuotas))
+    total = perf_counter() - inicio
+
+    latencias = [latencia for parte in partes for latencia in parte[0]]
+    return {
+        "solicitudes": len(latencias),
+        "errores": sum(parte[1] for parte in partes),
+        "rps": round(len(latencias) / total, 1),
+        "p50_ms": round(percentil(latencias, 50), 3),
+        "p95_ms": round(percentil(latencias, 95), 3),
+        "p99_ms": round(percentil(latencias, 99), 3),
+        "max_ms": round(max(latencias), 3),
+        "pico_kb": medir_memoria(handler, crear),
+    }
+
+def medir_memoria(handler: Callable, crear: Callable[[], Dict[str, Any]], muestras: int = MUESTRAS_MEMORIA) -> float:
+    """Mediana del pico de memoria asignada durante una solicitud, en KB."""
+    picos = []
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for _ in range(muestras):
+            solicitud = crear()
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            handler(solicitud, None)
+            picos.append((tracemalloc.get_traced_memory()[1] - base) / 1024)
+    finally:
+        tracemalloc.stop()
+    return round(statistics.median(picos), 1)
+
+def micro(funcion: Callable[[], Any], repeticiones: int = 5) -> Dict[str, Any]:
+    """Tiempo por llamada (mejor de `repeticiones` rondas calibradas con timeit) en microsegundos."""
+    temporizador = timeit.Timer(funcion)
+    numero, _ = temporizador.autorange()
+    rondas = temporizador.repeat(repeat=repeticiones, number=numero)
+    return {"llamadas": numero, "us_por_llamada": round(min(rondas) / numero * 1e6, 2)}
+
+def microbenchmarks(repositorio, datos: Datos) -> Dict[str, Dict[str, Any]]:
+    """convert_decimal, ranking de stock y codificación de la respuesta sobre la franquicia más grande."""
+    from core.respuestas import respuesta_http, comprimir
+    from repositories.dynamo_repository import convert_decimal
+    from repositories.memoria_repository import _a_dynamo
+    from services.producto_service import ProductoService
+
+    crudo = _a_dynamo(datos.franquicia())
+    franquicia = convert_decimal(crudo)
+    servicio = ProductoService(repositorio)
+    http = respuesta_http(200, {"message": "Franquicia obtenida correctamente.", "data": franquicia})
+    con_gzip = evento("GET", "/", gzip=True)
+    return {
+        "convert_decimal": micro(lambda: convert_decimal(crudo)),
+        "obtener_producto_mas_stock": micro(lambda: servicio.obtener_producto_mas_stock(datos.franquicia_id, 10)),
+        "respuesta_http": micro(lambda: respuesta_http(200, {"message": "Franquicia obtenida correctamente.", "data": franquicia})),
+        "comprimir": micro(lambda: comprimir(http, con_gzip)),
+    }
+
+def ejecutar(tamanos: List[tuple], escenarios: List[str], iteraciones: int, concurrencia: int,
+             latencia_ms: float, gzip: bool) -> Dict[str, Any]:
+    """Siembra el repositorio en memoria, corre los escenarios por tamaño y los microbenchmarks."""
+    import lambda_function
+    from repositories.dynamo_repository import obtener_repositorio
+
+    repositorio = obtener_repositorio("Franquicias")
+    if type(repositorio).__name__ != "MemoriaRepository":
+        raise SystemExit("MODO_ALMACENAMIENTO debe ser 'memoria' antes de importar lambda_function.")
+    repositorio.latencia = latencia_ms / 1000
+
+    resultados: Dict[str, Any] = {
+        "entorno": {"python": platform.python_version(), "plataforma": platform.platform(),
+                    "concurrencia": concurrencia, "latencia_ms": latencia_ms, "gzip": gzip},
+        "escenarios": {},
+    }
+    datos = None
+    for sucursales, productos in tamanos:
+        datos = Datos(sucursales, productos)
+        repositorio.put_item(datos.franquicia())
+        for nombre in escenarios:
+            crear = lambda: ESCENARIOS[nombre](datos, gzip)
+            medicion = medir_escenario(lambda_function.lambda_handler, crear, iteraciones, concurrencia)
+            antes = sum(repositorio.operaciones.values())
+            lambda_function.lambda_handler(crear(), None)
+            medicion["operaciones_por_solicitud"] = sum(repositorio.operaciones.values()) - antes
+            clave = f"{nombre}@{datos.tamano}"
+            resultados["escenarios"][clave] = medicion
+            print(f"{clave:<36} {medicion['rps']:>9.1f} rps  p50 {medicion['p50_ms']:>8.3f} ms  p95 {medicion['p95_ms']:>8.3f} ms  "
+                  f"p99 {medicion['p99_ms']:>8.3f} ms  pico {medicion['pico_kb']:>9.1f} KB  errores {medicion['errores']}")
+
+    repositorio.latencia = 0.0
+    resultados["micro"] = {f"{nombre}@{datos.tamano}": medicion for nombre, medicion in microbenchmarks(repositorio, datos).items()}
+    for clave, medicion in resultados["micro"].items():
+        print(f"{clave:<36} {medicion['us_por_llamada']:>12.2f} us/llamada")
+    return resultados
+
+def comparar(actual: Dict[str, Any], base: Dict[str, Any], tolerancia: float) -> List[str]:
+    """Métricas que empeoraron más que `tolerancia` (fracción) respecto de la línea base."""
+    regresiones = []
+    for seccion in ("escenarios", "micro"):
+        for clave, medicion in actual.get(seccion, {}).items():
+            anterior = base.get(seccion, {}).get(clave)
+            if not anterior:
+                continue
+            for metrica, mayor_es_mejor in METRICAS_COMPARADAS.items():
+                if metrica not in medicion or not anterior.get(metrica):
+                    continue
+                cambio = medicion[metrica] / anterior[metrica] - 1
+                print(f"{clave:<36} {metrica:<15} {anterior[metrica]:>12} -> {medicion[metrica]:>12}  {cambio:+.1%}")
+                if (-cambio if mayor_es_mejor else cambio) > tolerancia:
+                    regresiones.append(f"{clave} {metrica}: {anterior[metrica]} -> {medicion[metrica]} ({cambio:+.1%})")
+    return regresiones
+
+def parsear_tamanos(texto: str) -> List[tuple]:
+    """'2x5,100x100' -> [(2, 5), (100, 100)] (sucursales x productos por sucursal)."""
+    tamanos = []
+    for parte in texto.split(","):
+        sucursales, _, productos = parte.strip().lower().partition("x")
+        tamanos.append((int(sucursales), int(productos)))
+    return tamanos
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de la API sobre el repositorio en memoria.")
+    parser.add_argument("--tamanos", default=TAMANOS_POR_DEFECTO, help="Sucursales x productos por sucursal, separados por comas.")
+    parser.add_argument("--escenarios", default=",".join(ESCENARIOS), help=f"Subconjunto de: {', '.join(ESCENARIOS)}.")
+    parser.add_argument("--iteraciones", type=int, default=200, help="Solicitudes medidas por escenario y tamaño.")
+    parser.add_argument("--concurrencia", type=int, default=1, help="Hilos que envían solicitudes en paralelo.")
+    parser.add_argument("--latencia-ms", type=float, default=0.0, help="Latencia simulada de cada operación del repositorio.")
+    parser.add_argument("--gzip", action="store_true", help="Solicitudes con Accept-Encoding: gzip.")
+    parser.add_argument("--guardar", help="Guarda los resultados como línea base JSON.")
+    parser.add_argument("--comparar", help="Línea base JSON contra la que comparar.")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Empeoramiento admitido antes de fallar (fracción).")
+    args = parser.parse_args()
+
+    escenarios = [nombre.strip() for nombre in args.escenarios.split(",") if nombre.strip()]
+    desconocidos = [nombre for nombre in escenarios if nombre not in ESCENARIOS]
+    if desconocidos:
+        parser.error(f"Escenarios desconocidos: {', '.join(desconocidos)}")
+
+    # El repositorio se elige al importar los handlers: el entorno debe quedar listo antes
+    os.environ["MODO_ALMACENAMIENTO"] = "memoria"
+    os.environ.setdefault("METRICAS_EMF", "0")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # La compresión está desactivada por defecto; el benchmark mide el umbral que usaría un despliegue que la active
+    os.environ.setdefault("COMPRESION_MIN_BYTES", "1024")
+
+    resultados = ejecutar(parsear_tamanos(args.tamanos), escenarios, args.iteraciones, args.concurrencia, args.latencia_ms, args.gzip)
+
+    if args.guardar:
+        with open(args.guardar, "w", encoding="utf-8") as archivo:
+            json.dump(resultados, archivo, indent=2, sort_keys=True)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            regresiones = comparar(resultados, json.load(archivo), args.tolerancia)
+        if regresiones:
+            print(f"❌ {len(regresiones)} regresiones por encima de {args.tolerancia:.0%}:")
+            for regresion in regresiones:
+                print(f"  {regresion}")
+            sys.exit(1)
+        print("✅ Sin regresiones respecto de la línea base.")
+
+if __name__ == "__main__":
+    main()
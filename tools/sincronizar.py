@@ -0,0 +1,75 @@
+"""Envía a DynamoDB los cambios de una base SQLite local (MODO_ALMACENAMIENTO=sqlite).
+
+Cada franquicia cuya versión avanzó desde el último envío se escribe completa en DynamoDB, y las
+franquicias eliminadas localmente se eliminan allá. Gana la última escritura: los cambios hechos en
+DynamoDB sobre una franquicia que también cambió en la tienda se reemplazan. La versión enviada es
+mayor que la de DynamoDB, así que los ETag emitidos antes por la API dejan de coincidir.
+
+Uso:
+    python -m tools.sincronizar --origen /var/lib/tienda/franquicias.db
+    python -m tools.sincronizar --origen franquicias.db --modo normalizado --tabla FranquiciasNormalizado
+"""
+import os
+import argparse
+import logging
+from repositories.dynamo_repository import ATRIBUTO_VERSION, DynamoRepository, NormalizedDynamoRepository
+from repositories.sqlite_repository import SQLiteRepository
+from tools.exportar import tabla_por_defecto
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def sincronizar(origen: SQLiteRepository, destino: DynamoRepository, simulacion: bool = False) -> dict:
+    """Envía las franquicias modificadas y las bajas pendientes. Retorna cuántas se enviaron y cuántas fallaron."""
+    pendientes = origen.pendientes_de_sincronizar()
+    if pendientes is None:
+        raise RuntimeError("No se pudieron leer los cambios pendientes de SQLite.")
+    modificadas, eliminadas = pendientes
+    resultado = {"enviadas": 0, "eliminadas": 0, "fallidas": 0}
+
+    for franquicia_id, _ in modificadas:
+        franquicia = origen.get_item({"FranquiciaID": franquicia_id})
+        if not franquicia:
+            continue
+        version_local = franquicia[ATRIBUTO_VERSION]
+        if simulacion:
+            resultado["enviadas"] += 1
+            continue
+        version_remota = destino.obtener_version(franquicia_id)
+        if version_remota is None:
+            resultado["fallidas"] += 1
+            continue
+        enviada = {**franquicia, ATRIBUTO_VERSION: max(version_local, (version_remota or 0) + 1)}
+        if destino.put_item(enviada) and origen.marcar_sincronizada(franquicia_id, version_local):
+            resultado["enviadas"] += 1
+        else:
+            resultado["fallidas"] += 1
+
+    for franquicia_id in eliminadas:
+        if simulacion:
+            resultado["eliminadas"] += 1
+        elif destino.delete_item({"FranquiciaID": franquicia_id}) and origen.marcar_eliminacion_sincronizada(franquicia_id):
+            resultado["eliminadas"] += 1
+        else:
+            resultado["fallidas"] += 1
+
+    return resultado
+
+def main():
+    parser = argparse.ArgumentParser(description="Sincroniza una base SQLite local con DynamoDB.")
+    parser.add_argument("--origen", default=os.environ.get("SQLITE_RUTA", "franquicias.db"), help="Base SQLite de la tienda.")
+    parser.add_argument("--modo", default="anidado", choices=("anidado", "normalizado"), help="Diseño de la tabla de destino.")
+    parser.add_argument("--tabla", help="Tabla de destino (por defecto, la del modo).")
+    parser.add_argument("--simulacion", action="store_true", help="Solo cuenta los cambios pendientes.")
+    args = parser.parse_args()
+
+    clase = NormalizedDynamoRepository if args.modo == "normalizado" else DynamoRepository
+    destino = clase(args.tabla or tabla_por_defecto(args.modo))
+    resultado = sincronizar(SQLiteRepository(args.origen), destino, args.simulacion)
+    logger.info(
+        f"Sincronización finalizada: {resultado['enviadas']} franquicias enviadas, "
+        f"{resultado['eliminadas']} eliminadas, {resultado['fallidas']} con error."
+    )
+
+if __name__ == "__main__":
+    main()